@@ -32,7 +32,7 @@ def simulation_finished(log_file: str):
     return False
 
 
-def watch_log(log_file: str):
+def watch_log(log_file: str, proc=None):
     # remove previous execution log file
     if os.path.exists(log_file):
         os.remove(log_file)
@@ -46,6 +46,10 @@ def watch_log(log_file: str):
     # wait the end of the simulation
     count = 0
     while not simulation_finished(log_file) and count < 2500:
+        # killed once its time limit is reached
+        if proc is not None and proc.poll() is not None and proc.returncode < 0:
+            relog.error("simulation killed before its end")
+            return False
         time.sleep(1)
         count += 1
     return count < 500
@@ -72,14 +76,19 @@ def run(asc: str):
         ltspice = "XVIIx64.exe"
     # start the simulation
     gen = executor.ish_exec(
-        '%s -Run "%s"' % (ltspice, asc), SIM_LOG, MAX_TIMEOUT=300, NOERR=True
+        '%s -Run "%s"' % (ltspice, asc),
+        SIM_LOG,
+        MAX_TIMEOUT=executor.timeout("ltspice"),
+        NOERR=True,
     )
     proc = next(gen)
     # watch the log file to determine when
     # the simulation ends
-    sim_done = watch_log(log)
+    sim_done = watch_log(log, proc)
     if proc:
         proc.kill()
+    # cancel the time limit
+    gen.close()
     return 0, not sim_done  # relog.get_stats(SIM_LOG)
 
 
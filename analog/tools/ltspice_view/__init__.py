@@ -35,7 +35,7 @@ def run(raw: str):
         ltspice = "XVIIx64.exe"
     # start the simulation
     print(raw)
-    executor.sh_exec("%s %s" % (ltspice, raw), SIM_LOG, NOERR=True)
+    executor.sh_exec("%s %s" % (ltspice, raw), SIM_LOG, MAX_TIMEOUT=-1, NOERR=True)
     return 0, 0  # relog.get_stats(SIM_LOG)
 
 
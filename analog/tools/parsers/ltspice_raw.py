@@ -4,8 +4,6 @@
 import os
 import re
 import sys
-import copy
-import struct
 import argparse
 import numpy as np
 
@@ -16,6 +14,191 @@ sys.path.append(os.environ["REFLOW"])
 import common.utils as utils
 import common.relog as relog
 
+# .step lines of the log and their parameters
+PATTERN_STEP = re.compile(r"^\.step\s+(.*?)\s*$", flags=re.MULTILINE)
+PATTERN_STEP_PARAM = re.compile(r"(\S+?)=(\S+)")
+# value with a spice scale factor (1.8, 33f, 1Meg, ...)
+PATTERN_SPICE_NUMBER = re.compile(
+    r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|[tgkmunpf])?[a-z]*$",
+    flags=re.IGNORECASE,
+)
+SCALE_FACTORS = {
+    "t": 1e12,
+    "g": 1e9,
+    "meg": 1e6,
+    "k": 1e3,
+    "m": 1e-3,
+    "u": 1e-6,
+    "n": 1e-9,
+    "p": 1e-12,
+    "f": 1e-15,
+}
+
+
+def spice_number(text: str):
+    """
+    value of a spice number or the text itself if it is not one
+    """
+    m = PATTERN_SPICE_NUMBER.match(text)
+    if not m:
+        return text
+    value, scale = m.groups()
+    return float(value) * SCALE_FACTORS.get((scale or "").lower(), 1.0)
+
+
+def read_steps(filename: str) -> list:
+    """
+    parameters of each step listed in the log of a simulation
+    ex: .step cload=3.3e-14 vdd=1.8 -> {"cload": 3.3e-14, "vdd": 1.8}
+    """
+    try:
+        with open(filename, "rb") as fp:
+            data = fp.read()
+    except OSError:
+        return []
+    # the log of LTspice XVII is written in utf-16
+    encoding = "utf-16-le" if b"\x00" in data[:64] else "utf-8"
+    text = data.decode(encoding, errors="ignore")
+    return [
+        {k.lower(): spice_number(v) for k, v in PATTERN_STEP_PARAM.findall(line)}
+        for line in PATTERN_STEP.findall(text)
+    ]
+
+
+def step_bounds(axis: np.ndarray) -> np.ndarray:
+    """
+    index of the first point of each step and the number of points:
+    a new step restarts from the first value of the axis
+    (t = 0 or the start frequency)
+    """
+    if not len(axis):
+        return np.zeros(1, dtype=np.int64)
+    starts = np.flatnonzero(axis[1:] == axis[0]) + 1
+    return np.concatenate(([0], starts, [len(axis)]))
+
+
+class Step:
+    """
+    view on the points of a step: step[name] slices the mapped
+    records of a variable without reading them
+    """
+
+    __slots__ = ["index", "params", "start", "stop", "records", "axis"]
+
+    def __init__(
+        self, index: int, params: dict, start: int, stop: int, records, axis: str
+    ):
+        self.index = index
+        self.params = params
+        self.start = start
+        self.stop = stop
+        self.records = records
+        self.axis = axis
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.records[name][self.start : self.stop]
+
+    @property
+    def x(self) -> np.ndarray:
+        return self[self.axis]
+
+    @property
+    def values(self) -> dict:
+        return {name: self[name] for name in self.records.dtype.names[1:]}
+
+    def __repr__(self):
+        params = " ".join("%s=%s" % kv for kv in self.params.items())
+        return "Step(%d, %s[%d:%d])" % (self.index, params, self.start, self.stop)
+
+
+class Steps:
+    """
+    steps of a simulation with the parameters read in its log
+    - steps[i]: i-th step
+    - steps.at(cload=3.3e-14): the step of the given parameters
+    - steps.where(vdd=1.8): the steps of the given parameters
+    """
+
+    __slots__ = ["records", "axis", "bounds", "params", "table"]
+
+    def __init__(self, records, axis: str, bounds: np.ndarray, params: list):
+        self.records = records
+        self.axis = axis
+        self.bounds = bounds
+        nb_steps = len(bounds) - 1
+        if params and len(params) != nb_steps:
+            relog.warning(
+                "%d steps in the log and %d in the waveforms" % (len(params), nb_steps)
+            )
+        self.params = (params + [{}] * nb_steps)[:nb_steps]
+        # parameter -> values of the steps for a vectorized lookup
+        # (float for numbers and object for texts)
+        self.table = {}
+        for name in {name for p in self.params for name in p}:
+            values = [p.get(name) for p in self.params]
+            if all(isinstance(v, float) for v in values):
+                self.table[name] = np.array(values, dtype=np.float64)
+            else:
+                self.table[name] = np.array(values, dtype=object)
+
+    def __len__(self):
+        return len(self.bounds) - 1
+
+    def __getitem__(self, index: int) -> Step:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("step %d out of %d steps" % (index, len(self)))
+        return Step(
+            index,
+            self.params[index],
+            int(self.bounds[index]),
+            int(self.bounds[index + 1]),
+            self.records,
+            self.axis,
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def indices(self, **params) -> np.ndarray:
+        """
+        indices of the steps of the given parameters
+        the numbers are compared with a relative tolerance (33f == 3.3e-14)
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in params.items():
+            values = self.table.get(name.lower())
+            if values is None:
+                return np.zeros(0, dtype=np.int64)
+            if values.dtype == object:
+                mask &= values == value
+                continue
+            number = spice_number(str(value))
+            if isinstance(number, str):
+                return np.zeros(0, dtype=np.int64)
+            mask &= np.isclose(values, number, rtol=1e-9, atol=0.0)
+        return np.flatnonzero(mask)
+
+    def where(self, **params) -> list:
+        return [self[i] for i in self.indices(**params)]
+
+    def at(self, **params) -> Step:
+        indices = self.indices(**params)
+        if len(indices) != 1:
+            raise KeyError("%d steps match %s" % (len(indices), params))
+        return self[indices[0]]
+
+    def by(self, name: str) -> dict:
+        """
+        steps indexed by the value of a parameter
+        """
+        name = name.lower()
+        return {step.params[name]: step for step in self if name in step.params}
+
 
 def load_raw(filename):
     """
@@ -34,6 +217,8 @@ def load_raw(filename):
                 ...
                 { "idx": <int>, "name": <str>, "type": <str> }
             ]
+            "records": <numpy.memmap of a structured dtype>,
+            "steps": <Steps>,
             "values": {
                 "var1": <numpy.ndarray>,
                 "var2": <numpy.ndarray>,
@@ -42,6 +227,13 @@ def load_raw(filename):
             }
         }
 
+        the binary section is mapped in memory and the values of each variable
+        are views on the mapped records: only the pages of the used signals
+        are read from the file
+
+        the steps of a stepped simulation are views on the records with
+        the parameters read in the log: db["steps"].at(cload=3.3e-14)["V(q)"]
+
         Arguments:
             :filename: path to file with raw data.
         Returns
@@ -54,7 +246,6 @@ def load_raw(filename):
                 filename = str(raw)
                 break
     filename = utils.normpath(filename)
-    print(filename)
     ret, header = {}, []
     mode, data, time = None, None, None
     binary_index = 0
@@ -116,56 +307,69 @@ def load_raw(filename):
     # parse binary section
     nb_vars = ret["no_vars"]
     nb_pts = ret["no_points"]
-    data, freq, time = [], None, None
+    records, freq, time = None, None, None
 
-    # read number of steps in the log file
-    nb_steps = 0
-    with open(filename.replace(".raw", ".log"), "r+") as fp:
-        for line in fp:
-            if line.startswith(".step"):
-                nb_steps += 1
-    ret["nb_steps"] = nb_steps
-    steps_indices = []
+    # read the parameters of the steps in the log file
+    steps = read_steps(filename.replace(".raw", ".log"))
+    ret["nb_steps"] = len(steps)
 
+    names = [var.get("name", "") for var in ret["vars"]]
     if mode == "FFT" or mode == "AC":
-        data = np.fromfile(filename, dtype=np.complex128, offset=binary_index)
-        freq = np.abs(data[::nb_vars])
-        data = np.reshape(data, (nb_pts, nb_vars))
+        records = map_records(filename, binary_index, nb_pts, complex_dtype(names))
+        freq = np.abs(records[names[0]])
+        bounds = step_bounds(freq)
     elif mode == "Transient":
         # time is 8 bytes but is also part of variables
         # values for each variable is 4 bytes
         # so expect to have (nb_vars-1) * 4 + 8 = (nb_vars + 1) * 4
         # for each point: in total nb_pts * (nb_vars + 1) * 4
-        buf_length = nb_pts * (nb_vars + 1) * 4
-        # check file size to know if stepped simulation
-        is_stepped = os.stat(filename).st_size > buf_length + binary_index
-        print(f"stepped simulation: {nb_steps}")
-        with open(filename, "rb") as fp:
-            # read data
-            fp.seek(binary_index)
-            data = np.frombuffer(fp.read(buf_length), dtype=np.float32)
-            # calculate time axis
-            time = []
-            for i in range(nb_pts):
-                fp.seek(binary_index + i * (nb_vars + 1) * 4)
-                t = struct.unpack("d", fp.read(8))[0]
-                time.append(t)
-                if i > 0 and t == 0:
-                    steps_indices.append(i)
-            steps_indices.append(nb_pts)
-        # reshape data
-        data = np.array(data).reshape((nb_pts, nb_vars + 1))
-    ret["steps_idx"] = [
-        (0, j) if i == 0 else (steps_indices[i - 1], j) for i, j in enumerate(steps_indices)
-    ]
-    ret["values"] = {
-        ret["vars"][i - 1].get("name", ""): data[:, i] for i in range(2, nb_vars)
-    }
+        records = map_records(filename, binary_index, nb_pts, transient_dtype(names))
+        time = records[names[0]]
+        bounds = step_bounds(time)
+    else:
+        bounds = np.array([0, nb_pts])
+    ret["steps_idx"] = [(int(i), int(j)) for i, j in zip(bounds[:-1], bounds[1:])]
+    ret["steps"] = None if records is None else Steps(records, names[0], bounds, steps)
+    # views on the mapped file: a signal is only read when used
+    ret["records"] = records
+    ret["values"] = (
+        {name: records[name] for name in names[1:]} if records is not None else {}
+    )
     ret["freq"] = freq
     ret["time"] = time
     return ret
 
 
+def transient_dtype(names: list) -> np.dtype:
+    """
+    layout of a point of a transient analysis:
+    the time in double precision followed by the traces in single precision
+    """
+    formats = ["<f8"] + ["<f4"] * (len(names) - 1)
+    return np.dtype({"names": names, "formats": formats})
+
+
+def complex_dtype(names: list) -> np.dtype:
+    """
+    layout of a point of an AC or FFT analysis: complex values in double precision
+    """
+    return np.dtype({"names": names, "formats": ["<c16"] * len(names)})
+
+
+def map_records(filename: str, offset: int, nb_pts: int, dtype: np.dtype) -> np.memmap:
+    """
+    map the points of the binary section without reading them
+    the points not yet written by a running simulation are ignored
+    """
+    available = (os.stat(filename).st_size - offset) // dtype.itemsize
+    if available < nb_pts:
+        relog.warning("%s holds %d of the %d points" % (filename, available, nb_pts))
+    nb_pts = min(nb_pts, available)
+    if nb_pts <= 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=(nb_pts,))
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="read ltspice raw files")
     parser.add_argument("-i", "--input", help="raw file path")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+import os
+import sys
+import traceback
+
+from enum import Enum
+
+import common.utils as utils
+import common.relog as relog
+from common.read_config import Config, locate_config_files
+
+# define the path where is stored the flow
+REFLOW_DIR = os.environ["REFLOW"]
+NO_CALLBACKS = (None, None)
+
+
+class SimType(Enum):
+    DIGITAL = 0
+    ANALOG = 1
+    MIXED = 2
+
+
+def load_configs(cwd: str) -> list:
+    """
+    load the default configuration and the one of the project
+    """
+    default_config = utils.normpath(os.path.join(REFLOW_DIR, "./default.config"))
+    # load a local configuration if there is one
+    config_files = [default_config] + locate_config_files(cwd)
+    # load the configuration
+    Config.read_configs(config_files)
+    Config.set_env({"TECH_LIB": "technology.TECH_LIB", "PLATFORM": "reflow.PLATFORM"})
+    # severity of the lines of the logs
+    if Config.data.has_section("log"):
+        relog.set_severities(dict(Config.data.items("log", raw=True)))
+    else:
+        relog.set_severities()
+    return config_files
+
+
+def prepare_task(cwd: str, type: str = "sim", use_custom_logger: bool = False):
+    # the listing (verilog, design_db, ...) is only imported by the commands using it
+    import common.read_sources as read_sources
+
+    # define working directory
+    os.environ["WORK_DIR"] = utils.normpath(
+        os.path.join(cwd, utils.get_tmp_folder_name(type, "./"))
+    )
+    os.makedirs(os.environ["WORK_DIR"], exist_ok=True)
+    # run simulation
+    relog.step("Listing files")
+    files, params = read_sources.read_from(cwd, no_logger=True)
+    # determine the type of simulation
+    digital_only = all((utils.files.is_digital(file) for file, _ in files))
+    analog_only = all((utils.files.is_analog(file) for file, _ in files))
+    if digital_only and not use_custom_logger:
+        files.insert(
+            0,
+            (
+                utils.normpath(os.path.join(REFLOW_DIR, "digital/packages/log.svh")),
+                "SYSTEM_VERILOG",
+            ),
+        )
+    sim_type = (
+        SimType.DIGITAL
+        if digital_only
+        else SimType.ANALOG if analog_only else SimType.MIXED
+    )
+    return (sim_type, files, params)
+
+
+# ==== actions ====
+def lint(cwd: str) -> bool:
+    """
+    check lint error on the design
+    """
+    type, files, params = prepare_task(cwd, type="lint")
+    if type is not SimType.DIGITAL:
+        relog.error("cannot lint mixed signal or analog simulations")
+        return False
+    # launch the linter without callback
+    utils.tools.launch_tool(
+        Config.tools.get("DIG_LINTER"), "lint", NO_CALLBACKS, files, params
+    )
+    return True
+
+
+def sim(cwd: str, use_custom_logger: bool = False) -> bool:
+    """
+    run a simulation
+    """
+    type, files, params = prepare_task(
+        cwd, type="sim", use_custom_logger=use_custom_logger
+    )
+    # load the simulator script
+    if type is SimType.DIGITAL:
+        tool_name = Config.tools.get("DIG_SIMULATOR")
+    elif type is SimType.ANALOG:
+        tool_name = Config.tools.get("ANA_SIMULATOR")
+    else:
+        relog.error("Not yet implementd mixed signal simulation")
+        relog.error("do a mix synthesis and call the spice netlist")
+        return False
+
+    # create callbacks
+    def _callbacks():
+        scripts = params.get("POST_SIM", [])
+        pre_sim = None
+
+        def post_sim(*args, **kwargs):
+            import numpy
+
+            warnings_errors = []
+            raw_parser = utils.tools.import_tool(
+                "raw_parser",
+                "%s.py" % Config.tools.get("ANA_WAVEFORM_PARSER"),
+                utils.normpath(os.path.join(REFLOW_DIR, "./analog/tools/parsers/")),
+            )
+            tc_dir = cwd.replace(utils.get_tmp_folder_name("batch", "/"), "")
+            waves = raw_parser.load_raw(tc_dir)
+            for script in scripts:
+                s = utils.tools.import_tool("tmp", script, tc_dir)
+                warnings_errors.append(s.main(waves))
+            return numpy.nansum(warnings_errors, axis=0)
+
+        if type is SimType.ANALOG:
+            return (pre_sim, post_sim)
+        return NO_CALLBACKS
+
+    # execute simulation
+    utils.tools.launch_tool(tool_name, "sim", _callbacks(), files, params)
+    return True
+
+
+def cov(cwd: str) -> bool:
+    """
+    code coverage of a simulation
+    """
+    type, files, params = prepare_task(cwd, type="cov")
+    # load the simulator script
+    if type is SimType.DIGITAL:
+        tool_name = Config.tools.get("DIG_COVERAGE")
+    else:
+        relog.error("cannot coverage mixed signal or analog simulations")
+        return False
+    # execute simulation
+    utils.tools.launch_tool(tool_name, "cov", NO_CALLBACKS, files, params)
+    return True
+
+
+ACTIONS = {"sim": sim, "cov": cov, "lint": lint}
+
+
+# ==== batch workers ====
+def warm_up():
+    """
+    import once the modules used by the tools in a worker process
+    """
+    import numpy
+    import common.rules
+    import common.executor
+
+
+def run_action(action: str, cwd: str, log: str = None) -> bool:
+    """
+    execute an action in a long-lived worker process:
+        - the working directory, the environment and the configuration
+          are those of cwd and restored afterwards
+        - the output of the action and of its sub-processes
+          is written in log if given
+    """
+    import common.read_sources as read_sources
+
+    env = dict(os.environ)
+    pwd = os.getcwd()
+    stdout, stderr = None, None
+    if log:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        stdout, stderr = os.dup(1), os.dup(2)
+        fd = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.dup2(fd, 1)
+        os.dup2(fd, 2)
+        os.close(fd)
+    try:
+        os.chdir(cwd)
+        relog.step.counter = 0
+        # each action is a new run: without the logs of the previous one
+        relog.LOG_STATS.clear()
+        read_sources.clear_caches()
+        load_configs(cwd)
+        return ACTIONS[action](cwd)
+    except SystemExit as e:
+        return not e.code
+    except Exception:
+        traceback.print_exc()
+        return False
+    finally:
+        if log:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(stdout, 1)
+            os.dup2(stderr, 2)
+            os.close(stdout)
+            os.close(stderr)
+        os.chdir(pwd)
+        os.environ.clear()
+        os.environ.update(env)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+import os
+import json
+import sqlite3
+
+from collections.abc import Mapping, Sequence
+
+import common.utils as utils
+
+DB_NAME = "design.db"
+# bumped when the content of the rows changes
+DB_VERSION = 2
+
+DATABASES = {}
+
+
+def dumps(item) -> str:
+    return json.dumps(item.to_dict(), default=utils.json_encoder)
+
+
+class Rows:
+    """
+    rows of a table read by name and deserialized on first access
+    """
+
+    __slots__ = ["db", "table", "loader", "names", "loaded"]
+
+    def __init__(self, db, table: str, loader):
+        self.db = db
+        self.table = table
+        self.loader = loader
+        self.names = [
+            row[0]
+            for row in db.execute(
+                "SELECT t.name FROM %s t JOIN files f ON t.file = f.id "
+                "ORDER BY f.id, t.pos" % table
+            )
+        ]
+        self.loaded = {}
+
+    def load(self, name: str):
+        if name not in self.loaded:
+            row = self.db.execute(
+                "SELECT data FROM %s WHERE name = ?" % self.table, (name,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(name)
+            self.loaded[name] = self.loader(json.loads(row[0]))
+        return self.loaded[name]
+
+    def __len__(self):
+        return len(self.names)
+
+
+class LazyModules(Rows, Sequence):
+    """
+    modules of the design in the order of their files,
+    iterated as the list of modules of the former db.json
+    """
+
+    __slots__ = []
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.load(name) for name in self.names[i]]
+        return self.load(self.names[i])
+
+    def get(self, name: str, default=None):
+        try:
+            return self.load(name)
+        except KeyError:
+            return default
+
+
+class LazyLibs(Rows, Mapping):
+    """
+    libs of the design by name
+    """
+
+    __slots__ = []
+
+    def __getitem__(self, name: str):
+        return self.load(name)
+
+    def __iter__(self):
+        return iter(self.names)
+
+
+class DesignDB:
+    """
+    modules and libs of the design stored in a sqlite database
+    (<work dir>/design.db) with the path, mtime, size and hash of the
+    file they come from: a file is only parsed again when its content changed
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        with self.db:
+            if version != DB_VERSION:
+                for table in ("files", "modules", "libs"):
+                    self.db.execute("DROP TABLE IF EXISTS %s" % table)
+                self.db.execute("PRAGMA user_version = %d" % DB_VERSION)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime INTEGER, size INTEGER, "
+                "hash TEXT, key TEXT, includes TEXT, timescales TEXT, outputs TEXT)"
+            )
+            for table in ("modules", "libs"):
+                self.db.execute(
+                    "CREATE TABLE IF NOT EXISTS %s ("
+                    "name TEXT PRIMARY KEY, file INTEGER, pos INTEGER, data TEXT)" % table
+                )
+                self.db.execute(
+                    "CREATE INDEX IF NOT EXISTS %s_file ON %s (file)" % (table, table)
+                )
+
+    def lookup(self, path: str, key: str = "") -> tuple:
+        """
+        row of a file parsed with the same key (ex: sheet name)
+        if it did not change, otherwise None
+        the hash is only computed when the mtime or the size changed
+        """
+        path = os.path.abspath(path)
+        row = self.db.execute(
+            "SELECT id, mtime, size, hash, key, includes, timescales, outputs "
+            "FROM files WHERE path = ?",
+            (path,),
+        ).fetchone()
+        if row is None or row[4] != key:
+            return None
+        st = os.stat(path)
+        if (row[1], row[2]) == (st.st_mtime_ns, st.st_size):
+            return row
+        # touched but not modified
+        if row[3] != utils.files.hash_file(path):
+            return None
+        with self.db:
+            self.db.execute(
+                "UPDATE files SET mtime = ?, size = ? WHERE id = ?",
+                (st.st_mtime_ns, st.st_size, row[0]),
+            )
+        return row
+
+    def update(
+        self,
+        path: str,
+        key: str = "",
+        modules: list = (),
+        libs: list = (),
+        includes: list = (),
+        timescales: list = (),
+        outputs: list = (),
+    ):
+        """
+        replace what is recorded for a file by the modules and libs
+        (objects with a name and to_dict) parsed from it
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        values = (
+            st.st_mtime_ns,
+            st.st_size,
+            utils.files.hash_file(path),
+            key,
+            json.dumps(list(includes)),
+            json.dumps(list(timescales)),
+            json.dumps(list(outputs)),
+        )
+        # the id of a file is kept to preserve the order of the modules
+        with self.db:
+            self.db.execute(
+                "INSERT INTO files "
+                "(path, mtime, size, hash, key, includes, timescales, outputs) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET "
+                "mtime = ?, size = ?, hash = ?, key = ?, includes = ?, "
+                "timescales = ?, outputs = ?",
+                (path,) + values + values,
+            )
+            (file_id,) = self.db.execute(
+                "SELECT id FROM files WHERE path = ?", (path,)
+            ).fetchone()
+            for table, items in (("modules", modules), ("libs", libs)):
+                self.db.execute("DELETE FROM %s WHERE file = ?" % table, (file_id,))
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO %s VALUES (?, ?, ?, ?)" % table,
+                    (
+                        (item.name, file_id, pos, dumps(item))
+                        for pos, item in enumerate(items)
+                    ),
+                )
+
+    def collect(self, column: str) -> list:
+        """
+        concatenation of the json lists of a column of the files
+        """
+        ans = []
+        for (value,) in self.db.execute("SELECT %s FROM files ORDER BY id" % column):
+            ans.extend(json.loads(value))
+        return ans
+
+    def modules(self, loader) -> LazyModules:
+        """
+        modules deserialized by loader when they are accessed
+        """
+        return LazyModules(self.db, "modules", loader)
+
+    def libs(self, loader) -> LazyLibs:
+        return LazyLibs(self.db, "libs", loader)
+
+    def close(self):
+        self.db.close()
+
+
+def open_db(output_dir: str) -> DesignDB:
+    """
+    design database of a working directory shared by the rules of a process
+    """
+    path = os.path.join(output_dir, DB_NAME)
+    if path not in DATABASES:
+        os.makedirs(output_dir, exist_ok=True)
+        DATABASES[path] = DesignDB(path)
+    return DATABASES[path]
+
+
+def close_dbs():
+    """
+    close the design databases opened by the previous rules of a process
+    """
+    for db in DATABASES.values():
+        db.close()
+    DATABASES.clear()
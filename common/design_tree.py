@@ -2,6 +2,8 @@
 import os
 import sys
 
+from collections import Counter
+
 import common.relog as relog
 import common.utils as utils
 import common.verilog as verilog
@@ -9,31 +11,281 @@ import common.verilog as verilog
 
 DEFAULT_TMPDIR = os.path.join(os.getcwd(), ".tmp_sim")
 TOOL_DIR = os.path.dirname(os.path.abspath(__file__))
+DESIGN_MIMES = ("VERILOG", "SYSTEM_VERILOG", "VERILOG_AMS")
+# package of the logger added to the files of the simulations
+LOG_PACKAGE = os.path.realpath(os.path.join(TOOL_DIR, "../digital/packages/log.svh"))
 
 
-def main(files, params):
-    # list modules and instances
-    for file, mime in files:
-        f = file.strip()
-        print("\n%s: " % file)
-        print(''.join(['-'] * (len(file) + 1)))
-        for m in verilog.find_modules(f):
-            module = verilog.Module(m[0])
-            if m[1]:
-                module.parse_parameters(m[1])
-            module.parse_pins(m[2])
-            module.parse_parameters(m[-1])
-            module.parse_pins(m[-1])
-            print(module)
-        for i in verilog.find_instances(f):
-            if i[1]:
-                instance = verilog.Instance(i[2], i[0])
-                instance.parse_parameters(i[1])
+class Stats:
+    """
+    statistics of the subtree of a module (the module included)
+    """
+
+    __slots__ = ["instances", "depth", "modules", "files", "unresolved"]
+
+    def __init__(self):
+        self.instances = 0
+        self.depth = 1
+        self.modules = set()
+        self.files = set()
+        # module name -> number of instances
+        self.unresolved = Counter()
+
+    def __str__(self):
+        return "%d instances, %d modules, %d files, depth %d" % (
+            self.instances,
+            len(self.modules),
+            len(self.files),
+            self.depth,
+        )
+
+
+class Hierarchy:
+    """
+    module -> instance -> module tree of a design elaborated from its top modules
+
+    the statistics are computed once per module and not per instance
+    so that netlists of millions of instances are elaborated in linear time
+    """
+
+    __slots__ = ["modules", "files", "tops", "stats", "unused", "unresolved", "cycles"]
+
+    def __init__(self, files: list, top: str = None):
+        # module name -> module and file declaring it
+        self.modules = {}
+        self.files = {}
+        for path in files:
+            for module in verilog.index_file(path).modules:
+                self.modules[module.name] = module
+                self.files[module.name] = path
+        if top is None:
+            instanciated = set()
+            for module in self.modules.values():
+                instanciated.update(i.module_name for i in module.instances)
+            self.tops = [name for name in self.modules if name not in instanciated]
+        else:
+            self.tops = [top]
+        self.stats = {}
+        self.cycles = set()
+        for name in self.tops:
+            self.elaborate(name)
+        # a module declared but not in the tree of the tops
+        reached = set()
+        self.unresolved = Counter()
+        for name in self.tops:
+            stats = self.stats.get(name)
+            if stats is not None:
+                reached |= stats.modules
+                self.unresolved.update(stats.unresolved)
+            else:
+                self.unresolved[name] += 1
+        self.unused = [name for name in self.modules if name not in reached]
+        # detect the recursive instanciations outside of the tree as well
+        for name in self.unused:
+            self.elaborate(name)
+
+    def elaborate(self, top: str):
+        """
+        statistics of the modules of the subtree of top in post order
+        """
+        if top not in self.modules or top in self.stats:
+            return
+        # stack of (module name, instances per module, children to visit)
+        counts = self.children(top)
+        stack = [(top, counts, iter(counts))]
+        visiting = {top}
+        while stack:
+            name, counts, children = stack[-1]
+            for child in children:
+                if child in visiting:
+                    self.cycles.add((name, child))
+                elif child in self.modules and child not in self.stats:
+                    visiting.add(child)
+                    counts = self.children(child)
+                    stack.append((child, counts, iter(counts)))
+                    break
+            else:
+                stack.pop()
+                visiting.discard(name)
+                self.stats[name] = self.subtree(name, counts)
+
+    def children(self, name: str) -> Counter:
+        """
+        number of instances of each module in a module
+        """
+        return Counter(i.module_name for i in self.modules[name].instances)
+
+    def subtree(self, name: str, counts: Counter) -> Stats:
+        stats = Stats()
+        stats.modules.add(name)
+        stats.files.add(self.files[name])
+        for child, count in counts.items():
+            stats.instances += count
+            sub = self.stats.get(child)
+            if sub is None:
+                # unresolved or part of a cycle
+                if child not in self.modules:
+                    stats.unresolved[child] += count
+                continue
+            stats.instances += count * sub.instances
+            stats.depth = max(stats.depth, sub.depth + 1)
+            stats.modules |= sub.modules
+            stats.files |= sub.files
+            for k, v in sub.unresolved.items():
+                stats.unresolved[k] += count * v
+        return stats
+
+    def walk(self, top: str = None, max_depth: int = None):
+        """
+        elaborated instances of the tree in depth first order
+        yield (depth, hierarchical name, instance)
+        """
+        for root in [top] if top else self.tops:
+            if root not in self.modules:
+                continue
+            stack = [(1, root, root, i) for i in reversed(self.modules[root].instances)]
+            while stack:
+                depth, parent, name, instance = stack.pop()
+                path = "%s.%s" % (parent, instance.name)
+                yield depth, path, instance
+                child = instance.module_name
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                # do not loop on recursive instanciations
+                if child in self.modules and (name, child) not in self.cycles:
+                    instances = self.modules[child].instances
+                    stack.extend((depth + 1, path, child, i) for i in reversed(instances))
+
+    def parameters(self, top: str = None):
+        """
+        elaborated instances with the values of the parameters of their module
+        given by the overrides of the instances from the values of the parent
+        yield (hierarchical name, instance, parameters)
+        """
+        for root in [top] if top else self.tops:
+            if root not in self.modules:
+                continue
+            params, _ = self.modules[root].resolve()
+            instances = self.modules[root].instances
+            stack = [(root, root, params, i) for i in reversed(instances)]
+            while stack:
+                parent, name, scope, instance = stack.pop()
+                path = "%s.%s" % (parent, instance.name)
+                module = self.modules.get(instance.module_name)
+                if module is None:
+                    yield path, instance, {}
+                    continue
+                # resolved once per module and set of overridden parameters
+                params, _ = module.resolve(instance.overrides(module, scope))
+                yield path, instance, params
+                if (name, module.name) not in self.cycles:
+                    stack.extend(
+                        (path, module.name, params, i) for i in reversed(module.instances)
+                    )
+
+    def find(self, modules: list, top: str = None) -> list:
+        """
+        hierarchical names of the instances of the given modules
+        return a list of (module name, hierarchical name)
+        """
+        modules = set(modules)
+        return [
+            (instance.module_name, path)
+            for _, path, instance in self.walk(top)
+            if instance.module_name in modules
+        ]
+
+    def files_of(self, top: str) -> list:
+        """
+        files declaring the modules of the subtree of top
+        """
+        stats = self.stats.get(top)
+        return sorted(stats.files) if stats else []
+
+
+def top_module(params: dict) -> str:
+    """
+    name of the first module of the TOP_MODULE file if any
+    """
+    path = params.get("TOP_MODULE")
+    if path and os.path.isfile(path):
+        modules = verilog.index_file(path).modules
+        if modules:
+            return modules[0].name
+    return None
+
+
+def elaborate(files: list, params: dict = {}, top: str = None) -> Hierarchy:
+    """
+    hierarchy of the verilog files of a design from its top
+    Args:
+    - files: list of (path, mime) as listed by read_sources
+    - params: parameters giving the TOP_MODULE file
+    - top: name of the top module (default: TOP_MODULE or the modules never instanciated)
+    """
+    paths = [f.strip() for f, m in files if m in DESIGN_MIMES]
+    # the logger is not part of the design: log_service would be a top never instanciated
+    paths = [f for f in paths if os.path.realpath(f) != LOG_PACKAGE]
+    return Hierarchy(paths, top or top_module(params))
+
+
+def entries(hierarchy: Hierarchy, name: str, detailed: set):
+    """
+    lines describing the instances of a module and the module
+    whose subtree is detailed after each line, the subtree of a module
+    is only detailed once and the instances of unresolved modules
+    (cells, primitives, ...) are counted
+    """
+    cells = Counter()
+    for instance in hierarchy.modules[name].instances:
+        child = instance.module_name
+        sub = hierarchy.stats.get(child)
+        if sub is None:
+            cells[child] += 1
+        elif child in detailed:
+            yield "%s: %s [see above]" % (instance.name, child), None
+        else:
+            detailed.add(child)
+            yield "%s: %s (%s)" % (instance.name, child, sub), child
+    for child, count in cells.items():
+        yield "%s x %d (unresolved)" % (child, count), None
+
+
+def display(hierarchy: Hierarchy):
+    """
+    print the tree of instances from the tops and a summary
+    """
+    detailed = set()
+    for top in hierarchy.tops:
+        stats = hierarchy.stats.get(top)
+        if stats is None:
+            relog.error("top module %s is not declared" % top)
+            continue
+        print("%s (%s)" % (top, stats))
+        detailed.add(top)
+        stack = [(1, entries(hierarchy, top, detailed))]
+        while stack:
+            depth, lines = stack[-1]
+            for line, child in lines:
+                print("%s%s" % ("  " * depth, line))
+                if child:
+                    stack.append((depth + 1, entries(hierarchy, child, detailed)))
+                    break
             else:
-                instance = verilog.Instance(i[2], i[0])
-            print(instance)
-        for include in verilog.find_includes(f):
-            print("H ", include)
+                stack.pop()
+    for parent, child in hierarchy.cycles:
+        relog.error("recursive instanciation of %s in %s" % (child, parent))
+    for name, count in sorted(hierarchy.unresolved.items()):
+        relog.warning("%s is not declared (%d instances)" % (name, count))
+    for name in hierarchy.unused:
+        relog.note(
+            "%s is declared in %s but never instanciated" % (name, hierarchy.files[name])
+        )
+
+
+def main(files, params):
+    hierarchy = elaborate(files, params)
+    display(hierarchy)
 
 
 if __name__ == "__main__":
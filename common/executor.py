@@ -2,18 +2,92 @@
 # coding: utf-8
 
 import os
+import re
 import sys
 import shlex
+import signal
+import asyncio
+import threading
 import subprocess
 import traceback
+import configparser
 import common.relog as relog
 
+from common.read_config import Config
 
-def sh_exec(
+
+# size of the chunks read from the output of a process
+CHUNK_SIZE = 1 << 16
+# delay given to a process group to terminate before being killed
+KILL_GRACE = 5
+# tags of the lines reformatted for the console
+FORMAT_TAGS = re.compile(r"info:|warning:|note:|error:|fatal:", re.IGNORECASE)
+FORMAT_TIME = re.compile(r"time:", re.IGNORECASE)
+
+
+def timeout(tool: str) -> int:
+    """
+    time limit in seconds of the runs of a tool given by TIMEOUT
+    in the section of the tool or in [reflow] (no limit by default)
+    """
+    data = Config.data
+    if not isinstance(data, configparser.ConfigParser):
+        return -1
+    for section in (tool, "reflow"):
+        if data.has_option(section, "TIMEOUT"):
+            try:
+                return int(data.get(section, "TIMEOUT"))
+            except ValueError:
+                relog.error("TIMEOUT of [%s] should be a number of seconds" % section)
+    return -1
+
+
+async def _kill(proc):
+    """
+    terminate the process and its children, then kill
+    them if they are still alive after KILL_GRACE seconds
+    """
+    if os.name == "nt":
+        proc.kill()
+        return await proc.wait()
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        await asyncio.wait_for(proc.wait(), KILL_GRACE)
+    except (ProcessLookupError, asyncio.TimeoutError):
+        pass
+    # children may survive their parent
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    return await proc.wait()
+
+
+def _kill_group(proc, expired: threading.Event = None):
+    """
+    blocking counterpart of _kill for the processes of ish_exec
+    """
+    if expired is not None:
+        expired.set()
+    if os.name == "nt":
+        return proc.kill()
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(KILL_GRACE)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        pass
+    # children may survive their parent
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def async_sh_exec(
     cmd: str,
     log: str = None,
     mode: str = "w+",
-    MAX_TIMEOUT: int = 300,
+    MAX_TIMEOUT: int = -1,
     SHOW_CMD: bool = False,
     SHELL: bool = False,
     CWD: str = None,
@@ -22,73 +96,129 @@ def sh_exec(
     NOOUT: bool = False,
 ):
     """
-    simplify code for executing shell command
+    execute a shell command in an event loop
+
+    the output is copied by chunks of lines in the console and in
+    the log (without color codes), log being a path or a stream
+
+    if the command does not end within MAX_TIMEOUT seconds (by default,
+    None or <= 0 there is no limit), the command and its children are killed
     """
-    tokens = shlex.split(cmd)
     encoding = "iso-8859-1" if "nt" in os.name else "utf-8"
     try:
-        if CWD is None and ENV is None:
-            proc = subprocess.Popen(
-                tokens,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE if NOERR else subprocess.STDOUT,
-                shell=SHELL,
-            )
-        elif ENV is None:
-            proc = subprocess.Popen(
-                tokens,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE if NOERR else subprocess.STDOUT,
-                shell=SHELL,
-                cwd=CWD,
-            )
+        kwargs = dict(
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL if NOERR else asyncio.subprocess.STDOUT,
+            cwd=CWD,
+            env=ENV,
+            # in its own process group to be killed with its children
+            start_new_session=os.name != "nt",
+        )
+        if SHELL:
+            proc = await asyncio.create_subprocess_shell(cmd, **kwargs)
         else:
-            proc = subprocess.Popen(
-                tokens,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE if NOERR else subprocess.STDOUT,
-                shell=SHELL,
-                cwd=CWD,
-                env=ENV,
-            )
-        if log is not None:
-            if isinstance(log, str):
-                fp = open(log, mode)
-            else:
-                fp = log
-            if SHOW_CMD:
-                fp.write("%s\n" % cmd)
-            for line in proc.stdout:
-                if not NOOUT:
-                    sys.stdout.write(format_line(line.decode(encoding)))
-                # remove color code of log.vh amond other things
-                content = list(relog.filter_stream(line))
-                if content:
-                    fp.write("%s\n" % content[0])
-            if isinstance(log, str):
-                fp.close()
-        elif not NOOUT:
-            for line in proc.stdout:
-                sys.stdout.write(format_line(line.decode(encoding)))
-        proc.stdout.close()
-        return_code = proc.wait()
-        if return_code:
-            raise subprocess.CalledProcessError(return_code, cmd)
-    except (OSError, subprocess.CalledProcessError) as e:
+            proc = await asyncio.create_subprocess_exec(*shlex.split(cmd), **kwargs)
+    except OSError:
         traceback.print_exc()
         return False
-    except subprocess.TimeoutExpired:
-        relog.error("Unexpected executer timeout")
+    fp, offset = None, 0
+    # remove color code of log.vh amond other things
+    log_filter = relog.LogFilter(encoding)
+    if log is not None:
+        fp = open(log, mode) if isinstance(log, str) else log
+        offset = fp.tell() if isinstance(log, str) else 0
+        if SHOW_CMD:
+            fp.write(log_filter.feed(("%s\n" % cmd).encode(encoding)))
+
+    async def _stream():
+        pending = b""
+        while True:
+            chunk = await proc.stdout.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            # only process complete lines
+            pending += chunk
+            end = pending.rfind(b"\n") + 1
+            if end:
+                _write(pending[:end])
+                pending = pending[end:]
+        if pending:
+            _write(pending + b"\n")
+        return await proc.wait()
+
+    def _write(lines: bytes):
+        if not NOOUT:
+            text = lines.decode(encoding, errors="replace")
+            sys.stdout.write("".join(map(format_line, text.splitlines(True))))
+            sys.stdout.flush()
+        if fp is not None:
+            fp.write(log_filter.feed(lines))
+
+    timeout = MAX_TIMEOUT if MAX_TIMEOUT and MAX_TIMEOUT > 0 else None
+    try:
+        return_code = await asyncio.wait_for(_stream(), timeout)
+    except asyncio.TimeoutError:
+        relog.error("'%s' timed out after %d s" % (cmd, MAX_TIMEOUT))
+        await _kill(proc)
         return False
-    else:
-        return True
+    finally:
+        if isinstance(log, str):
+            fp.close()
+            # counters of severities for relog.get_stats
+            log_filter.register(log, offset)
+    if return_code:
+        relog.error("'%s' returned non-zero exit status %d" % (cmd, return_code))
+        return False
+    return True
+
+
+def sh_exec(
+    cmd: str,
+    log: str = None,
+    mode: str = "w+",
+    MAX_TIMEOUT: int = -1,
+    SHOW_CMD: bool = False,
+    SHELL: bool = False,
+    CWD: str = None,
+    ENV: object = None,
+    NOERR: bool = False,
+    NOOUT: bool = False,
+):
+    """
+    simplify code for executing shell command
+    """
+    return asyncio.run(
+        async_sh_exec(
+            cmd, log, mode, MAX_TIMEOUT, SHOW_CMD, SHELL, CWD, ENV, NOERR, NOOUT
+        )
+    )
+
+
+def sh_exec_all(cmds: list, logs: list = None, **kwargs) -> list:
+    """
+    execute several shell commands concurrently in one event loop
+    Args:
+        cmds (list): commands to execute
+        logs (list): log of each command (None for no log)
+        kwargs: options of sh_exec applied to all commands
+    Returns:
+        list of the success of each command
+    """
+    logs = logs or [None] * len(cmds)
+
+    async def _gather():
+        return await asyncio.gather(
+            *(async_sh_exec(cmd, log, **kwargs) for cmd, log in zip(cmds, logs))
+        )
+
+    return list(asyncio.run(_gather()))
 
 
 def ish_exec(
     cmd: str,
     log: str = None,
     mode: str = "w+",
-    MAX_TIMEOUT: int = 300,
+    MAX_TIMEOUT: int = -1,
     SHOW_CMD: bool = False,
     SHELL: bool = False,
     CWD: str = None,
@@ -97,33 +227,30 @@ def ish_exec(
 ):
     """
     simplify code for executing shell command
+    the process is yielded to be watched by the caller, then its output
+    is copied once resumed and the generator returns its success
+
+    if the command does not end within MAX_TIMEOUT seconds (by default,
+    None or <= 0 there is no limit), the command and its children are killed
+    closing the generator before its end cancels the time limit
     """
     tokens = shlex.split(cmd)
+    timer, expired = None, threading.Event()
     try:
-        if CWD is None and ENV is None:
-            proc = subprocess.Popen(
-                tokens,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE if NOERR else subprocess.STDOUT,
-                shell=SHELL,
-            )
-        elif ENV is None:
-            proc = subprocess.Popen(
-                tokens,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE if NOERR else subprocess.STDOUT,
-                shell=SHELL,
-                cwd=CWD,
-            )
-        else:
-            proc = subprocess.Popen(
-                tokens,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE if NOERR else subprocess.STDOUT,
-                shell=SHELL,
-                cwd=CWD,
-                env=ENV,
-            )
+        proc = subprocess.Popen(
+            tokens,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE if NOERR else subprocess.STDOUT,
+            shell=SHELL,
+            cwd=CWD,
+            env=ENV,
+            # in its own process group to be killed with its children
+            start_new_session=os.name != "nt",
+        )
+        if MAX_TIMEOUT and MAX_TIMEOUT > 0:
+            timer = threading.Timer(MAX_TIMEOUT, _kill_group, (proc, expired))
+            timer.daemon = True
+            timer.start()
         yield proc
         if log is not None:
             with open(log, mode) as fp:
@@ -140,6 +267,9 @@ def ish_exec(
                 sys.stdout.write(format_line(line.decode("utf-8")))
         proc.stdout.close()
         return_code = proc.wait()
+        if expired.is_set():
+            relog.error("'%s' timed out after %d s" % (cmd, MAX_TIMEOUT))
+            return False
         if return_code:
             raise subprocess.CalledProcessError(return_code, cmd)
     except (OSError, subprocess.CalledProcessError):
@@ -149,16 +279,17 @@ def ish_exec(
         return False
     else:
         return True
+    finally:
+        if timer is not None:
+            timer.cancel()
 
 
 def format_line(line: str) -> str:
     # iverilog file info from log
-    tags = ["info:", "warning:", "note:", "error:", "fatal:"]
-    l = line[: min(32, len(line))].casefold()
-    if any([l.find(tag) >= 0 for tag in tags]):
+    if FORMAT_TAGS.search(line, 0, 32):
         l = line.split(":", 3)
         return ": ".join((l[0], l[-1]))
     # remove log.svh second line giving time and scope info
-    if l.find("time:") >= 0:
+    if FORMAT_TIME.search(line, 0, 32):
         return ""
     return line
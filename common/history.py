@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+import sqlite3
+import threading
+
+from pathlib import Path
+from datetime import datetime
+
+import common.relog as relog
+
+
+def create_table(db: sqlite3.Connection):
+    with db:
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "name TEXT, duration REAL, warnings INTEGER, errors INTEGER, date TEXT)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS runs_name ON runs (name)")
+
+
+class History:
+    """
+    persistent record of the execution time of batch tasks
+    stored in a sqlite database (<batch work dir>/history.db)
+
+    as the locks of sqlite are unreliable on network file systems,
+    each shard of a batch only writes its own database: the records
+    of the others are read once at start and queried in memory
+    """
+
+    def __init__(self, path: str, others: list = ()):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.records = sqlite3.connect(":memory:", check_same_thread=False)
+        create_table(self.db)
+        create_table(self.records)
+        self.load(self.db)
+        for other in others:
+            try:
+                db = sqlite3.connect(
+                    "%s?mode=ro" % Path(other).resolve().as_uri(), timeout=30, uri=True
+                )
+                try:
+                    self.load(db)
+                finally:
+                    db.close()
+            except sqlite3.Error as e:
+                relog.warning("%s is ignored: %s" % (other, e))
+
+    def load(self, db: sqlite3.Connection):
+        """
+        copy the records of a database in memory
+        """
+        rows = db.execute("SELECT * FROM runs").fetchall()
+        with self.records:
+            self.records.executemany("INSERT INTO runs VALUES (?, ?, ?, ?, ?)", rows)
+
+    def record(self, name: str, stats: dict):
+        """
+        store the stats read from the <action>.stats of a task
+        """
+        row = (
+            name,
+            stats.get("Sim. Time", 0),
+            stats.get("Warnings", 0),
+            stats.get("Errors", 0),
+            datetime.now().isoformat(),
+        )
+        with self.lock:
+            for db in (self.db, self.records):
+                with db:
+                    db.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)", row)
+
+    def expected(self, name: str, last: int = 5) -> float:
+        """
+        expected duration in ms of a task from its last executions
+        return None if the task has never been executed
+        """
+        with self.lock:
+            rows = self.records.execute(
+                "SELECT duration FROM runs WHERE name = ? ORDER BY date DESC LIMIT ?",
+                (name, last),
+            ).fetchall()
+        if not rows:
+            return None
+        return sum(row[0] for row in rows) / len(rows)
+
+    def expected_rule(self, rule: str) -> float:
+        """
+        expected duration in ms of all the tasks of a batch rule
+        (tasks named <rule>:<action> or <rule>/<nested rule>:<action>)
+        return None if the rule has never been executed
+        """
+        # escape wildcards of LIKE in the rule name
+        pattern = rule.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self.lock:
+            rows = self.records.execute(
+                "SELECT AVG(duration) FROM runs "
+                "WHERE name LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\' GROUP BY name",
+                ("%s:%%" % pattern, "%s/%%" % pattern),
+            ).fetchall()
+        if not rows:
+            return None
+        return sum(row[0] for row in rows)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+            self.records.close()
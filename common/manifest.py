@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+import configparser
+
+import common.relog as relog
+import common.utils as utils
+import common.read_sources as read_sources
+
+from common.read_config import MetaConfig, locate_config_files
+
+
+# tools involved in each action of a batch
+ACTION_TOOLS = {
+    "sim": ["DIG_SIMULATOR", "ANA_SIMULATOR"],
+    "cov": ["DIG_COVERAGE"],
+    "lint": ["DIG_LINTER"],
+}
+
+
+# ==== fingerprint of a testcase ====
+def _hash_file(h, path: str):
+    if os.path.isfile(path):
+        with open(path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(1 << 16), b""):
+                h.update(chunk)
+
+
+def _read_configs(config_files: list) -> configparser.ConfigParser:
+    config = configparser.ConfigParser(strict=False, interpolation=None)
+    for config_file in config_files:
+        try:
+            config.read_file(MetaConfig.lines_generator(config_file), config_file)
+        except configparser.MissingSectionHeaderError:
+            config.read_file(MetaConfig.lines_generator(config_file, True), config_file)
+    return config
+
+
+def _hash_tool(h, name: str):
+    """
+    the version of a tool is given by its wrapper in
+    reflow and the executable found in the $PATH
+    """
+    h.update(name.encode("utf-8"))
+    tool_path = utils.tools.find_tool(name)
+    if tool_path:
+        for file in sorted(os.listdir(tool_path)):
+            _hash_file(h, os.path.join(tool_path, file))
+    exe = shutil.which(name)
+    if exe:
+        st = os.stat(exe)
+        h.update(("%s:%d:%d" % (exe, st.st_mtime, st.st_size)).encode("utf-8"))
+
+
+# the caches of read_sources and utils.files are not thread-safe
+# and the fingerprints are computed by the threads of the scheduler
+FINGERPRINT_LOCK = threading.Lock()
+
+
+def fingerprint(cwd: str, action: str) -> str:
+    """
+    content hash of everything a simulation depends on:
+        - the files listed by the Sources.list and their parameters
+        - the headers they include directly or not
+        - the post-simulation scripts
+        - the configuration files
+        - the tools executing the action and their version
+    return None if the sources cannot be listed
+    """
+    with FINGERPRINT_LOCK:
+        return _fingerprint(cwd, action)
+
+
+def _fingerprint(cwd: str, action: str) -> str:
+    h = hashlib.sha1(action.encode("utf-8"))
+    try:
+        nodes = read_sources.read_sources(cwd, {}, observe=False)
+    except Exception:
+        return None
+    for node in nodes:
+        h.update(node.name.encode("utf-8"))
+        _hash_file(h, node.name)
+        for key, value in sorted(node.params.items()):
+            h.update(("%s=%s" % (key, value)).encode("utf-8"))
+        # the scripts are given relatively to the testcase
+        for script in node.params.get("POST_SIM", []):
+            _hash_file(h, utils.normpath(os.path.join(cwd, script)))
+    # headers not listed in the Sources.list
+    files = [node.name for node in nodes if utils.files.is_digital(node.name)]
+    for header in read_sources.include_graph().closure(files):
+        h.update(header.encode("utf-8"))
+        _hash_file(h, header)
+    default_config = utils.normpath(os.path.join(os.environ["REFLOW"], "./default.config"))
+    config_files = [default_config] + locate_config_files(cwd)
+    for config_file in config_files:
+        h.update(config_file.encode("utf-8"))
+        _hash_file(h, config_file)
+    config = _read_configs(config_files)
+    for tool in ACTION_TOOLS.get(action, []):
+        if config.has_option("tools", tool):
+            _hash_tool(h, config.get("tools", tool))
+    return h.hexdigest()
+
+
+# ==== manifest of passing simulations ====
+class Manifest:
+    """
+    record the fingerprint and the stats of passing
+    simulations in <batch work dir>/manifest.json
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as fp:
+                return json.load(fp)
+        except ValueError:
+            relog.warning("%s is corrupted and ignored" % self.path)
+            return {}
+
+    def lookup(self, name: str, fingerprint: str) -> dict:
+        """
+        return the stats of the previous run if it passed
+        with the same fingerprint otherwise None
+        """
+        with self.lock:
+            entry = self.entries.get(name)
+        if fingerprint is None or entry is None:
+            return None
+        if entry.get("fingerprint") != fingerprint:
+            return None
+        return entry.get("stats")
+
+    def update(self, name: str, fingerprint: str, stats: dict):
+        with self.lock:
+            # merge with entries written by concurrent batches
+            self.entries = {**self.load(), **self.entries}
+            self.entries[name] = {"fingerprint": fingerprint, "stats": stats}
+            tmp_path = "%s.%d" % (self.path, os.getpid())
+            with open(tmp_path, "w+") as fp:
+                json.dump(self.entries, fp, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
@@ -2,15 +2,30 @@
 
 import re
 import os
+import json
+import time
+import zlib
+import socket
+import hashlib
 import argparse
 import configparser
 
 import common.relog as relog
 import common.utils as utils
-import common.executor as executor
+import common.actions as actions
 
 from enum import Enum
+from pathlib import Path
+from datetime import datetime
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from common.scheduler import Scheduler
+from common.history import History
+from common.manifest import Manifest, fingerprint
+
+
+# stats of the shard i/N of a run in the batch working directory
+SHARD_STATS = "shard_%dof%d_%s.batch.stats"
 
 
 class SimType(Enum):
@@ -194,87 +209,509 @@ def read_batch(batch_file: str):
 
 
 def run(
-    cwd, batch, sim_only: bool = False, cov_only: bool = False, lint_only: bool = False
-):
-    N = len(batch.sections())
-    TMP_DIR = utils.get_tmp_folder()
-    # create directory for simulation
-    for k, rule in enumerate(batch):
+    cwd,
+    batch,
+    sim_only: bool = False,
+    cov_only: bool = False,
+    lint_only: bool = False,
+    jobs: int = 1,
+    incremental: bool = False,
+    shard: tuple = None,
+    run_id: str = None,
+) -> list:
+    """
+    run the simulations of the batch and return the
+    directories where their stats are written
+    """
+    # select which simulations should be performed
+    sim_only, cov_only, lint_only = (
+        sim_only and not cov_only and not lint_only,
+        cov_only and not sim_only and not lint_only,
+        lint_only and not cov_only and not sim_only,
+    )
+    if not sim_only and not cov_only and not lint_only:
+        sim_only, cov_only, lint_only = True, True, True
+    # skip simulations whose inputs did not change
+    manifest = None
+    if incremental:
+        manifest = Manifest(
+            utils.normpath(os.path.join(utils.get_tmp_folder(), "manifest.json"))
+        )
+    # durations of previous runs to start the longest simulations first
+    history = open_history(utils.get_tmp_folder(), shard)
+    # only keep the rules of the shard
+    if shard:
+        select_shard(batch, shard, history, utils.get_tmp_folder(), run_id)
+    # long-lived worker processes executing the simulations
+    with ProcessPoolExecutor(max_workers=jobs, initializer=actions.warm_up) as workers:
+        # the workers are forked on the first submit: fork them now, as forked
+        # later from the threads of the scheduler they could inherit a lock
+        # held by another thread (logging, relog) and deadlock
+        list(workers.map(abs, range(jobs)))
+        context = BatchContext(workers, jobs > 1, manifest, history)
+        scheduler = Scheduler(jobs)
+        schedule(
+            scheduler,
+            cwd,
+            batch,
+            utils.get_tmp_folder(),
+            (sim_only, cov_only, lint_only),
+            context,
+        )
+        relog.info(f"Run {len(scheduler.tasks)} tasks on {scheduler.jobs} workers")
+        scheduler.run()
+    history.close()
+    # stats are written in the directory of the rule or of the nested batch
+    roots = []
+    for rule in batch.sections():
         if batch.has_option(rule, "__path__"):
-            relog.info(f"[{k}/{N}] Run simulation {rule}")
             p = utils.normpath(os.path.join(cwd, batch.get(rule, "__path__")))
-            s = eval(batch.get(rule, "__sim_type__"))
-            o = utils.normpath(os.path.join(TMP_DIR, rule))
-            l = utils.normpath(os.path.join(o, "Sources.list"))
-            b = utils.normpath(os.path.join(p, "Batch.list"))
-            os.makedirs(o, exist_ok=True)
-            if not os.path.exists(b):
-                # create the Sources.list
-                with open(l, "w+") as fp:
-                    path = batch.get(rule, "__path__")
-                    dedent = "".join(["../"] * (2 + path.count("/")))
-                    fp.write("%s\n" % utils.normpath(os.path.join(dedent, path)))
-                    for option in batch.options(rule):
-                        if not option.startswith("__"):
-                            values = batch.get(rule, option, raw=True)
-                            if "[" in values:
-                                values = eval(values)
-                                fp.write(f"{option}={' '.join(values)}\n")
-                            else:
-                                fp.write(f"{option}={values}\n")
-            # select which simulations should be performed
-            batch_options = [
+            if os.path.exists(os.path.join(p, "Batch.list")):
+                roots.append(p)
+            else:
+                roots.append(utils.normpath(os.path.join(utils.get_tmp_folder(), rule)))
+    return roots
+
+
+def parse_shard(text: str) -> tuple:
+    """
+    parse a shard given as 'i/N' with 1 <= i <= N
+    """
+    try:
+        index, count = (int(v) for v in text.split("/", 1))
+    except ValueError:
+        raise ValueError("shard should be given as i/N: %s" % text)
+    if not 1 <= index <= count:
+        raise ValueError("shard index should be between 1 and %d: %s" % (count, text))
+    return index, count
+
+
+def shard_plan(rules: list, count: int, history: History = None) -> list:
+    """
+    partition the rules in count shards of balanced duration
+    the partition only depends on the rules and their history:
+        - longest rules are assigned first to the least loaded shard
+        - rules never executed last as long as the average one
+        - ties are broken by a stable hash of the rule name
+    """
+    costs = {rule: history.expected_rule(rule) if history else None for rule in rules}
+    known = [c for c in costs.values() if c is not None]
+    default = sum(known) / len(known) if known else 1.0
+    costs = {rule: default if c is None else c for rule, c in costs.items()}
+    plan = [[] for _ in range(count)]
+    loads = [0.0] * count
+    for rule in sorted(rules, key=lambda r: (-costs[r], zlib.crc32(r.encode()), r)):
+        i = loads.index(min(loads))
+        plan[i].append(rule)
+        loads[i] += costs[rule]
+    return plan
+
+
+def open_history(tmp_dir: str, shard: tuple = None) -> History:
+    """
+    history of the batch: a shard i/N writes in history_<i>of<N>.db
+    and reads the records of the other shards and of the whole runs
+    """
+    os.makedirs(tmp_dir, exist_ok=True)
+    name = "history_%dof%d.db" % shard if shard else "history.db"
+    path = utils.normpath(os.path.join(tmp_dir, name))
+    others = [
+        str(p) for p in sorted(Path(tmp_dir).glob("history*.db"))
+        if utils.normpath(str(p)) != path
+    ]
+    return History(path, others)
+
+
+def plan_path(tmp_dir: str, run_id: str) -> str:
+    return utils.normpath(os.path.join(tmp_dir, "shards", "%s.json" % run_id))
+
+
+def batch_rules(batch) -> list:
+    return [rule for rule in batch.sections() if batch.has_option(rule, "__path__")]
+
+
+def rules_digest(rules: list, count: int) -> str:
+    """
+    stable hash of the rules of a batch split in count shards
+    """
+    text = "%d:%s" % (count, ",".join(sorted(rules)))
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def select_shard(batch, shard: tuple, history: History, tmp_dir: str, run_id: str = None):
+    """
+    remove from the batch the rules not belonging to the shard
+
+    as the history evolves while shards are running, the first shard
+    of a run saves the partition in <tmp_dir>/shards/<run id>.json and
+    the other shards of the run reuse it
+    without an explicit run id (ex: the id of a CI pipeline), the run is
+    identified by the hash of the rules and the number of shards: the
+    partition is kept until the rules change
+    """
+    index, count = shard
+    rules = batch_rules(batch)
+    digest = rules_digest(rules, count)
+    run_id = run_id or digest
+    path = plan_path(tmp_dir, run_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        tmp_path = "%s.%s.%d" % (path, socket.gethostname(), os.getpid())
+        with open(tmp_path, "w+") as fp:
+            plan = shard_plan(rules, count, history)
+            json.dump({"rules": digest, "count": count, "shards": plan}, fp, indent=2)
+        # atomic creation: keep the plan of the first shard
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        os.remove(tmp_path)
+    with open(path, "r") as fp:
+        plan = json.load(fp)
+    if plan["rules"] != digest:
+        raise ValueError("the rules or the number of shards of the run %s changed" % run_id)
+    selected = plan["shards"][index - 1]
+    relog.info(f"Shard {index}/{count} of {run_id}: {len(selected)} of {len(rules)} rules")
+    for rule in rules:
+        if rule not in selected:
+            batch.remove_section(rule)
+
+
+class BatchContext:
+    """
+    objects shared by the tasks of a batch
+        - workers: pool of processes executing the simulations
+        - isolated: write the output of each simulation in a log file
+        - manifest: record of passing simulations for incremental runs
+        - history: record of the duration of the simulations
+    """
+
+    __slots__ = ["workers", "isolated", "manifest", "history"]
+
+    def __init__(
+        self,
+        workers: ProcessPoolExecutor,
+        isolated: bool = False,
+        manifest: Manifest = None,
+        history: History = None,
+    ):
+        self.workers = workers
+        self.isolated = isolated
+        self.manifest = manifest
+        self.history = history
+
+
+def schedule(
+    scheduler: Scheduler,
+    cwd: str,
+    batch,
+    tmp_dir: str,
+    selection: tuple,
+    context: BatchContext,
+    prefix: str = "",
+) -> list:
+    """
+    add the simulations of each rule of the batch in the task graph
+        - cov of a rule is executed after its sim (needs the waveforms)
+        - lint of a rule does not depend on anything
+        - nested Batch.list are expanded in the same graph
+    Args:
+        - scheduler: task graph to populate
+        - cwd: directory of the Batch.list
+        - batch: the normalized batch description
+        - tmp_dir: working directory of the batch
+        - selection: (sim, cov, lint) simulations to perform
+        - context: objects shared by the tasks
+        - prefix: prefix of the task names for nested batches
+    Returns:
+        list of tasks added to the graph
+    """
+    sim_only, cov_only, lint_only = selection
+    tasks = []
+
+    def expected(name: str) -> float:
+        return context.history.expected(name) if context.history else None
+
+    for rule in batch:
+        if not batch.has_option(rule, "__path__"):
+            continue
+        p = utils.normpath(os.path.join(cwd, batch.get(rule, "__path__")))
+        s = eval(batch.get(rule, "__sim_type__"))
+        o = utils.normpath(os.path.join(tmp_dir, rule))
+        l = utils.normpath(os.path.join(o, "Sources.list"))
+        b = utils.normpath(os.path.join(p, "Batch.list"))
+        # expand nested batch in the graph
+        if os.path.exists(b):
+            t_start = time.time() * 1000.0
+            nested_tmp_dir = utils.normpath(
+                os.path.join(p, utils.get_tmp_folder_name("batch", "./"))
+            )
+            nested = schedule(
+                scheduler,
+                p,
+                read_batch(p),
+                nested_tmp_dir,
+                selection,
+                context,
+                "%s%s/" % (prefix, rule),
+            )
+            tasks.extend(nested)
+            # the batch.stats of the nested batch is written once all done
+            tasks.append(
+                scheduler.add(
+                    "%s%s:stats" % (prefix, rule),
+                    finalize_batch,
+                    p,
+                    nested_tmp_dir,
+                    t_start,
+                    deps=nested,
+                    always=True,
+                )
+            )
+            continue
+        os.makedirs(o, exist_ok=True)
+        # create the Sources.list
+        with open(l, "w+") as fp:
+            path = batch.get(rule, "__path__")
+            dedent = "".join(["../"] * (2 + path.count("/")))
+            fp.write("%s\n" % utils.normpath(os.path.join(dedent, path)))
+            for option in batch.options(rule):
+                if not option.startswith("__"):
+                    values = batch.get(rule, option, raw=True)
+                    if "[" in values:
+                        values = eval(values)
+                        fp.write(f"{option}={' '.join(values)}\n")
+                    else:
+                        fp.write(f"{option}={values}\n")
+        # create the tasks and their dependencies
+        sim = None
+        if sim_only and s in [SimType.SIMULATION, SimType.ALL]:
+            name = "%s%s:sim" % (prefix, rule)
+            sim = scheduler.add(
+                name,
+                run_task,
+                name,
                 "sim",
-                "cov" if cov_only else "",
-                "lint" if lint_only else "",
-            ]
-            sim_only, cov_only, lint_only = (
-                sim_only and not cov_only and not lint_only,
-                cov_only and not sim_only and not lint_only,
-                lint_only and not cov_only and not sim_only,
+                o,
+                context,
+                cost=expected(name),
             )
-            if not sim_only and not cov_only and not lint_only:
-                sim_only, cov_only, lint_only = True, True, True
-            # run the simulations
-            run_path = utils.normpath(os.getenv("REFLOW") + "/envs/bin/run")
-            if os.path.exists(b):
-                for batch_option in batch_options:
-                    if batch_option:
-                        executor.sh_exec(
-                            "python3 '%s' batch %s" % (run_path, batch_option),
-                            CWD=p,
-                            ENV=os.environ.copy(),
-                        )
-            else:
-                if sim_only and s in [SimType.SIMULATION, SimType.ALL]:
-                    executor.sh_exec(
-                        "python3 '%s' sim" % run_path,
-                        CWD=o,
-                        ENV=os.environ.copy(),
-                        SHELL=True,
-                    )
-                if cov_only and s in [SimType.COVERAGE, SimType.ALL]:
-                    executor.sh_exec(
-                        "python3 '%s' cov" % run_path,
-                        CWD=o,
-                        ENV=os.environ.copy(),
-                        SHELL=True,
-                    )
-                if lint_only and s in [SimType.LINT, SimType.ALL]:
-                    executor.sh_exec(
-                        "python3 '%s' lint" % run_path,
-                        CWD=o,
-                        ENV=os.environ.copy(),
-                        SHELL=True,
-                    )
-
-
-def main(cwd, sim_only: bool = False, cov_only: bool = False, lint_only: bool = False):
+            tasks.append(sim)
+        if cov_only and s in [SimType.COVERAGE, SimType.ALL]:
+            name = "%s%s:cov" % (prefix, rule)
+            tasks.append(
+                scheduler.add(
+                    name,
+                    run_task,
+                    name,
+                    "cov",
+                    o,
+                    context,
+                    deps=[sim] if sim else [],
+                    cost=expected(name),
+                )
+            )
+        if lint_only and s in [SimType.LINT, SimType.ALL]:
+            name = "%s%s:lint" % (prefix, rule)
+            tasks.append(
+                scheduler.add(
+                    name,
+                    run_task,
+                    name,
+                    "lint",
+                    o,
+                    context,
+                    cost=expected(name),
+                )
+            )
+    return tasks
+
+
+def read_stats(path: str) -> dict:
+    """
+    read the numerical values of a <action>.stats file
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r+") as fp:
+        db_sim = dict(
+            (line.split(":", 1) for i, line in enumerate(fp) if ":" in line and i > 0)
+        )
+    try:
+        return {
+            k: float(v) for k, v in db_sim.items() if k not in utils.stats.TEXT_STATS
+        }
+    except ValueError:
+        relog.error("%s values should be number" % path)
+        return None
+
+
+def run_task(name: str, action: str, o: str, context: BatchContext) -> bool:
+    """
+    execute one simulation in the directory of a rule
+    by one of the worker processes
+
+    when isolated, the output of the simulation is only
+    written in <o>/<action>.log to not interleave the console
+
+    with a manifest, the simulation is skipped if it previously
+    passed with the same fingerprint and its stats still exist
+
+    with an history, the duration of the simulation is recorded
+    """
+    stats_path = utils.normpath(
+        os.path.join(o, utils.get_tmp_folder_name(action), "%s.stats" % action)
+    )
+    signature = None
+    if context.manifest is not None:
+        signature = fingerprint(o, action)
+        stats = context.manifest.lookup(name, signature)
+        if stats is not None and read_stats(stats_path) == stats:
+            relog.note(
+                "%s cached: %d warning(s) and %d error(s)"
+                % (name, stats.get("Warnings", 0), stats.get("Errors", 0))
+            )
+            return True
+    log = utils.normpath(os.path.join(o, "%s.log" % action)) if context.isolated else None
+    success = context.workers.submit(actions.run_action, action, o, log).result()
+    stats = read_stats(stats_path)
+    if context.history is not None and stats:
+        context.history.record(name, stats)
+    # only record passing simulations
+    if context.manifest is not None and success and signature:
+        if stats and stats.get("Errors", 1) == 0:
+            context.manifest.update(name, signature, stats)
+    return success
+
+
+def finalize_batch(cwd: str, tmp_dir: str, t_start: float) -> bool:
+    """
+    write the batch.stats of a nested batch
+    """
+    return aggregate_stats(cwd, time.time() * 1000.0 - t_start, tmp_dir)
+
+
+def read_stats_files(roots: list) -> dict:
+    """
+    cumulate the values of all *.stats files found under roots
+    """
+    db_batch = {}
+    for root in roots:
+        for stats_path in Path(root).rglob("**/*.stats"):
+            with open(stats_path, "r+") as fp:
+                db_sim = dict(
+                    (line.split(":", 1) for i, line in enumerate(fp) if ":" in line and i > 0)
+                )
+            for k, v in db_sim.items():
+                if k in utils.stats.TEXT_STATS:
+                    continue
+                tmp = db_batch[k] if k in db_batch else 0
+                try:
+                    db_batch[k] = float(v) + tmp
+                except ValueError:
+                    relog.error("%s values should be number" % stats_path)
+    return db_batch
+
+
+def write_stats(path: str, db_batch: dict, duration: float):
+    with open(path, "w+") as fp:
+        fp.write("%s\n" % datetime.now())
+        fp.write("Warnings: %d\n" % db_batch.get("Warnings", -1))
+        fp.write("Errors: %d\n" % db_batch.get("Errors", -1))
+        fp.write("Sim. Time: %d\n" % duration)
+
+
+def aggregate_stats(
+    cwd, duration: float, tmp_dir: str = None, filename: str = "batch.stats"
+) -> bool:
+    """
+    cumulate warnings and errors of all *.stats files
+    found under cwd (a directory or a list of directories)
+    in the batch.stats of the working directory
+    """
+    tmp_dir = tmp_dir or utils.get_tmp_folder()
+    batch_stats = utils.normpath(os.path.join(tmp_dir, filename))
+    # remove previous stats
+    if os.path.exists(batch_stats):
+        os.remove(batch_stats)
+    # cumulate stats
+    db_batch = read_stats_files([cwd] if isinstance(cwd, str) else cwd)
+    # store statistics
+    write_stats(batch_stats, db_batch, duration)
+    return True
+
+
+def merge_shards(tmp_dir: str, run_id: str = None) -> bool:
+    """
+    merge the stats of the shards of a run in the batch.stats
+    (the last run whose plan is in <tmp_dir>/shards/ by default)
+    as shards run on different machines, the duration is the longest one
+    """
+    if run_id is None:
+        plans = sorted(Path(tmp_dir).glob("shards/*.json"), key=os.path.getmtime)
+        if not plans:
+            return False
+        run_id = plans[-1].stem
+    if not os.path.exists(plan_path(tmp_dir, run_id)):
+        relog.error("no shards of the run %s in %s" % (run_id, tmp_dir))
+        return False
+    with open(plan_path(tmp_dir, run_id), "r") as fp:
+        count = json.load(fp)["count"]
+    shards = [
+        utils.normpath(os.path.join(tmp_dir, SHARD_STATS % (i, count, run_id)))
+        for i in range(1, count + 1)
+    ]
+    missing = [i + 1 for i, shard in enumerate(shards) if not os.path.exists(shard)]
+    if missing:
+        relog.warning(
+            "shards %s of %d of the run %s are missing"
+            % (", ".join(map(str, missing)), count, run_id)
+        )
+    shards = [shard for shard in shards if os.path.exists(shard)]
+    if not shards:
+        return False
+    db_batch, duration = {}, 0.0
+    for shard in shards:
+        db_shard = read_stats(shard)
+        if db_shard is None:
+            continue
+        for k in ("Warnings", "Errors"):
+            db_batch[k] = db_batch.get(k, 0) + db_shard.get(k, 0)
+        duration = max(duration, db_shard.get("Sim. Time", 0))
+    write_stats(utils.normpath(os.path.join(tmp_dir, "batch.stats")), db_batch, duration)
+    relog.info("Merged %d shards of the run %s in %s" % (len(shards), run_id, tmp_dir))
+    return True
+
+
+def main(
+    cwd,
+    sim_only: bool = False,
+    cov_only: bool = False,
+    lint_only: bool = False,
+    jobs: int = 1,
+    incremental: bool = False,
+    shard: tuple = None,
+    run_id: str = None,
+):
     batch = read_batch(cwd)
-    if batch:
-        run(cwd, batch, sim_only, cov_only, lint_only)
-    else:
+    if not batch:
         relog.error("No Batch.list file found")
+        return
+    # the shards of a run share its id
+    if shard:
+        run_id = run_id or rules_digest(batch_rules(batch), shard[1])
+    t_start = time.time() * 1000.0
+    roots = run(
+        cwd, batch, sim_only, cov_only, lint_only, jobs, incremental, shard, run_id
+    )
+    t_end = time.time() * 1000.0
+    # a shard only cumulates the stats of its rules
+    if shard:
+        aggregate_stats(
+            roots, t_end - t_start, filename=SHARD_STATS % (*shard, run_id)
+        )
+    else:
+        aggregate_stats(cwd, t_end - t_start)
 
 
 if __name__ == "__main__":
@@ -292,6 +729,30 @@ if __name__ == "__main__":
     parser.add_argument(
         "-nl", "--no-logger", action="store_true", help="already include logger macro"
     )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="number of simulations in parallel"
+    )
+    parser.add_argument(
+        "--incremental",
+        default=False,
+        action="store_true",
+        help="skip simulations whose inputs did not change",
+    )
+    parser.add_argument(
+        "--shard", type=str, default=None, help="only run the shard i/N of the rules"
+    )
+    parser.add_argument(
+        "--run-id", type=str, default=None, help="id shared by the shards of a run"
+    )
     args = parser.parse_args()
     # read batch description file
-    main(args.input, args.sim, args.cov, args.lint)
+    main(
+        args.input,
+        args.sim,
+        args.cov,
+        args.lint,
+        args.jobs,
+        args.incremental,
+        parse_shard(args.shard) if args.shard else None,
+        args.run_id,
+    )
@@ -6,31 +6,91 @@ import sys
 import configparser
 import common.relog as relog
 
-from pathlib import Path, PosixPath, WindowsPath
+from pathlib import PosixPath, WindowsPath
+
+
+# directories marking the root of a repository
+VCS_DIRS = (".git", ".hg", ".svn")
+# directories never searched for a configuration (hidden ones are skipped too)
+SKIPPED_DIRS = ("__pycache__", "node_modules")
+# depth of the sub-directories searched for a configuration
+CONFIG_SEARCH_DEPTH = 3
+# number of parents searched for a configuration
+CONFIG_SEARCH_PARENTS = 16
+
+
+def scan_dir(path: str) -> tuple:
+    """
+    configuration files and sub-directories of a directory
+    the work directories (.tmp_*) and the hidden directories are skipped
+    return (configs, sub-directories, is the root of a repository)
+    """
+    configs, dirs, vcs = [], [], False
+    try:
+        entries = sorted(os.scandir(path), key=lambda e: e.name)
+    except OSError:
+        return configs, dirs, vcs
+    for entry in entries:
+        if entry.name in VCS_DIRS:
+            vcs = True
+        elif entry.name.endswith(".config"):
+            if entry.is_file():
+                configs.append(os.path.normpath(entry.path))
+        elif entry.name.startswith(".") or entry.name in SKIPPED_DIRS:
+            continue
+        elif entry.is_dir(follow_symlinks=False):
+            dirs.append(entry.path)
+    return configs, dirs, vcs
 
 
 def locate_config_files(base_path: str) -> list:
     """
-    locate *.config file either in current directory
-    or from the parent in the hierarchy (up to 16 folder depth)
+    locate *.config file either in current directory, in its
+    sub-directories (up to CONFIG_SEARCH_DEPTH) or from the parent
+    in the hierarchy (up to 16 folder depth) without going above
+    the root of the repository
     """
-    # load a local configuration if there is one
-    config_files = []
-    for file in Path(base_path).rglob("*.config"):
-        config_files.append(str(file))
-        break
+    base_path = os.path.abspath(base_path)
+    # load a local configuration if there is one (breadth first)
+    configs, level, vcs = scan_dir(base_path)
+    for _ in range(CONFIG_SEARCH_DEPTH):
+        if configs:
+            return configs[:1]
+        sub_dirs = []
+        for path in level:
+            configs, dirs, _ = scan_dir(path)
+            if configs:
+                break
+            sub_dirs.extend(dirs)
+        level = sub_dirs
+    if configs:
+        return configs[:1]
     # can investigate parents folders for
     # a hierarchy up to 16 parents deep
-    for i in range(16):
-        if not config_files:
-            base_path = os.path.dirname(base_path)
-            for file in os.listdir(base_path):
-                file_path = os.path.normpath(os.path.join(base_path, file))
-                if file.endswith(".config") and os.path.isfile(file_path):
-                    config_files.append(file_path)
-        else:
+    for _ in range(CONFIG_SEARCH_PARENTS):
+        parent = os.path.dirname(base_path)
+        if vcs or parent == base_path:
             break
-    return config_files
+        base_path = parent
+        configs, _, vcs = scan_dir(base_path)
+        if configs:
+            return configs
+    return []
+
+
+# merged configurations by files with their mtime and size
+MERGED_CONFIGS = {}
+
+
+def config_key(config_files: list) -> tuple:
+    key = []
+    for config_file in config_files:
+        try:
+            st = os.stat(config_file)
+        except OSError:
+            return None
+        key.append((str(config_file), st.st_mtime_ns, st.st_size))
+    return tuple(key)
 
 
 class MetaConfig(type):
@@ -68,6 +128,11 @@ class MetaConfig(type):
 
         # use strict=False to allows redefinition with merge config files
         MetaConfig.data = configparser.SafeConfigParser(strict=False)
+        # the files did not change since they were merged
+        key = config_key(config_files)
+        if key in MERGED_CONFIGS:
+            MetaConfig.data.read_dict(MERGED_CONFIGS[key])
+            return
         for config_file in config_files:
             try:
                 MetaConfig.data.readfp(MetaConfig.lines_generator(config_file), config_file)
@@ -75,6 +140,12 @@ class MetaConfig(type):
                 MetaConfig.data.readfp(
                     MetaConfig.lines_generator(config_file, True), config_file
                 )
+        if key is not None:
+            data = MetaConfig.data
+            merged = {data.default_section: dict(data.defaults())}
+            for section in data.sections():
+                merged[section] = dict(data.items(section, raw=True))
+            MERGED_CONFIGS[key] = merged
 
     @staticmethod
     def add_configs(config_files: list):
@@ -1,29 +1,61 @@
 #!/usr/bin/env python3
 
 import os
+import re
 import sys
+import json
 import shlex
 import argparse
 import traceback
 
 from enum import Enum
-from collections import defaultdict, Iterable
+from collections import defaultdict
+from collections.abc import Iterable
 
-import common.rules
 import common.relog as relog
 import common.utils as utils
 import common.verilog as verilog
+import common.design_db as design_db
 
 
 # ==== help in parsing sources.list ====
+# resolved path and number of file system calls needed by (path, base, platform)
+RESOLVED = {}
+
+
+def clear_caches():
+    """
+    forget the state of the file system at the beginning of a run
+    """
+    global INCLUDE_GRAPH
+    RESOLVED.clear()
+    utils.files.clear_cache()
+    INCLUDE_GRAPH = None
+    verilog.INDEX_CACHE.clear()
+    verilog.RESOLVED.clear()
+    design_db.close_dbs()
+
+
 def resolve_path(path: str, base: str = "") -> str:
     """
     resolve the absolute path of a file in the
-    sources.list
+    sources.list (memoized during a run)
     """
+    key = (path, base, os.getenv("PLATFORM"))
+    if key in RESOLVED:
+        ans, calls = RESOLVED[key]
+        utils.files.FS_CALLS["saved"] += calls
+        return ans
+    done = utils.files.FS_CALLS["done"]
+    ans = _resolve_path(path, base)
+    RESOLVED[key] = (ans, utils.files.FS_CALLS["done"] - done)
+    return ans
+
+
+def _resolve_path(path: str, base: str = "") -> str:
     # file in the current directory or relative ./ or ../
     if not path.startswith("/"):
-        return os.path.realpath(os.path.join(base, path))
+        return utils.files.realpath(os.path.join(base, path))
     # otherwise absolute path on unix os or to digital platform
     p = path[1:]
     first_dir = p.split("/", 1)[0] if "/" in p else p
@@ -46,33 +78,145 @@ def resolve_path(path: str, base: str = "") -> str:
             else "mixed",
             path[1:],
         )
-        if os.path.exists(new_path):
+        if utils.files.exists(new_path):
             return new_path
     # in platform without domain separation
     new_path = os.path.join(
         base[: i + len(platform)],
         path[1:],
     )
-    if os.path.exists(new_path):
+    if utils.files.exists(new_path):
         return new_path
     # not known
     return path
 
 
+# include directives of the files, invalidated when their format or their parsing changes
+INCLUDE_CACHE_VERSION = 2
+INCLUDE_CACHE = None
+INCLUDE_GRAPH = None
+
+
+def include_cache():
+    """
+    persistent cache of the include directives found in the files
+    """
+    global INCLUDE_CACHE
+    if INCLUDE_CACHE is None:
+        INCLUDE_CACHE = utils.cache.Cache("includes", INCLUDE_CACHE_VERSION)
+    return INCLUDE_CACHE
+
+
+def include_graph():
+    """
+    include graph shared by the listing and the tools of a run
+    """
+    global INCLUDE_GRAPH
+    if INCLUDE_GRAPH is None:
+        INCLUDE_GRAPH = IncludeGraph()
+    return INCLUDE_GRAPH
+
+
+class IncludeGraph:
+    """
+    files included by the `include directives of the files of a design
+    followed recursively through the included files
+    the directives of a file are read again only when its mtime or size changed
+    """
+
+    __slots__ = ["edges", "reverse"]
+
+    def __init__(self):
+        # file -> resolved paths of its includes
+        self.edges = {}
+        # included path -> files including it
+        self.reverse = defaultdict(set)
+
+    def directives(self, file: str) -> list:
+        cache = include_cache()
+        st = utils.files.stat(file)
+        key = os.path.abspath(file)
+        entry = cache.get(key)
+        if entry and entry[:2] == [st.st_mtime_ns, st.st_size]:
+            cache.record(True)
+            return entry[2]
+        cache.record(False)
+        names = list(verilog.index_file(file).includes)
+        cache.set(key, [st.st_mtime_ns, st.st_size, names])
+        return names
+
+    def add(self, files: list):
+        """
+        follow the include chains of the files not yet in the graph
+        """
+        stack = [f for f in reversed(files) if f not in self.edges]
+        while stack:
+            file = stack.pop()
+            parent_dir = os.path.dirname(file)
+            if file in self.edges:
+                continue
+            if not (utils.files.isfile(file) and parent_dir):
+                self.edges[file] = []
+                continue
+            includes = []
+            for inc in self.directives(file):
+                path = resolve_path(inc, parent_dir)
+                if path not in includes:
+                    includes.append(path)
+                self.reverse[path].add(file)
+            self.edges[file] = includes
+            stack.extend(reversed(includes))
+
+    def closure(self, files: list) -> list:
+        """
+        files included directly or not by the files
+        """
+        self.add(files)
+        ans, seen, given = [], set(), set(files)
+        stack = list(reversed(files))
+        while stack:
+            path = stack.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            if path not in given:
+                ans.append(path)
+            stack.extend(reversed(self.edges.get(path, [])))
+        return ans
+
+    def incdirs(self, files: list) -> list:
+        """
+        include directories needed to compile the files
+        """
+        dirs = list(dict.fromkeys(map(os.path.dirname, self.closure(files))))
+        return [d for d in dirs if utils.files.exists(d)]
+
+    def affected(self, header: str) -> list:
+        """
+        files including the header directly or not
+        """
+        if header not in self.reverse:
+            header = utils.files.realpath(header)
+        ans, stack = [], [header]
+        seen = {header}
+        while stack:
+            for path in sorted(self.reverse.get(stack.pop(), ())):
+                if path not in seen:
+                    seen.add(path)
+                    ans.append(path)
+                    stack.append(path)
+        return ans
+
+
 def resolve_includes(files: list) -> list:
-    includes = []
-    # for each files which exist really
-    for file in files:
-        parent_dir = os.path.dirname(file)
-        if os.path.isfile(file) and parent_dir:
-            # iterate through include statement detected
-            for inc in verilog.find_includes(file):
-                # resolve the path and store it
-                includes.append(resolve_path(inc, parent_dir))
-    # return the list of include to only
-    # have non redundante parent directory
-    includes = list(set(map(os.path.dirname, includes)))
-    return [i for i in includes if os.path.exists(i)]
+    """
+    include directories of the files and of the files they include
+    the directives read are saved once per call: the rules of a listing
+    use include_graph() directly and the listing saves them at its end
+    """
+    incdirs = include_graph().incdirs(files)
+    include_cache().save()
+    return incdirs
 
 
 def is_parameter(line: str) -> bool:
@@ -85,21 +229,23 @@ def is_rules(line: str) -> bool:
 
 # ==== Dependancy  Resolution ====
 class Node:
-    __slots__ = ["name", "edges", "params"]
+    __slots__ = ["name", "edges", "params", "index"]
 
     def __init__(self, name):
         self.name = name
         self.edges = []
         self.params = defaultdict(list)
+        # position of the edges by name
+        self.index = {}
 
     def addEdge(self, node):
         # update if existing
-        for i, n in enumerate(self.edges):
-            if n.name == node.name:
-                self.edges[i] = node
-                break
+        i = self.index.get(node.name)
+        if i is not None:
+            self.edges[i] = node
         else:
             # add it otherwise
+            self.index[node.name] = len(self.edges)
             self.edges.append(node)
 
     def describe(self):
@@ -116,27 +262,43 @@ def resolve_dependancies(node, resolved, unresolved) -> None:
     """
     Dependency resolution algorithms taken from
     https://www.electricmonk.nl/log/2008/08/07/dependency-resolving-algorithm/
+    as an iterative depth first search
     Args:
         - node: Node of a graph (start with the top)
         - resolved: output of nodes needed in order
         - unresolved: for circular reference detection
     """
+    done = set(map(id, resolved))
+    pending = set(map(id, unresolved))
     unresolved.append(node)
-    for edge in node.edges:
-        if edge not in resolved and edge.name not in node.name:
-            if edge in unresolved:
-                raise Exception(
-                    "Circular reference detected: %s -> %s" % (node.name, edge.name)
-                )
-            resolve_dependancies(edge, resolved, unresolved)
-    resolved.append(node)
-    unresolved.remove(node)
+    pending.add(id(node))
+    stack = [(node, iter(node.edges))]
+    while stack:
+        current, edges = stack[-1]
+        for edge in edges:
+            if id(edge) not in done and edge.name not in current.name:
+                if id(edge) in pending:
+                    raise Exception(
+                        "Circular reference detected: %s -> %s"
+                        % (current.name, edge.name)
+                    )
+                # resolve the dependencies of the edge first
+                unresolved.append(edge)
+                pending.add(id(edge))
+                stack.append((edge, iter(edge.edges)))
+                break
+        else:
+            stack.pop()
+            resolved.append(current)
+            done.add(id(current))
+            unresolved.pop()
+            pending.discard(id(current))
 
 
 # ====== business logic ======
 def check_source_exists(dirpath: str) -> bool:
     _ = os.path.join(dirpath, "Sources.list")
-    return os.path.exists(_)
+    return utils.files.exists(_)
 
 
 class TokenType(Enum):
@@ -148,6 +310,18 @@ class TokenType(Enum):
     NEW_LINE = 5
 
 
+# separators of a line after its first non blank character
+# ('+' is only a separator before '=', a trailing '+' is an error)
+SEPARATORS = re.compile(r"[@:=\n]|\+(?:(?==)|\Z)")
+SPECIAL = re.compile(r"[@:=+]")
+SEPARATOR_TOKENS = {
+    "@": (TokenType.TAG_SEP, "@"),
+    ":": (TokenType.SEP, ":"),
+    "+": (TokenType.SEP, "+"),
+    "\n": (TokenType.NEW_LINE, ""),
+}
+
+
 def source_tokenizer(buffer):
     """
     generate Sources.list tokens for parsing
@@ -162,66 +336,282 @@ def source_tokenizer(buffer):
     <string>:
         <string>
 
+    each line yields its indentation, then the strings between
+    separators, the first non blank character always belonging
+    to a string; a comment hides the end of the line
     """
+    INDENT, STRING, PARAM_SEP = TokenType.INDENT, TokenType.STRING, TokenType.PARAM_SEP
+    new_line = SEPARATOR_TOKENS["\n"]
+    special, separators = SPECIAL.search, SEPARATORS.finditer
     for line in buffer:
-        start_index = 0
-        is_blank_from_zero, previous, current = True, "", ""
-        ln = line.expandtabs(4)
+        ln = line.expandtabs(4) if "\t" in line else line
         idx_comment = ln.find("#")
-        ln = ln[:idx_comment] if idx_comment > -1 else ln
-        for pos, current in enumerate(ln):
-            # check for indentation
-            if current == " " and previous in ["", " "] and start_index == 0:
-                previous = current
-                continue
-            elif current != " " and is_blank_from_zero and start_index == 0:
-                yield (TokenType.INDENT, ln[:pos])
-                start_index = pos
-            # check for string
-            elif current.isalnum() or current in "/\\._-() []éèàï":
-                previous = current
-                continue
-            # check for separator
-            elif current in "@:=+\n":
-                # skip + as if can be part of the += token
-                if current in "+" and ln[pos + 1] != "=":
-                    previous = current
-                    continue
-                if ln[start_index:pos]:
-                    yield (TokenType.STRING, ln[start_index:pos])
-                    start_index = pos + 1
-                # report separator
-                if previous == "+" and current == "=":
-                    yield (TokenType.PARAM_SEP, "+=")
-                elif current == "=":
-                    yield (TokenType.PARAM_SEP, "=")
-                elif current == "@":
-                    yield (TokenType.TAG_SEP, "@")
-                elif current == "\n":
-                    yield (TokenType.NEW_LINE, "")
-                else:
-                    yield (TokenType.SEP, current)
-                start_index = pos + 1
-            previous = current
-            if current != " ":
-                is_blank_from_zero = False
+        if idx_comment > -1:
+            ln = ln[:idx_comment]
+        stripped = ln.lstrip(" ")
+        if not stripped:
+            start_index = 0
+            continue
+        start_index = len(ln) - len(stripped)
+        yield (INDENT, ln[:start_index])
+        # most lines only end with a new line
+        if special(ln, start_index + 1) is None:
+            if ln[-1] == "\n" and len(ln) > start_index + 1:
+                yield (STRING, ln[start_index:-1])
+                yield new_line
+                start_index = len(ln)
+            continue
+        for m in separators(ln, start_index + 1):
+            pos = m.start()
+            current = ln[pos]
+            if current == "+" and pos + 1 == len(ln):
+                raise IndexError("string index out of range")
+            if start_index < pos:
+                yield (STRING, ln[start_index:pos])
+            # report separator
+            if current == "=":
+                yield (PARAM_SEP, "+=" if ln[pos - 1] == "+" else "=")
+            else:
+                yield SEPARATOR_TOKENS[current]
+            start_index = pos + 1
     yield (TokenType.STRING, ln[start_index:])
-    yield (TokenType.NEW_LINE, "")
+    yield new_line
+
+
+# parsed Sources.list, invalidated when the format of the plan changes
+SOURCES_CACHE_VERSION = 1
+SOURCES_CACHE = None
+
+
+def sources_cache():
+    """
+    persistent cache of the plans of the Sources.list
+    """
+    global SOURCES_CACHE
+    if SOURCES_CACHE is None:
+        SOURCES_CACHE = utils.cache.Cache("sources", SOURCES_CACHE_VERSION)
+    return SOURCES_CACHE
+
+
+# first timescale of the files, invalidated when the format of the entries changes
+TIMESCALE_CACHE_VERSION = 1
+TIMESCALE_CACHE = None
+# maximum number of files scanned concurrently
+SCAN_WORKERS = min(8, os.cpu_count() or 1)
+
 
+def timescale_cache():
+    """
+    persistent cache of the timescale found in the files
+    """
+    global TIMESCALE_CACHE
+    if TIMESCALE_CACHE is None:
+        TIMESCALE_CACHE = utils.cache.Cache("timescales", TIMESCALE_CACHE_VERSION)
+    return TIMESCALE_CACHE
 
-def read_sources(filepath: str, graph: dict = {}, depth: int = 0):
+
+def parse_sources_list(filepath: str) -> dict:
+    """
+    parse a Sources.list in a plan replayed on the graph by read_sources
+    Args:
+    - filepath: path of the Sources.list
+    Outputs:
+    - plan:
+        - nodes: [name, params] of the nodes declared (0 is the Sources.list)
+        - ops: operations on the graph in order
+            - ["list", parent, path]: parent depends on the Sources.list path
+            - ["edge", parent, node]: parent depends on the node
+            - ["assign", path, node]: the node is registered in the graph
+        - checks: [token, path, is_list] paths resolved while parsing
+    """
+    nodes = [Node(filepath)]
+    ops, checks = [], []
+
+    def new_node(path: str) -> int:
+        nodes.append(Node(path))
+        return len(nodes) - 1
+
+    no = nodes[0]
+    # get lines in memory
+    with open(filepath, "r+") as fp:
+        tokens = source_tokenizer(fp)
+        # parse the file
+        indent_level = 0
+        in_group = 0
+        string = None
+        path = None
+        parameter_name = None
+        parameter_value = []
+        op_increment = False
+        wait_new_line = False
+        beginning_of_line = True
+        continue_append = False
+        last_is_tag = False
+        node_stack = []
+        for type, token in tokens:
+            # indentation management
+            if type == TokenType.INDENT and beginning_of_line:
+                indent_level += 1
+                continue_append = False
+            # string or parameter value with '=' or '+='
+            elif type == TokenType.STRING:
+                beginning_of_line = False
+                if parameter_name is not None:
+                    if op_increment or continue_append:
+                        parameter_value.append(token)
+                    else:
+                        parameter_value = [token]
+                    continue_append = False
+                # add tag to last node referenced
+                elif last_is_tag:
+                    if "TAGS" in nodes[node_stack[-1]].params:
+                        nodes[node_stack[-1]].params["TAGS"].append(token)
+                    else:
+                        nodes[node_stack[-1]].params["TAGS"] = [token]
+                # file / parameter name / directory
+                else:
+                    string = token
+                    path = resolve_path(token.strip(), os.path.dirname(filepath))
+            # received '@' so add tag as parameter
+            elif type == TokenType.TAG_SEP:
+                node_stack.append(new_node(path))
+                last_is_tag = True
+                continue_append = False
+                beginning_of_line = False
+            # received ':' so the file as dependences
+            elif type == TokenType.SEP:
+                if parameter_name is None:
+                    node_stack.append(new_node(path))
+                    in_group = indent_level + 1
+                    continue_append = False
+                    beginning_of_line = False
+            # received '=' or '+=' so previous string is a parameter name
+            elif type == TokenType.PARAM_SEP:
+                if not wait_new_line:
+                    parameter_name = string
+                    # create default value for the parameter if not exist
+                    if parameter_name not in no.params:
+                        parameter_value = []
+                    # parameter name [=|+=] parameter value till \n
+                    if token == "+=":
+                        op_increment = True
+                    wait_new_line = True
+                    path = None
+                else:
+                    parameter_value.append("=")
+                    continue_append = True
+                node_stack = []
+                beginning_of_line = False
+            elif type == TokenType.NEW_LINE:
+                if parameter_name:
+                    _val = no.params[parameter_name.strip()]
+                    if _val and op_increment:
+                        _val.extend(shlex.split("".join(parameter_value)))
+                        no.params[parameter_name.strip()] = _val
+                    else:
+                        no.params[parameter_name.strip()] = shlex.split(
+                            "".join(parameter_value)
+                        )
+                # if directory read the pointed sources.list
+                elif path and utils.files.isdir(path) and check_source_exists(path):
+                    checks.append([string.strip(), path, True])
+                    ops.append(["list", node_stack[-1] if node_stack else 0, path])
+                # is a file
+                elif path:
+                    checks.append([string.strip(), path, False])
+                    if node_stack and last_is_tag:
+                        node = node_stack.pop()
+                        ops.append(["assign", path, node])
+                        ops.append(["edge", node_stack[-1] if node_stack else 0, node])
+                    else:
+                        node = new_node(path)
+                        ops.append(["assign", path, node])
+                        ops.append(["edge", 0, node])
+                # stop dependencies check from ':'
+                # if empty line detected or wrong indentation
+                if indent_level < in_group:
+                    while node_stack:
+                        ops.append(["edge", 0, node_stack.pop()])
+                    in_group = indent_level
+                indent_level = 0
+                path = None
+                parameter_name = None
+                parameter_value = []
+                op_increment = False
+                wait_new_line = False
+                continue_append = False
+                beginning_of_line = True
+                last_is_tag = False
+    return {
+        "nodes": [[node.name, dict(node.params)] for node in nodes],
+        "ops": ops,
+        "checks": checks,
+    }
+
+
+def is_plan_valid(filepath: str, plan: dict) -> bool:
+    """
+    check the paths resolved in a cached plan still resolve the same
+    """
+    base = os.path.dirname(filepath)
+    for token, path, is_list in plan["checks"]:
+        if resolve_path(token, base) != path:
+            return False
+        if (utils.files.isdir(path) and check_source_exists(path)) != is_list:
+            return False
+    return True
+
+
+def load_plan(filepath: str) -> dict:
+    """
+    plan of a Sources.list from the cache if it did not change
+    (same mtime and size or same content) otherwise parse it
+    """
+    cache = sources_cache()
+    key = os.path.abspath(filepath)
+    st = os.stat(filepath)
+    entry = cache.get(key)
+    content_hash = None
+    if entry and entry["platform"] == os.getenv("PLATFORM", ""):
+        same = entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size
+        if not same:
+            content_hash = utils.files.hash_file(filepath)
+            same = entry["hash"] == content_hash
+        if same and is_plan_valid(filepath, entry["plan"]):
+            cache.record(True)
+            if entry["mtime"] != st.st_mtime_ns:
+                cache.set(key, {**entry, "mtime": st.st_mtime_ns})
+            return entry["plan"]
+    cache.record(False)
+    plan = parse_sources_list(filepath)
+    cache.set(
+        key,
+        {
+            "mtime": st.st_mtime_ns,
+            "size": st.st_size,
+            "hash": content_hash or utils.files.hash_file(filepath),
+            "platform": os.getenv("PLATFORM", ""),
+            "plan": plan,
+        },
+    )
+    return plan
+
+
+def read_sources(filepath: str, graph: dict = {}, depth: int = 0, observe: bool = True):
     """
     create a graph from a source.list file
     Args:
     - filepath: string pointing to the file
     - graph: map<string, Node> keep track of files
     - depth: int level of depth of the graph
+    - observe: call functions registered in rules on the files
+      (the persistent caches filled by the rules are saved once at the end)
     Outputs:
     - Node, graph: in the recursion
     - list of files ordered if depth == 0
     """
     # add file if it is a directory given
-    if os.path.isdir(filepath):
+    if utils.files.isdir(filepath):
         filepath = os.path.join(filepath, "Sources.list")
     # if filepath is not already in the graph
     # create a new node
@@ -231,143 +621,143 @@ def read_sources(filepath: str, graph: dict = {}, depth: int = 0):
     no = graph[filepath]
     # if the file is a sources.list
     if filepath.endswith("Sources.list"):
-        # get lines in memory
-        with open(filepath, "r+") as fp:
-            tokens = source_tokenizer(fp)
-            # parse the file
-            indent_level = 0
-            in_group = 0
-            string = None
-            parameter_name = None
-            parameter_value = []
-            op_increment = False
-            wait_new_line = False
-            beginning_of_line = True
-            continue_append = False
-            last_is_tag = False
-            node_stack = []
-            for type, token in tokens:
-                # indentation management
-                if type == TokenType.INDENT and beginning_of_line:
-                    indent_level += 1
-                    continue_append = False
-                # string or parameter value with '=' or '+='
-                elif type == TokenType.STRING:
-                    beginning_of_line = False
-                    if parameter_name is not None:
-                        if op_increment or continue_append:
-                            parameter_value.append(token)
-                        else:
-                            parameter_value = [token]
-                        continue_append = False
-                    # add tag to last node referenced
-                    elif last_is_tag:
-                        if "TAGS" in node_stack[-1].params:
-                            node_stack[-1].params["TAGS"].append(token)
-                        else:
-                            node_stack[-1].params["TAGS"] = [token]
-                    # file / parameter name / directory
-                    else:
-                        string = token
-                        path = resolve_path(token.strip(), os.path.dirname(filepath))
-                # received '@' so add tag as parameter
-                elif type == TokenType.TAG_SEP:
-                    node_stack.append(Node(path))
-                    last_is_tag = True
-                    continue_append = False
-                    beginning_of_line = False
-                # received ':' so the file as dependences
-                elif type == TokenType.SEP:
-                    if parameter_name is None:
-                        node_stack.append(Node(path))
-                        in_group = indent_level + 1
-                        continue_append = False
-                        beginning_of_line = False
-                # received '=' or '+=' so previous string is a parameter name
-                elif type == TokenType.PARAM_SEP:
-                    if not wait_new_line:
-                        parameter_name = string
-                        # create default value for the parameter if not exist
-                        if parameter_name not in no.params:
-                            parameter_value = []
-                        # parameter name [=|+=] parameter value till \n
-                        if token == "+=":
-                            op_increment = True
-                        wait_new_line = True
-                        path = None
-                    else:
-                        parameter_value.append("=")
-                        continue_append = True
-                    node_stack = []
-                    beginning_of_line = False
-                elif type == TokenType.NEW_LINE:
-                    if parameter_name:
-                        _val = no.params[parameter_name.strip()]
-                        if _val and op_increment:
-                            _val.extend(shlex.split("".join(parameter_value)))
-                            no.params[parameter_name.strip()] = _val
-                        else:
-                            no.params[parameter_name.strip()] = shlex.split(
-                                "".join(parameter_value)
-                            )
-                    # if directory read the pointed sources.list
-                    elif path and os.path.isdir(path) and check_source_exists(path):
-                        n, g = read_sources(path, graph, depth + 1)
-                        graph.update(g)
-                        if node_stack:
-                            node_stack[-1].addEdge(n)
-                        else:
-                            no.addEdge(n)
-                    # is a file
-                    elif path:
-                        if node_stack and last_is_tag:
-                            graph[path] = node_stack.pop()
-                            if node_stack:
-                                node_stack[-1].addEdge(graph[path])
-                            else:
-                                no.addEdge(graph[path])
-                        else:
-                            graph[path] = Node(path)
-                            no.addEdge(graph[path])
-                    # stop dependencies check from ':'
-                    # if empty line detected or wrong indentation
-                    if indent_level < in_group:
-                        while node_stack:
-                            no.addEdge(node_stack.pop())
-                        in_group = indent_level
-                    indent_level = 0
-                    path = None
-                    parameter_name = None
-                    parameter_value = []
-                    op_increment = False
-                    wait_new_line = False
-                    continue_append = False
-                    beginning_of_line = True
-                    last_is_tag = False
+        plan = load_plan(filepath)
+        # replay the operations of the plan on the graph
+        nodes = [no]
+        for name, _ in plan["nodes"][1:]:
+            nodes.append(Node(name))
+        for node, (_, params) in zip(nodes, plan["nodes"]):
+            node.params.update((k, list(v)) for k, v in params.items())
+        for op, a, b in plan["ops"]:
+            if op == "list":
+                n, g = read_sources(b, graph, depth + 1)
+                graph.update(g)
+                nodes[a].addEdge(n)
+            elif op == "edge":
+                nodes[a].addEdge(nodes[b])
+            else:
+                graph[a] = nodes[b]
         # if in recursion
         if depth > 0:
             return no, graph
+        sources_cache().save()
     # resolve dependancies
     resolved = []
     resolve_dependancies(no, resolved, [])
+    if not observe:
+        return resolved[::-1]
     # call functions registered in rules
+    import common.rules
+
     ans = []
     for i, item in enumerate(resolved[::-1]):
         tmp = None
         for f in utils.rules.list_observer(item.name):
             tmp = f(item)
         if tmp:
-            if isinstance(tmp, Iterable):
-                ans.extend(tmp)
-            else:
-                ans.append(tmp)
+            tmp = list(tmp) if isinstance(tmp, Iterable) else [tmp]
+            # files generated by the rules
+            for node in tmp:
+                utils.files.forget(node.name)
+            ans.extend(tmp)
         else:
             ans.append(item)
+    # include directives read by the rules
+    include_cache().save()
     # return the value
     return ans
 
 
-def read_from(sources_list: str, no_logger: bool = False, no_stdout: bool = True):
+def first_timescale(filepath: str) -> tuple:
+    ts = verilog.find_timescale(filepath, first=True)
+    return tuple(ts[0]) if ts else None
+
+
+def scan_timescales(files: list) -> dict:
+    """
+    first timescale (step, unit, accuracy, unit) of each file or None
+    files which changed since the previous run are scanned in a thread pool
+    Args:
+    - files: paths of the files
+    Outputs:
+    - dict path -> timescale
+    """
+    cache = timescale_cache()
+    ans, pending = {}, []
+    for path in files:
+        if path in ans:
+            continue
+        st = utils.files.stat(path)
+        # missing files have no timescale
+        if st is None:
+            ans[path] = None
+            continue
+        entry = cache.get(os.path.abspath(path))
+        if entry and entry[:2] == [st.st_mtime_ns, st.st_size]:
+            cache.record(True)
+            ans[path] = tuple(entry[2]) if entry[2] else None
+        else:
+            cache.record(False)
+            ans[path] = None
+            pending.append((path, st))
+    if not pending:
+        return ans
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = min(SCAN_WORKERS, len(pending))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(first_timescale, [path for path, _ in pending])
+        for (path, st), ts in zip(pending, results):
+            ans[path] = ts
+            cache.set(os.path.abspath(path), [st.st_mtime_ns, st.st_size, ts])
+    cache.save()
+    return ans
+
+
+class Listing:
+    """
+    files with their mime-type, parameters, timescale
+    and top module of a design listed from a Sources.list
+    """
+
+    __slots__ = ["files", "params", "timescale", "top"]
+
+    def __init__(self, files: list, params: dict, timescale: str, top: str):
+        self.files = files
+        self.params = params
+        self.timescale = timescale
+        self.top = top
+
+    def records(self):
+        """
+        json-lines interchange format: one json object per line
+        """
+        for path, mime in self.files:
+            yield json.dumps({"file": path, "mime": mime})
+        for key, value in self.params.items():
+            yield json.dumps({"param": key, "value": value})
+        yield json.dumps({"timescale": self.timescale})
+        if self.top:
+            yield json.dumps({"top": self.top})
+
+    def lines(self):
+        """
+        text format: path;MIME and KEY\t:\tvalue lines
+        """
+        for path, mime in self.files:
+            yield "%s;%s" % (path, mime)
+        for key, value in self.params.items():
+            yield "%s\t:\t%s" % (key, value)
+        yield "TIMESCALE\t:\t'%s'" % self.timescale
+        if self.top:
+            yield "TOP_MODULE\t:\t'%s'" % self.top
+
+
+def list_sources(sources_list: str, no_logger: bool = False) -> Listing:
+    """
+    list the files of a design in dependency order with their mime-type,
+    the parameters, the most accurate timescale and the top module
+    """
     files = []
     parameters = {}
     # check input exist
@@ -376,10 +766,7 @@ def read_from(sources_list: str, no_logger: bool = False, no_stdout: bool = True
     # add the log package file
     if not no_logger:
         log_inc = os.path.join(os.environ["REFLOW"], "digital/packages/log.svh")
-        if no_stdout:
-            files.append((log_inc, utils.files.get_type(log_inc)))
-        else:
-            print(log_inc, utils.files.get_type(log_inc), sep=";")
+        files.append((log_inc, utils.files.get_type(log_inc)))
     # store the list of files
     graph = {}
     try:
@@ -389,36 +776,30 @@ def read_from(sources_list: str, no_logger: bool = False, no_stdout: bool = True
         exit(1)
     except Exception:
         traceback.print_exc(file=sys.stderr)
-    # display the list of files and their mime-type
+    # list the files and their mime-type
     for node in graph:
         if isinstance(node, Node):
             _t = utils.files.get_type(node.name)
             if _t:
-                if no_stdout:
-                    files.append((node.name, _t))
-                else:
-                    print(node.name, _t, sep=";")
+                files.append((node.name, _t))
     # list the parameters
     # from graph on reverse orders to apply the latest
     # value of the parameter in the hierarchy
     for node in graph[::-1]:
-        if no_stdout and isinstance(node, Node):
+        if isinstance(node, Node):
             parameters.update(node.params)
-        elif no_stdout:
-            pass
-        else:
-            for key, value in node.params.items():
-                print("%s\t:\t%s" % (key, value))
     # define the most accurate timescale define
     min_ts = (1, "s", 1, "ms")
-    for node in graph:
-        if not isinstance(node, Node):
-            continue
-        if not utils.files.is_digital(node.name):
-            continue
-        ts = verilog.find_timescale(node.name)
+    digital_files = [
+        node.name
+        for node in graph
+        if isinstance(node, Node) and utils.files.is_digital(node.name)
+    ]
+    timescales = scan_timescales(digital_files)
+    for name in digital_files:
+        ts = timescales[name]
         if ts:
-            sn, su, rn, ru = ts[0]
+            sn, su, rn, ru = ts
             if utils.parsers.evaluate_eng_unit(sn, su) < utils.parsers.evaluate_eng_unit(
                 *min_ts[0:2]
             ):
@@ -429,19 +810,38 @@ def read_from(sources_list: str, no_logger: bool = False, no_stdout: bool = True
             ):
                 min_ts = (*min_ts[0:2], rn, ru)
     if utils.parsers.evaluate_eng_unit(*min_ts[0:2]) == 1.0:
-        print("TIMESCALE\t:\t'1ns/100ps'")
-        parameters["TIMESCALE"] = "1ns/100ps"
+        timescale = "1ns/100ps"
     else:
-        print("TIMESCALE\t:\t'%s%s/%s%s'" % min_ts)
-        parameters["TIMESCALE"] = "%s%s/%s%s" % min_ts
+        timescale = "%s%s/%s%s" % min_ts
     # define the top module
-    if isinstance(graph[-1], Node):
-        print("TOP_MODULE\t:\t'%s'" % graph[-1].name)
-        parameters["TOP_MODULE"] = graph[-1].name
-    if no_stdout:
-        # normalize path of files accross platform
-        files = [(f.replace("\\", "/"), m) for f, m in files]
-        return files, parameters
+    top = graph[-1].name if graph and isinstance(graph[-1], Node) else None
+    return Listing(files, parameters, timescale, top)
+
+
+def read_from(
+    sources_list: str,
+    no_logger: bool = False,
+    no_stdout: bool = True,
+    format: str = "text",
+):
+    """
+    list the design of a Sources.list
+    return the files and parameters if no_stdout otherwise
+    print them in the given format (text or jsonl)
+    """
+    listing = list_sources(sources_list, no_logger)
+    if not no_stdout:
+        for line in listing.records() if format == "jsonl" else listing.lines():
+            print(line)
+        return
+    print("TIMESCALE\t:\t'%s'" % listing.timescale)
+    parameters = {**listing.params, "TIMESCALE": listing.timescale}
+    if listing.top:
+        print("TOP_MODULE\t:\t'%s'" % listing.top)
+        parameters["TOP_MODULE"] = listing.top
+    # normalize path of files accross platform
+    files = [(f.replace("\\", "/"), m) for f, m in listing.files]
+    return files, parameters
 
 
 if __name__ == "__main__":
@@ -450,5 +850,19 @@ if __name__ == "__main__":
     parser.add_argument(
         "-nl", "--no-logger", action="store_true", help="already include logger macro"
     )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["text", "jsonl"],
+        default="text",
+        help="format of the listing",
+    )
+    parser.add_argument(
+        "--cache-stats", action="store_true", help="report the hits of the parse cache"
+    )
     args = parser.parse_args()
-    read_from(args.input, args.no_logger, False)
+    read_from(args.input, args.no_logger, False, args.format)
+    if args.cache_stats:
+        print(sources_cache().report(), file=sys.stderr)
+        print(timescale_cache().report(), file=sys.stderr)
+        print(utils.files.cache_report(), file=sys.stderr)
@@ -2,7 +2,6 @@ import io
 import os
 import re
 import sys
-import numpy
 import logging
 
 logging.basicConfig(
@@ -69,56 +68,182 @@ def display_log(path: str, SUMMARY: bool = False):
     """
     display log file given by path
     """
-    Warnings, Errors = 0, 0
     if not os.path.exists(path):
         return None
-    with open(path, "r+") as fp:
-        k = 0
-        for k, l in enumerate(fp.readlines()):
-            if "Warning" in l:
-                Warnings += 1
-            elif "Error" in l:
-                Errors += 1
-            if not SUMMARY:
-                print(l.strip())
-        if k == 0:
-            print("Log file is empty")
-        else:
-            if Warnings + Errors == 0:
-                info("Succesful Operation(s)")
-            elif Errors == 0:
-                warning("Found %d warning(s)" % Warnings)
-            else:
-                error("Found %d warning(s) and %d error(s)" % (Warnings, Errors))
+    log_filter = read_log(path, None if SUMMARY else sys.stdout)
+    Warnings, Errors = log_filter.warnings(), log_filter.errors()
+    if log_filter.lines == 0:
+        print("Log file is empty")
+    elif Warnings + Errors == 0:
+        info("Succesful Operation(s)")
+    elif Errors == 0:
+        warning("Found %d warning(s)" % Warnings)
+    else:
+        error("Found %d warning(s) and %d error(s)" % (Warnings, Errors))
 
 
 def get_stats(path: str):
     """
     return stats from log file of simulations
     Number of warnings
-    Number of errors
+    Number of errors (fatal included)
     """
-    Warnings, Errors = 0, 0
     if not os.path.exists(path):
-        return (numpy.nan, numpy.nan)
-    with open(path, "r+") as fp:
-        k = 0
-        for k, l in enumerate(fp.readlines()):
-            if "WARNING" in l:
-                Warnings += 1
-            elif "ERROR" in l:
-                Errors += 1
-    return Warnings, Errors
+        return (float("nan"), float("nan"))
+    # counted while the log was written
+    stats = LOG_STATS.get(os.path.abspath(path))
+    if stats is None or stats["size"] != os.path.getsize(path):
+        stats = read_log(path).stats()
+    counters = stats["counters"]
+    return counters["warning"], counters["error"] + counters["fatal"]
+
+
+def first_error(since: dict = {}) -> str:
+    """
+    location <log>:<line> of the first error in the logs
+    written since the snapshot of LOG_STATS given
+    """
+    for path, stats in LOG_STATS.items():
+        if since.get(path) is not stats and stats["first_error"]:
+            return "%s:%d" % (path, stats["first_error"])
+    return None
 
 
 # ==== filters ====
+# color codes of the terminal (the escape character can be already removed)
+COLOR_PATTERN = re.compile(r"\x1b?\[\d?;?\d{1,2}m|\x1b")
+COLOR_PATTERN_BYTES = re.compile(COLOR_PATTERN.pattern.encode("ascii"))
+# regex of each severity, overridden by the [log] section of the config
+DEFAULT_SEVERITIES = {
+    "info": r"\binfo\b",
+    "warning": r"\bwarning\b",
+    "error": r"\berror\b",
+    "fatal": r"\bfatal\b",
+}
+SEVERITY_PATTERN = None
+# stats of the logs written through a LogFilter by path
+LOG_STATS = {}
+
+
+def set_severities(patterns: dict = {}):
+    """
+    define the case insensitive regex of each severity
+    the first one found in a line gives its severity
+    """
+    global SEVERITY_PATTERN
+    severities = {**DEFAULT_SEVERITIES, **patterns}
+    groups = "|".join(
+        "(?P<%s>%s)" % (name, severities[name]) for name in DEFAULT_SEVERITIES
+    )
+    SEVERITY_PATTERN = re.compile(
+        ("^[^\n]*?(?:%s)" % groups).encode("utf-8"), re.MULTILINE | re.IGNORECASE
+    )
+
+
+set_severities()
+
+
+class LogFilter:
+    """
+    streaming filter of a log removing color codes and
+    counting the lines of each severity (info, warning, error, fatal)
+
+    chunks of any size are accepted, an incomplete
+    last line is kept until the next chunk
+    """
+
+    __slots__ = ["encoding", "pending", "counters", "lines", "first_error"]
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self.pending = b""
+        self.counters = dict.fromkeys(DEFAULT_SEVERITIES, 0)
+        self.lines = 0
+        self.first_error = None
+
+    def feed(self, chunk: bytes) -> str:
+        """
+        return the filtered text of the complete lines
+        """
+        data = self.pending + chunk
+        end = data.rfind(b"\n") + 1
+        self.pending = data[end:]
+        return self._process(data[:end])
+
+    def flush(self) -> str:
+        """
+        return the filtered text of the last incomplete line
+        """
+        data, self.pending = self.pending, b""
+        return self._process(data + b"\n") if data else ""
+
+    def _process(self, data: bytes) -> str:
+        data = COLOR_PATTERN_BYTES.sub(b"", data)
+        counters = self.counters
+        for m in SEVERITY_PATTERN.finditer(data):
+            counters[m.lastgroup] += 1
+            if self.first_error is None and m.lastgroup in ("error", "fatal"):
+                self.first_error = self.lines + data.count(b"\n", 0, m.start()) + 1
+        self.lines += data.count(b"\n")
+        return data.decode(self.encoding, errors="replace")
+
+    def warnings(self) -> int:
+        return self.counters["warning"]
+
+    def errors(self) -> int:
+        return self.counters["error"] + self.counters["fatal"]
+
+    def stats(self) -> dict:
+        return {
+            "size": None,
+            "counters": dict(self.counters),
+            "lines": self.lines,
+            "first_error": self.first_error,
+        }
+
+    def register(self, path: str, offset: int = 0):
+        """
+        record the stats of the log written in path from offset
+        (size of the log before being appended) for get_stats
+        """
+        path = os.path.abspath(path)
+        stats = self.stats()
+        previous = LOG_STATS.pop(path, None)
+        if offset:
+            # cannot tell the stats of the beginning of the log
+            if previous is None or previous["size"] != offset:
+                return
+            for k, v in previous["counters"].items():
+                stats["counters"][k] += v
+            if previous["first_error"]:
+                stats["first_error"] = previous["first_error"]
+            elif stats["first_error"]:
+                stats["first_error"] += previous["lines"]
+            stats["lines"] += previous["lines"]
+        stats["size"] = os.path.getsize(path)
+        LOG_STATS[path] = stats
+
+
+def read_log(path: str, out=None) -> LogFilter:
+    """
+    filter a log by chunks and copy it in out if given
+    """
+    log_filter = LogFilter()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b""):
+            text = log_filter.feed(chunk)
+            if out:
+                out.write(text)
+    text = log_filter.flush()
+    if out:
+        out.write(text)
+    return log_filter
+
+
 def _filter_color(i):
-    PATTERN = r"\[\d?;?\d{1,2}m"
     if isinstance(i, str):
-        return re.sub(PATTERN, "", i)
-    _s = i.replace(b"\033", b"").decode("utf-8")
-    ans = re.sub(PATTERN, "", _s)
-    return ans
+        return COLOR_PATTERN.sub("", i)
+    return COLOR_PATTERN_BYTES.sub(b"", i).decode("utf-8")
 
 
 def filter_stream(i):
@@ -5,14 +5,11 @@ import os
 import copy
 import json
 
-from mako.template import Template
-
 import common.utils as utils
 import common.verilog as verilog
+import common.design_db as design_db
 import common.read_sources as read_sources
 
-import digital.tools.libgen as libgen
-
 
 @utils.rules.apply_for("*_ana.xlsx")
 def generate_lib(node, *args, **kwargs):
@@ -22,27 +19,23 @@ def generate_lib(node, *args, **kwargs):
     """
     # get current working directory
     output_dir = utils.get_tmp_folder()
-    # db path
-    db_path = os.path.join(output_dir, "db.json")
-    if os.path.exists(db_path):
-        with open(db_path, "r") as fp:
-            db = json.load(fp)
-    else:
-        db = {}
-    if "libs" not in db:
-        db["libs"] = {}
+    db = design_db.open_db(output_dir)
     # generate libs for synthesis
     sheetname = node.params.get("TAGS")[-1] if "TAGS" in node.params else "Timing"
-    libs, lib = libgen.main(node.name, output_dir, sheetname)
+    row = db.lookup(node.name, sheetname)
+    outputs = json.loads(row[-1]) if row else []
+    if not row or not all(map(os.path.exists, outputs)):
+        # openpyxl and mako are only loaded when a lib is generated
+        import digital.tools.libgen as libgen
+
+        outputs, lib = libgen.main(node.name, output_dir, sheetname)
+        # register in database
+        db.update(node.name, sheetname, libs=[lib], outputs=outputs)
     # register generated file
-    for libnode in libs:
+    for libnode in outputs:
         n = copy.deepcopy(node)
         n.name = libnode
         yield n
-    # register in database
-    db["libs"][lib.name] = lib.to_dict()
-    with open(db_path, "w+") as fp:
-        fp.write(json.dumps(db, indent=2, sort_keys=True, default=utils.json_encoder))
     # generate a simulation verilog file
 
 
@@ -57,41 +50,18 @@ def add_in_database(node, *args, **kwargs):
     """
     # get current working directory
     output_dir = utils.get_tmp_folder()
-    os.makedirs(output_dir, exist_ok=True)
-    # db path
-    db_path = os.path.join(output_dir, "db.json")
-    if os.path.exists(db_path):
-        with open(db_path, "r") as fp:
-            db = json.load(fp)
-    else:
-        db = {}
-    if "includes" not in db:
-        db["includes"] = []
-    if "modules" not in db:
-        db["modules"] = {}
-    if "timescales" not in db:
-        db["timescales"] = []
-    # parse the verilog file
-    includes = verilog.find_includes(node.name)
-    db["includes"].extend(read_sources.resolve_includes(includes))
-    db["timescales"].extend(verilog.find_timescale(node.name))
-    for m in verilog.find_modules(node.name):
-        module = verilog.Module(m[0])
-        if m[1]:
-            module.parse_parameters(m[1])
-        module.parse_pins(m[2])
-        module.parse_parameters(m[-1])
-        module.parse_pins(m[-1])
-        for i in verilog.find_instances(node.name):
-            if i[1]:
-                instance = verilog.Instance(i[2], i[0])
-                instance.parse_parameters(i[1])
-            else:
-                instance = verilog.Instance(i[2], i[0])
-            module.instances.append(instance)
-        db["modules"][module.name] = module.to_dict()
-    with open(db_path, "w+") as fp:
-        fp.write(json.dumps(db, indent=2, sort_keys=True))
+    db = design_db.open_db(output_dir)
+    # only parse the verilog file if it changed
+    if db.lookup(node.name):
+        return
+    index = verilog.index_file(node.name)
+    db.update(
+        node.name,
+        modules=index.modules,
+        # saved once at the end of the listing
+        includes=read_sources.include_graph().incdirs([node.name]),
+        timescales=index.timescales,
+    )
 
 
 @utils.rules.apply_for("*.v.mako")
@@ -100,22 +70,24 @@ def generate_file(node, *args, **kwargs):
     generate a verilog file from a template
     and a database or a dependency
     """
+    from mako.template import Template
+    import digital.tools.libgen as libgen
+
     # get current working directory
     output_dir = utils.get_tmp_folder()
     # read dependancies
-    db_path = os.path.join(output_dir, "db.json")
-    if os.path.exists(db_path):
-        with open(db_path, "r") as fp:
-            db = json.load(fp)
-    # deserialize
-    db["libs"] = {
-        name: libgen.Lib.from_json(lib) for name, lib in db.get("libs", {}).items()
+    db = design_db.open_db(output_dir)
+    # modules and libs are deserialized when the template reads them
+    context = {
+        "libs": db.libs(libgen.Lib.from_json),
+        "modules": db.modules(verilog.Module.from_json),
+        "includes": db.collect("includes"),
+        "timescales": db.collect("timescales"),
     }
-    db["modules"] = [verilog.Module.from_json(m) for m in db.get("modules", {}).values()]
     # generate file from the template
     _tmp = Template(filename=node.name)
     with open(os.path.join(output_dir, node.name.replace(".mako", "")), "w+") as fp:
-        fp.write(_tmp.render_unicode(**db))
+        fp.write(_tmp.render_unicode(**context))
     # return the file generated from the template
     n = copy.deepcopy(node)
     n.name = node.name.replace(".mako", "")
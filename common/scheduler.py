@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+import time
+
+from enum import Enum
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import common.relog as relog
+
+
+class TaskStatus(Enum):
+    PENDING = 0
+    RUNNING = 1
+    PASSED = 2
+    FAILED = 3
+    SKIPPED = 4
+
+
+# ==== Task Graph ====
+class Task:
+    __slots__ = ["name", "func", "args", "deps", "always", "cost", "status", "result"]
+
+    def __init__(
+        self,
+        name: str,
+        func,
+        args: tuple = (),
+        deps: list = None,
+        always: bool = False,
+        cost: float = None,
+    ):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.deps = list(deps or [])
+        self.always = always
+        self.cost = cost
+        self.status = TaskStatus.PENDING
+        self.result = None
+
+    def is_ready(self) -> bool:
+        if self.status is not TaskStatus.PENDING:
+            return False
+        # an 'always' task only waits for its dependencies to finish
+        if self.always:
+            return all(dep.status.value >= TaskStatus.PASSED.value for dep in self.deps)
+        return all(dep.status is TaskStatus.PASSED for dep in self.deps)
+
+    def is_blocked(self) -> bool:
+        return (
+            self.status is TaskStatus.PENDING
+            and not self.always
+            and any(
+                dep.status in (TaskStatus.FAILED, TaskStatus.SKIPPED) for dep in self.deps
+            )
+        )
+
+    def __str__(self):
+        return "T %s: %d dependencies (%s)" % (
+            self.name,
+            len(self.deps),
+            self.status.name.lower(),
+        )
+
+
+class Scheduler:
+    """
+    execute a graph of tasks: a task is started as soon as
+    all its dependencies passed, with at most `jobs` tasks
+    running at the same time
+
+    a task passes if its function returns a value evaluated to True
+    and the dependents of a failing task are skipped unless
+    they are declared with always=True
+
+    ready tasks are started by decreasing critical path, estimated
+    from the expected cost (duration in ms) of the tasks
+    """
+
+    def __init__(self, jobs: int = 1):
+        self.jobs = max(1, jobs)
+        self.tasks = []
+
+    def add(
+        self,
+        name: str,
+        func,
+        *args,
+        deps: list = None,
+        always: bool = False,
+        cost: float = None,
+    ) -> Task:
+        task = Task(name, func, args, deps, always, cost)
+        self.tasks.append(task)
+        return task
+
+    def costs(self) -> dict:
+        """
+        expected cost of each task, tasks never executed
+        are assumed to last as long as the average one
+        """
+        known = [task.cost for task in self.tasks if task.cost is not None]
+        default = sum(known) / len(known) if known else 0.0
+        return {task: default if task.cost is None else task.cost for task in self.tasks}
+
+    def ranks(self, costs: dict) -> dict:
+        """
+        length of the longest path from each task to the end of the graph
+        """
+        dependents = {task: [] for task in self.tasks}
+        for task in self.tasks:
+            for dep in task.deps:
+                dependents[dep].append(task)
+        ranks = {}
+        # visit dependents before the task itself
+        for task in self.tasks:
+            stack = [(task, False)]
+            # tasks of the current path, not followed again on a cycle
+            visiting = set()
+            while stack:
+                t, expanded = stack.pop()
+                if t in ranks:
+                    continue
+                if expanded:
+                    visiting.discard(t)
+                    ranks[t] = costs[t] + max(
+                        (ranks.get(d, 0.0) for d in dependents[t]), default=0.0
+                    )
+                    continue
+                if t in visiting:
+                    continue
+                visiting.add(t)
+                stack.append((t, True))
+                stack.extend(
+                    (d, False) for d in dependents[t] if d not in ranks and d not in visiting
+                )
+        return ranks
+
+    def eta(self, costs: dict, started: dict) -> str:
+        """
+        estimated time to complete the remaining tasks
+        """
+        now = time.time() * 1000.0
+        remaining = sum(
+            costs[task]
+            if task.status is TaskStatus.PENDING
+            else max(costs[task] - (now - started[task]), 0.0)
+            for task in self.tasks
+            if task.status in (TaskStatus.PENDING, TaskStatus.RUNNING)
+        )
+        return str(timedelta(seconds=round(remaining / self.jobs / 1000.0)))
+
+    def run(self) -> dict:
+        """
+        run all the tasks and return their status by name
+        """
+        N = len(self.tasks)
+        done = 0
+        running = {}
+        started = {}
+        costs = self.costs()
+        ranks = self.ranks(costs)
+        queue = sorted(self.tasks, key=lambda task: ranks[task], reverse=True)
+        show_eta = any(task.cost is not None for task in self.tasks)
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while True:
+                # propagate failures to dependents
+                blocked = [task for task in self.tasks if task.is_blocked()]
+                while blocked:
+                    for task in blocked:
+                        task.status = TaskStatus.SKIPPED
+                        done += 1
+                        relog.warning(f"[{done}/{N}] Skip {task.name}")
+                    blocked = [task for task in self.tasks if task.is_blocked()]
+                # dispatch ready tasks on free workers longest first
+                for task in queue:
+                    if len(running) >= self.jobs:
+                        break
+                    if task.is_ready():
+                        task.status = TaskStatus.RUNNING
+                        started[task] = time.time() * 1000.0
+                        running[pool.submit(task.func, *task.args)] = task
+                if not running:
+                    break
+                # wait for at least one task to finish
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task = running.pop(future)
+                    done += 1
+                    try:
+                        task.result = future.result()
+                    except Exception as e:
+                        relog.error("%s raised %s" % (task.name, e))
+                        task.result = None
+                    task.status = TaskStatus.PASSED if task.result else TaskStatus.FAILED
+                    eta = " (ETA %s)" % self.eta(costs, started) if show_eta else ""
+                    if task.result:
+                        relog.info(f"[{done}/{N}] Done {task.name}{eta}")
+                    else:
+                        relog.error(f"[{done}/{N}] Failed {task.name}{eta}")
+        # tasks never started are part of a circular dependency
+        for task in self.tasks:
+            if task.status is TaskStatus.PENDING:
+                raise Exception("Circular dependency detected on %s" % task.name)
+        return {task.name: task.status for task in self.tasks}
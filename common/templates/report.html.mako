@@ -186,7 +186,7 @@ def get_block_name(block: dict):
                 <tr>
                     <td>${lint.get("name")}</td>
                     <td>${"%d" % lint.get("warnings")}</td>
-                    <td>${"%d" % lint.get("errors")}</td>
+                    <td title="${lint.get('first_error', '')}">${"%d" % lint.get("errors")}</td>
                     <td>${to_time(lint.get("total_time"))}</td>
                 </tr>
                 % endfor
@@ -210,7 +210,7 @@ def get_block_name(block: dict):
                 <tr>
                     <td>${sim.get("name")}</td>
                     <td>${"%d" % sim.get("warnings")}</td>
-                    <td>${"%d" % sim.get("errors")}</td>
+                    <td title="${sim.get('first_error', '')}">${"%d" % sim.get("errors")}</td>
                     <td>${to_time(sim.get("total_time"))}</td>
                 </tr>
                 % endfor
@@ -234,7 +234,7 @@ def get_block_name(block: dict):
                 <tr>
                     <td>${cov.get("name")}</td>
                     <td>${"%d" % cov.get("warnings")}</td>
-                    <td>${"%d" % cov.get("errors")}</td>
+                    <td title="${cov.get('first_error', '')}">${"%d" % cov.get("errors")}</td>
                     <td>${to_time(cov.get("total_time"))}</td>
                 </tr>
                 % endfor
@@ -1,12 +1,27 @@
 #!/usr/bin/env python3
 # coding: utf-8
 
+from importlib import import_module
+
 import common.utils.files as files
 import common.utils.rules as rules
 import common.utils.stats as stats
-import common.utils.tools as tools
-import common.utils.graphs as graphs
 import common.utils.parsers as parsers
-import common.utils.wine as wine
 
 from common.utils.run import *
+
+# submodules pulling heavy dependencies (matplotlib, numpy, ...)
+# or used by few commands are only imported on first access
+LAZY_SUBMODULES = ("cache", "tools", "graphs", "wine")
+
+
+def __getattr__(name: str):
+    if name in LAZY_SUBMODULES:
+        module = import_module("common.utils.%s" % name)
+        globals()[name] = module
+        return module
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + list(LAZY_SUBMODULES))
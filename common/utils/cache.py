@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+import os
+import json
+import threading
+
+
+def cache_dir() -> str:
+    """
+    directory of the persistent caches of reflow
+    $REFLOW_CACHE_DIR or $XDG_CACHE_HOME/reflow (~/.cache/reflow)
+    """
+    if os.getenv("REFLOW_CACHE_DIR"):
+        return os.environ["REFLOW_CACHE_DIR"]
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "reflow")
+
+
+class Cache:
+    """
+    persistent key-value store of json values in <cache dir>/<name>.json
+
+    entries are loaded on first access and written back by save(),
+    merged with the entries saved meanwhile by other processes
+    the store is discarded when its version differs from the expected one
+    """
+
+    def __init__(self, name: str, version: int = 1):
+        self.name = name
+        self.version = version
+        self.lock = threading.RLock()
+        self.entries = None
+        self.updated = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(cache_dir(), "%s.json" % self.name)
+
+    def load(self) -> dict:
+        try:
+            with open(self.path, "r") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return {}
+        return data.get("entries", {})
+
+    def get(self, key: str):
+        with self.lock:
+            if self.entries is None:
+                self.entries = self.load()
+            return self.entries.get(key)
+
+    def set(self, key: str, value):
+        with self.lock:
+            if self.entries is None:
+                self.entries = self.load()
+            self.entries[key] = value
+            self.updated[key] = value
+
+    def record(self, hit: bool):
+        """
+        count the valid (hit) and invalid or missing (miss) entries
+        """
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def save(self) -> bool:
+        """
+        write the updated entries, return False if the cache
+        directory is not writable (the cache is then in memory only)
+        """
+        with self.lock:
+            if not self.updated:
+                return True
+            entries = {**self.load(), **self.updated}
+            try:
+                os.makedirs(cache_dir(), exist_ok=True)
+                tmp_path = "%s.%d" % (self.path, os.getpid())
+                with open(tmp_path, "w+") as fp:
+                    json.dump({"version": self.version, "entries": entries}, fp)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                return False
+            self.entries = {**entries, **self.entries}
+            self.updated = {}
+            return True
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return "%s cache: %d hit(s), %d miss(es) (%.0f%% hit rate)" % (
+            self.name,
+            self.hits,
+            self.misses,
+            rate,
+        )
@@ -3,6 +3,8 @@
 
 import os
 
+from stat import S_ISDIR, S_ISREG
+
 
 TYPES = {
     "VERILOG_AMS": [".vams"],
@@ -14,9 +16,83 @@ TYPES = {
 }
 
 
+# ==== memoized file system queries ====
+# result of os.stat (None if missing) and os.path.realpath of paths during a run
+STAT_CACHE = {}
+REALPATH_CACHE = {}
+# number of file system calls done and saved by the caches
+FS_CALLS = {"done": 0, "saved": 0}
+
+
+def stat(path: str):
+    """
+    os.stat of the path or None if it does not exist
+    """
+    try:
+        st = STAT_CACHE[path]
+        FS_CALLS["saved"] += 1
+        return st
+    except KeyError:
+        pass
+    FS_CALLS["done"] += 1
+    try:
+        st = os.stat(path)
+    except (OSError, ValueError):
+        st = None
+    STAT_CACHE[path] = st
+    return st
+
+
+def exists(path: str) -> bool:
+    return stat(path) is not None
+
+
+def isfile(path: str) -> bool:
+    st = stat(path)
+    return st is not None and S_ISREG(st.st_mode)
+
+
+def isdir(path: str) -> bool:
+    st = stat(path)
+    return st is not None and S_ISDIR(st.st_mode)
+
+
+def realpath(path: str) -> str:
+    try:
+        ans = REALPATH_CACHE[path]
+        FS_CALLS["saved"] += 1
+        return ans
+    except KeyError:
+        pass
+    FS_CALLS["done"] += 1
+    ans = REALPATH_CACHE[path] = os.path.realpath(path)
+    return ans
+
+
+def forget(path: str):
+    """
+    drop the cached queries of a path created or removed during the run
+    """
+    STAT_CACHE.pop(path, None)
+    REALPATH_CACHE.pop(path, None)
+
+
+def clear_cache():
+    STAT_CACHE.clear()
+    REALPATH_CACHE.clear()
+    FS_CALLS.update(done=0, saved=0)
+
+
+def cache_report() -> str:
+    return "file system: %d call(s), %d saved by the cache" % (
+        FS_CALLS["done"],
+        FS_CALLS["saved"],
+    )
+
+
 # ==== mime-type of files ====
 def get_type(filepath: str) -> str:
-    if not os.path.isfile(filepath):
+    if not isfile(filepath):
         return None
     _, ext = os.path.splitext(filepath)
     for k, v in TYPES.items():
@@ -30,7 +106,7 @@ def is_mixed(filepath: str) -> bool:
 
 
 def is_digital(filepath: str) -> bool:
-    if not os.path.isfile(filepath):
+    if not isfile(filepath):
         return "digital" in filepath
     _, ext = os.path.splitext(filepath)
     return get_type(filepath) not in ["ANALOG", None]
@@ -38,3 +114,17 @@ def is_digital(filepath: str) -> bool:
 
 def is_analog(filepath: str) -> bool:
     return get_type(filepath) in ["ANALOG"]
+
+
+# ==== content of files ====
+def hash_file(filepath: str) -> str:
+    """
+    sha1 of the content of a file
+    """
+    import hashlib
+
+    h = hashlib.sha1()
+    with open(filepath, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
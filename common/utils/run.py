@@ -2,10 +2,23 @@
 # coding: utf-8
 
 import os
+import ast
 import sys
+import json
 import datetime
 
 
+def literal_value(text: str):
+    """
+    python literal of a parameter value (list, string, number)
+    or the text itself if it is not a literal
+    """
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
 def get_sources(src, out: str = None, prefix: str = "") -> tuple:
     """
     list only the files which corresponds to code from
@@ -13,7 +26,7 @@ def get_sources(src, out: str = None, prefix: str = "") -> tuple:
     results is saved in either a stream (stdout) or a file
     Args:
         src (iterable): information stream containing files' path,
-                        parameters, ...
+                        parameters, ... as text or json lines
         out      (str): path to a file
                         by default it will be sys.stdout
         prefix   (str): prefix to place in front of files' path
@@ -29,17 +42,35 @@ def get_sources(src, out: str = None, prefix: str = "") -> tuple:
         fp_src = sys.stdout
     # parse all lines
     for line in src:
+        path, record = None, None
+        # json-lines record
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                pass
+        if record is not None:
+            if "file" in record:
+                path, mime = record["file"], record["mime"]
+            elif "param" in record:
+                params[record["param"]] = record["value"]
+            elif "timescale" in record:
+                params["TIMESCALE"] = record["timescale"]
+            elif "top" in record:
+                params["TOP_MODULE"] = record["top"]
         # code file
-        if ";" in line:
+        elif ";" in line:
             path, mime = line.strip().split(";", 2)
-            if out is None:
-                files.append((path, mime))
-            else:
-                fp_src.write("%s%s\n" % (prefix, path))
         # parameter
         elif ":" in line:
             a, b = line.split(":", 2)
-            params[a.strip()] = eval(b.strip())
+            params[a.strip()] = literal_value(b.strip())
+        if path is None:
+            continue
+        if out is None:
+            files.append((path, mime))
+        else:
+            fp_src.write("%s%s\n" % (prefix, path))
     if not fp_src == sys.stdout:
         fp_src.close()
     return files, params
@@ -5,6 +5,9 @@ import os
 
 from common.utils.parsers import parse_eng_unit
 
+# stats which are not numerical values
+TEXT_STATS = ("First Error",)
+
 
 def read_sim_stat(path: str):
     # <block>/.tmp_<type of sim>/<type of sim>.stats
@@ -16,7 +19,12 @@ def read_sim_stat(path: str):
             (line.split(":", 1) for i, line in enumerate(fp) if ":" in line and i > 0)
         )
 
-        db_sim = {k: parse_eng_unit(v) for k, v in db_sim.items()}
+        db_sim = {
+            k: v.strip() if k in TEXT_STATS else parse_eng_unit(v)
+            for k, v in db_sim.items()
+        }
+        if "First Error" in db_sim:
+            db_sim["first_error"] = db_sim.pop("First Error")
         if "Sim. Time" in db_sim:
             db_sim["total_time"] = db_sim.pop("Sim. Time")
         else:
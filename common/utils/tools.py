@@ -4,21 +4,141 @@
 import os
 import sys
 import time
-import numpy
 import datetime
+import configparser
 
-from pathlib import Path
-from importlib import import_module
+from importlib import import_module, reload
 from importlib.util import spec_from_file_location, module_from_spec
 
+import common.relog as relog
+import common.utils as utils
+import common.read_config as read_config
+
 from common.utils.run import get_tmp_folder
 from common.read_config import Config
 
 
+# ==== registry of the tools ====
+# version of the index of the tools stored in the cache directory
+REGISTRY_VERSION = 1
+# directories never searched for tools (hidden ones are skipped too)
+REGISTRY_SKIPPED_DIRS = read_config.SKIPPED_DIRS + ("site-packages",)
+# tool name -> {path, configs, actions} by root directory of reflow
+REGISTRIES = {}
+
+
+def skipped(name: str) -> bool:
+    return name.startswith(".") or name in REGISTRY_SKIPPED_DIRS
+
+
+def mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def read_actions(configs: list) -> dict:
+    """
+    actions declared in the [actions] section of the configs of a tool
+    """
+    config = configparser.ConfigParser(strict=False, interpolation=None)
+    for conf in configs:
+        try:
+            config.read(conf)
+        except configparser.Error:
+            relog.warning("cannot read the actions of %s" % conf)
+    return dict(config["actions"]) if config.has_section("actions") else {}
+
+
+def scan_tools(root: str) -> dict:
+    """
+    tools of reflow being the directories of any tools/ directory
+    return the registry and the paths whose mtime invalidate it
+    """
+    tools, stamp = {}, []
+    for path, dirs, _ in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not skipped(d))
+        if os.path.basename(path) != "tools":
+            continue
+        stamp.append(path)
+        for name in dirs:
+            tool_path = os.path.join(path, name)
+            stamp.append(tool_path)
+            configs = []
+            for sub_path, sub_dirs, files in os.walk(tool_path):
+                sub_dirs[:] = sorted(d for d in sub_dirs if not skipped(d))
+                configs.extend(
+                    os.path.join(sub_path, f) for f in sorted(files) if f.endswith(".config")
+                )
+            stamp.extend(configs)
+            # the first tool found of a given name is kept
+            tools.setdefault(
+                name,
+                {"path": tool_path, "configs": configs, "actions": read_actions(configs)},
+            )
+        # the tools are not searched inside of the tools
+        dirs[:] = []
+    return tools, [[p, mtime(p)] for p in stamp]
+
+
+def registry(rebuild: bool = False) -> dict:
+    """
+    index of the tools loaded once per process from the cache directory
+    and rebuilt when a tools/ directory, a tool or its configs changed
+    """
+    root = os.path.realpath(os.environ["REFLOW"])
+    if not rebuild and root in REGISTRIES:
+        return REGISTRIES[root]
+    cache = utils.cache.Cache("tools", REGISTRY_VERSION)
+    entry = None if rebuild else cache.get(root)
+    if entry and all(mtime(p) == t for p, t in entry["stamp"]):
+        cache.record(True)
+    else:
+        cache.record(False)
+        tools, stamp = scan_tools(root)
+        entry = {"tools": tools, "stamp": stamp}
+        cache.set(root, entry)
+        cache.save()
+    REGISTRIES[root] = entry["tools"]
+    return entry["tools"]
+
+
 def find_tool(name: str):
-    spec = "**/tools/%s" % name
-    for file in Path(os.environ["REFLOW"]).rglob(spec):
-        return file
+    """
+    directory of a tool or None if it does not exist
+    """
+    tool = registry().get(name)
+    return tool["path"] if tool else None
+
+
+def tool_configs(name: str) -> list:
+    """
+    configuration files of a tool
+    """
+    tool = registry().get(name)
+    return tool["configs"] if tool else []
+
+
+def load_tool_configs(name: str):
+    for conf in tool_configs(name):
+        Config.add_configs(conf)
+
+
+def list_tools(rebuild: bool = True):
+    """
+    print the tools with their actions, the ones
+    configured in the [tools] section are marked with *
+    """
+    tools = registry(rebuild)
+    configured = set(Config.tools.values()) if Config.data.has_section("tools") else set()
+    width = max((len(name) for name in tools), default=0)
+    for name, tool in sorted(tools.items()):
+        actions = ", ".join(tool["actions"]) or "-"
+        print(
+            "%s %-*s  %-24s %s"
+            % ("*" if name in configured else " ", width, name, actions, tool["path"])
+        )
 
 
 def import_tool(module_name, file, location):
@@ -34,15 +154,24 @@ def launch_tool(
 ):
     # find the tool
     tool_path = find_tool(tool_name)
-    sys.path.append(os.path.dirname(tool_path))
+    if tool_path is None:
+        relog.error("tool %s is not found in %s" % (tool_name, os.environ["REFLOW"]))
+        return
+    tool_dir = os.path.dirname(tool_path)
+    if tool_dir not in sys.path:
+        sys.path.append(tool_dir)
     # load it and its config
-    tool = import_module(tool_name)
-    for conf in Path(tool_path).rglob("*.config"):
-        Config.add_configs(conf)
+    # reload it in long-lived batch workers to update its module variables
+    if tool_name in sys.modules:
+        tool = reload(sys.modules[tool_name])
+    else:
+        tool = import_module(tool_name)
+    load_tool_configs(tool_name)
     # check actions are defined
     task = Config.actions.get(action) if "actions" in Config.data.sections() else "main"
     # execute it and time it
     t_start = time.time() * 1000.0
+    logs = dict(relog.LOG_STATS)
     pre, post = callbacks
     warnings_errors = []
     if pre:
@@ -52,9 +181,15 @@ def launch_tool(
         warnings_errors.append(post(*args, **kwargs))
     t_end = time.time() * 1000.0
     # store statistics
+    import numpy
+
     warnings, errors = numpy.nansum(warnings_errors, axis=0)
     with open(os.path.join(get_tmp_folder(), "./%s.stats" % action), "w+") as fp:
         fp.write("%s\n" % datetime.datetime.now())
         fp.write("Warnings: %d\n" % warnings)
         fp.write("Errors: %d\n" % errors)
         fp.write("Sim. Time: %d\n" % (t_end - t_start))
+        # location of the first error in the logs of the tool
+        location = relog.first_error(since=logs)
+        if location:
+            fp.write("First Error: %s\n" % location)
@@ -1,43 +1,327 @@
 #!/usr/bin/env python3
 
+import gc
+import io
+import os
 import re
 from enum import Enum
 
 
 PATTERN_DIR = r"((?!initial)[iInNoOuU]{2}[\w]+t)"
 PATTERN_RNG = r"(\[\s*[\w\-\+\(\)\*\/\$]+\s*:\s*[\w\-\+\(\)\*\/\$]+\s*\])"
-PATTERN_RNG_CAPTURE = r"\[\s*([\w\-\+\(\)\*\/\$]+)\s*:\s*([\w\-\+\(\)\*\/\$]+)\s*\]"
+
+
+# ==== Expressions =====
+PATTERN_EXPR_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<based>(?:\d[\d_]*)?\s*'[sS]?[bBoOdDhH]\s*[0-9a-fA-F_xXzZ?]+)"
+    r"|(?P<real>\d[\d_]*(?:\.[\d_]+(?:[eE][+-]?\d+)?|[eE][+-]?\d+))"
+    r"|(?P<int>\d[\d_]*)"
+    r"|(?P<id>\$?[A-Za-z_][\w$]*(?:::[A-Za-z_][\w$]*)?)"
+    r"|(?P<op>\*\*|<<<|>>>|===|!==|<<|>>|<=|>=|==|!=|&&|\|\||~\^|\^~|[-+*/%()?:<>!~&|^,])"
+    r")"
+)
+BASES = {"b": 2, "o": 8, "d": 10, "h": 16}
+# errors of an expression which cannot be computed
+UNRESOLVED = (KeyError, ValueError, TypeError, ZeroDivisionError, OverflowError)
+
+
+def divide(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        # integer division truncates toward zero
+        q = abs(a) // abs(b)
+        return q if (a < 0) == (b < 0) else -q
+    return a / b
+
+
+def modulo(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a - b * divide(a, b)
+    raise ValueError("modulo of real numbers")
+
+
+# operator -> (precedence, function)
+BINARY_OPERATORS = {
+    "||": (1, lambda a, b: int(bool(a) or bool(b))),
+    "&&": (2, lambda a, b: int(bool(a) and bool(b))),
+    "|": (3, lambda a, b: a | b),
+    "^": (4, lambda a, b: a ^ b),
+    "~^": (4, lambda a, b: ~(a ^ b)),
+    "^~": (4, lambda a, b: ~(a ^ b)),
+    "&": (5, lambda a, b: a & b),
+    "==": (6, lambda a, b: int(a == b)),
+    "!=": (6, lambda a, b: int(a != b)),
+    "===": (6, lambda a, b: int(a == b)),
+    "!==": (6, lambda a, b: int(a != b)),
+    "<": (7, lambda a, b: int(a < b)),
+    "<=": (7, lambda a, b: int(a <= b)),
+    ">": (7, lambda a, b: int(a > b)),
+    ">=": (7, lambda a, b: int(a >= b)),
+    "<<": (8, lambda a, b: a << b),
+    ">>": (8, lambda a, b: a >> b),
+    "<<<": (8, lambda a, b: a << b),
+    ">>>": (8, lambda a, b: a >> b),
+    "+": (9, lambda a, b: a + b),
+    "-": (9, lambda a, b: a - b),
+    "*": (10, lambda a, b: a * b),
+    "/": (10, divide),
+    "%": (10, modulo),
+    "**": (11, lambda a, b: a**b),
+}
+UNARY_OPERATORS = {
+    "+": lambda a: a,
+    "-": lambda a: -a,
+    "!": lambda a: int(not a),
+    "~": lambda a: ~a,
+}
+FUNCTIONS = {
+    "$clog2": lambda a: (int(a) - 1).bit_length() if a > 1 else 0,
+    "$signed": lambda a: a,
+    "$unsigned": lambda a: a,
+    "$rtoi": int,
+    "$itor": float,
+}
+
+
+def parse_literal(kind: str, text: str):
+    """
+    value of an integer, a real or a based literal (8'hFF)
+    """
+    text = text.replace("_", "")
+    if kind == "int":
+        return int(text)
+    if kind == "real":
+        return float(text)
+    size, value = text.split("'")
+    value = value.lstrip("sS").strip()
+    if any(c in value for c in "xXzZ?"):
+        raise ValueError("unknown bits in %s" % text)
+    number = int(value[1:], BASES[value[0].lower()])
+    return number & ((1 << int(size)) - 1) if size.strip() else number
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def node(kind: str, func, *args):
+    """
+    node of an expression tree folded when its operands are constants
+    """
+    if all(type(a) is not tuple for a in args):
+        return func(*args)
+    return (kind, func) + args
+
+
+def parse_operand(tokens: list, i: int, names: set) -> tuple:
+    kind, tok = tokens[i]
+    if kind == "op" and tok == "(":
+        tree, i = parse_expression(tokens, i + 1, 0, names)
+        if tokens[i][1] != ")":
+            raise ValueError("missing parenthesis")
+        return tree, i + 1
+    if kind == "op" and tok in UNARY_OPERATORS:
+        tree, i = parse_operand(tokens, i + 1, names)
+        return node("u", UNARY_OPERATORS[tok], tree), i
+    if kind == "id" and tok[0] == "$":
+        if tokens[i + 1][1] != "(":
+            raise ValueError("missing arguments of %s" % tok)
+        args, i = [], i + 1
+        while tokens[i][1] != ")":
+            tree, i = parse_expression(tokens, i + 1, 0, names)
+            args.append(tree)
+            if tokens[i][1] not in (",", ")"):
+                raise ValueError("unexpected %s" % tokens[i][1])
+        return node("f", FUNCTIONS[tok], *args), i + 1
+    if kind == "id":
+        names.add(tok)
+        return ("id", tok), i + 1
+    if kind == "op":
+        raise ValueError("unexpected %s" % tok)
+    return parse_literal(kind, tok), i + 1
+
+
+def parse_expression(tokens: list, i: int, precedence: int, names: set) -> tuple:
+    """
+    tree of the operators of a precedence higher than the given one
+    """
+    tree, i = parse_operand(tokens, i, names)
+    while i < len(tokens):
+        kind, tok = tokens[i]
+        if kind != "op":
+            raise ValueError("unexpected %s" % tok)
+        # the conditional operator has the lowest precedence
+        if tok == "?" and precedence == 0:
+            a, i = parse_expression(tokens, i + 1, 0, names)
+            if tokens[i][1] != ":":
+                raise ValueError("missing : of ?")
+            b, i = parse_expression(tokens, i + 1, 0, names)
+            if type(tree) is not tuple:
+                tree = a if tree else b
+            else:
+                tree = ("?", None, tree, a, b)
+            continue
+        op = BINARY_OPERATORS.get(tok)
+        if op is None or op[0] <= precedence:
+            break
+        rhs, i = parse_expression(tokens, i + 1, op[0], names)
+        tree = node("b", op[1], tree, rhs)
+    return tree, i
+
+
+def compute(tree, params: dict):
+    if type(tree) is not tuple:
+        return tree
+    kind = tree[0]
+    if kind == "id":
+        value = params[tree[1]]
+        if not is_number(value):
+            raise ValueError("%s is not a number" % tree[1])
+        return value
+    if kind == "?":
+        return compute(tree[3] if compute(tree[2], params) else tree[4], params)
+    return tree[1](*(compute(a, params) for a in tree[2:]))
+
+
+class Expression:
+    """
+    constant expression of parameters compiled once:
+    the sub-expressions without parameters are folded at compile time
+    """
+
+    __slots__ = ["text", "tree", "names"]
+
+    def __init__(self, text: str):
+        self.text = text
+        self.names = set()
+        tokens, pos = [], 0
+        while pos < len(text):
+            m = PATTERN_EXPR_TOKEN.match(text, pos)
+            if m is None:
+                if text[pos:].strip():
+                    raise ValueError("unexpected %r in %s" % (text[pos:], text))
+                break
+            tokens.append((m.lastgroup, m.group(m.lastgroup)))
+            pos = m.end()
+        # sentinel to stop the parsing
+        tokens.append(("op", ""))
+        self.tree, i = parse_expression(tokens, 0, 0, self.names)
+        if i != len(tokens) - 1:
+            raise ValueError("unexpected %r in %s" % (tokens[i][1], text))
+
+    def is_constant(self) -> bool:
+        return type(self.tree) is not tuple
+
+    def compute(self, params: dict = {}):
+        """
+        value of the expression for the values of the parameters
+        raise an error of UNRESOLVED if it cannot be computed
+        """
+        return compute(self.tree, params)
+
+    def value(self, params: dict = {}):
+        """
+        value of the expression or None if it cannot be computed
+        """
+        try:
+            return compute(self.tree, params)
+        except UNRESOLVED:
+            return None
+
+
+# compiled expressions by text
+EXPRESSIONS = {}
+
+
+def compile_expression(text: str) -> Expression:
+    """
+    expression of a text or None if it is not a constant expression
+    """
+    try:
+        return EXPRESSIONS[text]
+    except KeyError:
+        pass
+    try:
+        expr = Expression(text)
+    except UNRESOLVED + (IndexError,):
+        expr = None
+    EXPRESSIONS[text] = expr
+    return expr
 
 
 def evaluate(text: str):
     """
-    if number return the parsed number
+    if constant return the value of the expression
+    (number, sized literal, operations, $clog2, ...)
     otherwise a text
     """
-    # cannot be a verilog number if
-    if text is None or any(
-        [c in text for c in "*+/()GHIJKLMNOPQRSTUVXYZghijklmnopqrstuvxyz"]
-    ):
+    if text is None or is_number(text):
         return text
-    # otherwise try to parse it
-    PATTERN_NUM = "(?:(?P<size>\d+)?'(?P<base>h|d|b))?(?P<value>[0-9A-Fa-f_]+)"
-    matches = re.finditer(PATTERN_NUM, text, re.DOTALL | re.MULTILINE)
-    for match in matches:
-        # default to integer 32-bits = 32'd0
-        md = match.groupdict()
-        base = md.get("base") or "d"
-        size = int(md.get("size") or "32", 10)
-        try:
-            return (
-                int(md.get("value"), 16)
-                if base == "h"
-                else int(md.get("value"), 2)
-                if base == "b"
-                else int(md.get("value"), 10)
-            )
-        except ValueError:
-            return text
-    return text
+    expr = compile_expression(text)
+    if expr is None or not expr.is_constant():
+        return text
+    return expr.tree
+
+
+def value_of(value, params: dict):
+    """
+    number or value of an expression computed from the parameters
+    """
+    if is_number(value):
+        return value
+    expr = compile_expression(value)
+    if expr is None:
+        raise ValueError("%s is not a constant expression" % value)
+    return expr.compute(params)
+
+
+def split_range(text: str) -> tuple:
+    """
+    msb and lsb expressions of a range [msb:lsb]
+    """
+    text = text.strip()
+    if not (text.startswith("[") and text.endswith("]")):
+        return None
+    depth, pending = 0, 0
+    for i, c in enumerate(text[1:-1], 1):
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            depth -= 1
+        elif c == "?":
+            pending += 1
+        elif c == ":" and depth == 0:
+            if not pending:
+                return text[1:i].strip(), text[i + 1 : -1].strip()
+            pending -= 1
+    return None
+
+
+class Scope(dict):
+    """
+    values of the parameters of a module computed on first access
+    from their definitions (numbers or expressions of other parameters)
+    """
+
+    __slots__ = ["definitions", "pending"]
+
+    def __init__(self, definitions: dict):
+        super().__init__()
+        self.definitions = definitions
+        self.pending = set()
+
+    def __missing__(self, name: str):
+        value = self.definitions[name]
+        if not is_number(value):
+            if name in self.pending:
+                raise ValueError("recursive definition of %s" % name)
+            self.pending.add(name)
+            try:
+                value = value_of(value, self)
+            finally:
+                self.pending.discard(name)
+        self[name] = value
+        return value
 
 
 # ===== Instances ======
@@ -66,6 +350,21 @@ class Instance:
                 grps = match.groups()
                 self.params["unresolved"].append(evaluate(grps[-1]))
 
+    def overrides(self, module: "Module", params: dict = {}) -> dict:
+        """
+        values of the parameters of the module overridden by the instance
+        computed from the values of the parameters of the parent module
+        """
+        ans = {}
+        positional = zip(module.params, self.params.get("unresolved", []))
+        named = [(k, v) for k, v in self.params.items() if k != "unresolved"]
+        for name, value in list(positional) + named:
+            try:
+                ans[name] = value_of(value, params)
+            except UNRESOLVED:
+                pass
+        return ans
+
     def __str__(self):
         return "I %s: from module %s and %d parameters" % (
             self.name,
@@ -85,12 +384,17 @@ class Instance:
 
 
 # ====== Modules =======
+# (module name, overridden parameters) -> (module, parameters, pins)
+RESOLVED = {}
+
+
 class Module:
-    __slots__ = ["params", "pins", "name", "instances"]
+    __slots__ = ["params", "localparams", "pins", "name", "instances"]
 
     def __init__(self, name: str = None):
         self.name = name if name is not None else ""
         self.params = {}
+        self.localparams = {}
         self.pins = []
         self.instances = []
 
@@ -163,6 +467,37 @@ class Module:
                                 )
                             self.pins[i] = p
 
+    def scope(self, overrides: dict = None) -> Scope:
+        """
+        parameters and local parameters computed on first access
+        """
+        definitions = {name: p["value"] for name, p in self.params.items()}
+        if overrides:
+            definitions.update((k, v) for k, v in overrides.items() if k in self.params)
+        definitions.update(self.localparams)
+        return Scope(definitions)
+
+    def resolve(self, overrides: dict = None) -> tuple:
+        """
+        values of the parameters and pins with their range computed
+        for the given overridden parameters
+        memoized per module and set of overridden parameters
+        """
+        key = (self.name, tuple(sorted(overrides.items())) if overrides else ())
+        entry = RESOLVED.get(key)
+        if entry is not None and entry[0] is self:
+            return entry[1], entry[2]
+        scope = self.scope(overrides)
+        params = {}
+        for name in self.params:
+            try:
+                params[name] = scope[name]
+            except UNRESOLVED:
+                pass
+        pins = [p.resolve(scope) for p in self.pins]
+        RESOLVED[key] = (self, params, pins)
+        return params, pins
+
     def __str__(self):
         return "M %s: %d pins and %d parameters" % (
             self.name,
@@ -247,22 +582,36 @@ class Pins:
         # do nothing if None
         if text is None:
             return
-        # parse if match the pattern
-        match = re.findall(PATTERN_RNG_CAPTURE, text, re.DOTALL | re.MULTILINE)
-        if match:
-            a, b = match[0]
-            a, b = evaluate(a), evaluate(b)
+        rng = split_range(text)
+        if rng:
+            a, b = evaluate(rng[0]), evaluate(rng[1])
             # defined size
-            if isinstance(a, float) and isinstance(b, float):
-                self.msb = int(max(a, b))
-                self.lsb = int(min(a, b))
-                self.width = self.msb - self.lsb + 1
+            if is_number(a) and is_number(b):
+                self.set_range(a, b)
             # parametric size
             else:
-                self.msb = int(a) if isinstance(a, float) else a
-                self.lsb = int(b) if isinstance(b, float) else b
+                self.msb = a
+                self.lsb = b
                 self.width = -1
 
+    def set_range(self, a, b):
+        self.msb = int(max(a, b))
+        self.lsb = int(min(a, b))
+        self.width = self.msb - self.lsb + 1
+
+    def resolve(self, params: dict) -> "Pins":
+        """
+        copy of the pin with the range computed from the values of the parameters
+        """
+        p = Pins()
+        for k in self.__slots__:
+            setattr(p, k, getattr(self, k))
+        try:
+            p.set_range(value_of(self.msb, params), value_of(self.lsb, params))
+        except UNRESOLVED:
+            pass
+        return p
+
     def to_dict(self):
         return {k: getattr(self, k) for k in self.__slots__}
 
@@ -277,76 +626,618 @@ class Pins:
 
 
 # ==== Verilog Parsing ====
-def find_modules(filepath: str) -> list:
+PATTERN_TIMESCALE = re.compile(
+    r"timescale\s*(?:([\d\.]+)\s*([umnpf]?s))\s*(?:\\|\/)(?:([\d\.]+)\s*([umnpf]?s))"
+)
+
+
+def find_timescale(filepath: str, first: bool = False):
     """
-    list modules declared in the filepath
-    with their parameters and the input/output ports
+    find timescale and return the step and accuracy
+    stop reading the file at the first one found if first is set
     """
     ans = []
-    PATTERN = (
-        r"(?!end)module"
-        r"\s*([\w\-]+)"
-        r"\s*(#\((?:[\w\.\(\),':\r\t\n \/\*\=\-]*)\))?"
-        r"\s*(\([\w\.\(\),'~\r\t\n \/\*\=\-\+:\[\]]*\)|)"
-        r"([\w\W\n\t]*?)endmodule"
-    )
-    # ^(?!end)module : start with module but not endmodule
-    # \s*([\w\-]+)   : skip some spaces then get the name of the module
-    # \s*(#*\([\w\s\=\-,\.\/\*]+\))? : get the optional param bloc with comments (//, /* */)
-    # \s*(\([\w\s\-,\.\/\*]*\))?     : get the ports bloc with comments // or /* */
-    # (.*?)                          : get all in the module in a non gready way
-    # endmodule                      : should end with endmodule
-    with open(filepath, "r+") as fp:
-        data = fp.read()
-        matches = re.finditer(PATTERN, data, re.DOTALL | re.MULTILINE)
-        for match in matches:
-            ans.append(match.groups())
+    with open(filepath, "r") as fp:
+        for line in fp:
+            if "timescale" not in line:
+                continue
+            ans.extend(PATTERN_TIMESCALE.findall(line))
+            if first and ans:
+                break
     return ans
 
 
-def find_instances(filepath: str) -> list:
+# ==== Design Index ====
+# reserved words which cannot be the module of an instance
+KEYWORDS = frozenset(
     """
-    list modules declared in the filepath
+    accept_on alias always always_comb always_ff always_latch and assert assign assume
+    automatic before begin bind bins binsof bit break buf bufif0 bufif1 byte case casex
+    casez cell chandle checker class clocking cmos config const constraint context
+    continue cover covergroup coverpoint cross deassign default defparam design disable
+    dist do edge else end endcase endchecker endclass endclocking endconfig endfunction
+    endgenerate endgroup endinterface endmodule endpackage endprimitive endprogram
+    endproperty endspecify endsequence endtable endtask enum event eventually expect
+    export extends extern final first_match for force foreach forever fork forkjoin
+    function generate genvar global highz0 highz1 if iff ifnone ignore_bins illegal_bins
+    implements implies import incdir include initial inout input inside instance int
+    integer interconnect interface intersect join join_any join_none large let liblist
+    library local localparam logic longint macromodule matches medium modport module
+    nand negedge nettype new nexttime nmos nor noshowcancelled not notif0 notif1 null or
+    output package packed parameter pmos posedge primitive priority program property
+    protected pull0 pull1 pulldown pullup pulsestyle_ondetect pulsestyle_onevent pure
+    rand randc randcase randsequence rcmos real realtime ref reg reject_on release repeat
+    restrict return rnmos rpmos rtran rtranif0 rtranif1 s_always s_eventually s_nexttime
+    s_until s_until_with scalared sequence shortint shortreal showcancelled signed small
+    soft solve specify specparam static string strong strong0 strong1 struct super supply0
+    supply1 sync_accept_on sync_reject_on table tagged task this throughout time
+    timeprecision timeunit tran tranif0 tranif1 tri tri0 tri1 triand trior trireg type
+    typedef union unique unique0 unsigned until until_with untyped use uwire var vectored
+    virtual void wait wait_order wand weak weak0 weak1 while wildcard wire with within wor
+    xnor xor electrical voltage current
+    """.split()
+)
+DIRECTIONS = frozenset(["input", "output", "inout"])
+# declarations of v95 ports updating the type and the range of a pin
+PIN_TYPES = frozenset(
+    ["wire", "wor", "wand", "reg", "real", "electrical", "voltage", "current"]
+)
+# blocks skipped up to their end keyword
+SKIPPED_BLOCKS = {
+    "function": "endfunction",
+    "task": "endtask",
+    "specify": "endspecify",
+    "primitive": "endprimitive",
+    "table": "endtable",
+    "covergroup": "endgroup",
+    "property": "endproperty",
+    "sequence": "endsequence",
+    "class": "endclass",
+    "clocking": "endclocking",
+    "config": "endconfig",
+}
+# keywords ending the current statement, optionally followed by a label
+BLOCK_KEYWORDS = frozenset(
+    [
+        "begin",
+        "end",
+        "else",
+        "generate",
+        "endgenerate",
+        "endcase",
+        "fork",
+        "join",
+        "join_any",
+        "join_none",
+        "endmodule",
+        "endinterface",
+        "endpackage",
+        "endprogram",
+        "endchecker",
+    ]
+)
+# statements whose condition is skipped to reach the instance they guard
+CONDITIONS = frozenset(["if", "for", "while", "repeat", "foreach"])
+OPENING = {"(": ")", "[": "]", "{": "}"}
+CLOSING = frozenset([")", "]", "}"])
+# compiler directives removed from the token stream
+DIRECTIVES = frozenset(
     """
-    ans = []
-    PATTERN = (
-        r"(^\s*[\w\-]+)"
-        r"\s+(?:#\(([\w\.\(\),\r\t\n \/\*\=\-\+:\[\]]*)\))?"
-        r"\s*([\w\-]+)\s*\("
-        r"([\w\.\(\)\r\t\n \/\*\=\-\+:\[\]~&|^.,'{}?]*)\);"
-    )
-    # filter the first group to not be module
-    KEYWORDS = ["module", "define", "begin", "task", "function", "case", "endcase"]
-    with open(filepath, "r+") as fp:
-        matches = re.finditer(PATTERN, fp.read(), re.DOTALL | re.MULTILINE)
-        for match in matches:
-            grps = match.groups()
-            if grps[0].lower().strip() not in KEYWORDS:
-                ans.append([g.strip() if g is not None else None for g in grps])
-    return ans
+    define undef undefineall ifdef ifndef elsif else endif resetall celldefine
+    endcelldefine default_nettype unconnected_drive nounconnected_drive line pragma
+    begin_keywords end_keywords delay_mode_distributed delay_mode_path delay_mode_unit
+    delay_mode_zero
+    """.split()
+)
+
+# whitespaces, comments and attributes between tokens
+# written to never backtrack inside whitespaces, comments or identifiers
+PATTERN_SKIP = (
+    r"\s*(?:(?://[^\n]*(?![^\n])|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/"
+    r"|\(\*(?!\s*\))[^;*]*\*+(?:[^;)*][^;*]*\*+)*\))\s*)*"
+)
+PATTERN_ID = r"(?:[A-Za-z_][\w$]*(?![\w$])|\\\S+(?!\S))"
+TOKEN = re.compile(
+    PATTERN_SKIP + "("
+    # directives with the remaining of the line or a name as argument
+    r"`(?:include|timescale|line|pragma|begin_keywords)\b[^\n]*"
+    r"|`define\b(?:\\\r?\n|[^\n])*"
+    r"|`(?:ifdef|ifndef|elsif|undef|default_nettype|unconnected_drive)\s+\w+"
+    r"|`\w+"
+    r'|"(?:\\.|[^"\\\n])*"'
+    # based and real numbers
+    r"|(?:\d[\d_]*)?'[sS]?[bBoOdDhH]\s*[\w?]+|'[01xXzZ]"
+    r"|\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?"
+    r"|" + PATTERN_ID + r"|\$[\w$]+"
+    # unterminated comment at the end of the buffer
+    r"|/\*"
+    r"|::|[\s\S]|\Z)"
+)
 
 
-def find_includes(filepath: str) -> list:
+def parens_pattern(depth: int) -> str:
     """
-    list include declared in the filepath
+    parentheses nested up to depth levels without comments, strings or macros
     """
-    ans = []
-    PATTERN = r"`include[s]?\s*\"?([\w\/\\\.]+)"
-    with open(filepath, "r+") as fp:
-        for line in fp.readlines():
-            ans.extend(re.findall(PATTERN, line))
-    return ans
+    text = r"[^()/\"`;]*"
+    special = r"/(?![/*])"
+    if depth > 1:
+        special += "|" + parens_pattern(depth - 1)
+    return r"\(%s(?:(?:%s)%s)*\)" % (text, special, text)
+
 
+PATTERN_PARENS = parens_pattern(3)
+# keywords starting a construct which is not a single statement
+PATTERN_CONSTRUCT = r"(?!(?:%s)(?![\w$]))" % "|".join(
+    ["module", "macromodule", "endmodule", *SKIPPED_BLOCKS]
+)
+# instance of a module in a single statement: module #(params) name [range] (ports);
+PATTERN_INSTANCE = (
+    PATTERN_SKIP
+    + PATTERN_CONSTRUCT
+    + r"("
+    + PATTERN_ID
+    + r")\s*(?:#\s*("
+    + PATTERN_PARENS
+    + r")\s*)?("
+    + PATTERN_ID
+    + r")\s*(?:\[[^\[\];]*\]\s*)?"
+    + PATTERN_PARENS
+    + r"\s*;"
+)
+FAST_INSTANCE = re.compile(PATTERN_INSTANCE)
+PATTERN_INCLUDE = re.compile(r"`include\s*[\"<]([^\">]+)")
+# size of the chunks read and minimum lookahead kept in memory
+LEXER_CHUNK = 1 << 22
+LEXER_LOOKAHEAD = 1 << 16
 
-def find_timescale(filepath: str):
+
+class Lexer:
     """
-    find timescale and return the step and accuracy
+    stream of tokens of a verilog file read by chunks
+    includes and timescales are collected from the directives
     """
+
+    __slots__ = ["fp", "data", "pos", "eof", "pending", "includes", "timescales"]
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.data = ""
+        self.pos = 0
+        self.eof = False
+        self.pending = []
+        self.includes = []
+        self.timescales = []
+
+    def fill(self):
+        chunk = self.fp.read(LEXER_CHUNK)
+        self.eof = not chunk
+        self.data = self.data[self.pos :] + chunk
+        self.pos = 0
+
+    def lookahead(self) -> str:
+        """
+        buffer with at least LEXER_LOOKAHEAD characters after pos
+        """
+        if not self.eof and len(self.data) - self.pos < LEXER_LOOKAHEAD:
+            self.fill()
+        return self.data
+
+    def push(self, token: str):
+        self.pending.append(token)
+
+    def next(self) -> str:
+        """
+        next token or an empty string at the end of the file
+        """
+        if self.pending:
+            return self.pending.pop()
+        while True:
+            m = TOKEN.match(self.lookahead(), self.pos)
+            tok = m.group(1)
+            # token possibly cut by the end of the buffer
+            if not self.eof and (not tok or tok == "/*" or m.end() == len(self.data)):
+                self.fill()
+                continue
+            self.pos = m.end()
+            if tok == "/*":
+                return ""
+            if tok[:1] != "`":
+                return tok
+            name = tok[1:].split(None, 1)[0] if len(tok) > 1 else ""
+            if name == "include":
+                self.includes.extend(PATTERN_INCLUDE.findall(tok))
+            elif name == "timescale":
+                self.timescales.extend(PATTERN_TIMESCALE.findall(tok))
+            elif name not in DIRECTIVES:
+                # macro usage
+                return tok
+
+    def match(self, pattern):
+        """
+        match a pattern at the current position if no token is pending
+        """
+        if self.pending:
+            return None
+        m = pattern.match(self.lookahead(), self.pos)
+        if m:
+            self.pos = m.end()
+        return m
+
+
+def tokenize(text: str) -> list:
+    """
+    tokens of a fragment of verilog
+    """
+    lexer = Lexer(io.StringIO(text))
     ans = []
-    PATTERN = (
-        r"timescale\s*(?:([\d\.]+)\s*([umnpf]?s))\s*(?:\\|\/)(?:([\d\.]+)\s*([umnpf]?s))"
-    )
-    with open(filepath, "r+") as fp:
-        for line in fp.readlines():
-            ans.extend(re.findall(PATTERN, line))
+    tok = lexer.next()
+    while tok:
+        ans.append(tok)
+        tok = lexer.next()
     return ans
+
+
+def split_items(tokens: list) -> list:
+    """
+    split a list of tokens on the commas outside brackets
+    """
+    items, current, depth = [], [], 0
+    for tok in tokens:
+        if tok in OPENING:
+            depth += 1
+        elif tok in CLOSING:
+            depth -= 1
+        elif tok == "," and depth == 0:
+            items.append(current)
+            current = []
+            continue
+        current.append(tok)
+    if current or items:
+        items.append(current)
+    return items
+
+
+def group(tokens: list, start: int) -> int:
+    """
+    index after the bracket closing the one at start
+    """
+    depth = 0
+    for i in range(start, len(tokens)):
+        if tokens[i] in OPENING:
+            depth += 1
+        elif tokens[i] in CLOSING:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(tokens)
+
+
+def is_identifier(token: str) -> bool:
+    return (token[:1].isalpha() or token[:1] in "_\\") and token not in KEYWORDS
+
+
+def parse_parameters(tokens: list, module: Module):
+    """
+    parameters declared in a parameter statement or the header of a module
+    values of the parameters are given by name=value items
+    """
+    kind, ptype, size = None, None, None
+    for item in split_items(tokens):
+        name, value, i = None, None, 0
+        while i < len(item):
+            tok = item[i]
+            if tok in ("parameter", "localparam"):
+                kind, ptype, size = tok, None, None
+            elif tok == "type":
+                kind = tok
+            elif tok == "[":
+                j = group(item, i)
+                if name is None:
+                    size = "".join(item[i:j])
+                i = j
+                continue
+            elif tok == "=":
+                value = "".join(item[i + 1 :])
+                break
+            elif tok in KEYWORDS:
+                ptype = tok
+            elif is_identifier(tok):
+                name = tok
+            i += 1
+        if name and kind == "localparam":
+            module.localparams[name] = evaluate(value) if value else None
+        elif name and kind != "type":
+            module.params[name] = {
+                "type": ptype,
+                "size": size,
+                "value": evaluate(value) if value else None,
+            }
+
+
+def parse_ports(tokens: list, module: Module):
+    """
+    pins declared with a direction in the header or a statement of a module
+    the direction, type and range apply to the following names
+    """
+    direction, ptype, rng = None, None, None
+    for item in split_items(tokens):
+        name, i = None, 0
+        while i < len(item):
+            tok = item[i]
+            if tok in DIRECTIONS:
+                direction, ptype, rng = tok, None, None
+            elif tok == "[":
+                j = group(item, i)
+                if name is None:
+                    rng = "".join(item[i:j])
+                i = j
+                continue
+            elif tok == "=":
+                break
+            elif tok in KEYWORDS:
+                ptype = tok
+            elif is_identifier(tok):
+                name = tok
+            i += 1
+        if name and direction:
+            p = Pins(name)
+            p.parse_dir(direction)
+            p.parse_rng(rng)
+            p.parse_type(ptype)
+            module.pins.append(p)
+
+
+def parse_declarations(tokens: list, module: Module):
+    """
+    type and range of v95 ports given by a net or variable declaration
+    """
+    pins = {p.name: p for p in module.pins}
+    ptype, rng = tokens[0], None
+    for item in split_items(tokens[1:]):
+        name, i = None, 0
+        while i < len(item):
+            tok = item[i]
+            if tok == "[":
+                j = group(item, i)
+                if name is None and rng is None:
+                    rng = "".join(item[i:j])
+                i = j
+                continue
+            elif tok == "=":
+                break
+            elif is_identifier(tok) and name is None:
+                name = tok
+            i += 1
+        if name in pins:
+            pins[name].parse_type(ptype)
+            pins[name].parse_rng(rng)
+
+
+def parse_instance_parameters(tokens: list, instance: Instance):
+    """
+    parameters overridden by name .NAME(value) or by position
+    """
+    for item in split_items(tokens[1:-1]):
+        if len(item) > 3 and item[0] == "." and item[2] == "(":
+            instance.params[item[1]] = evaluate("".join(item[3:-1]))
+        elif item:
+            instance.params["unresolved"].append(evaluate("".join(item)))
+
+
+def parse_instances(tokens: list) -> list:
+    """
+    instances of a statement: module #(params) name (ports), name (ports)
+    an empty list if the statement is not an instanciation
+    """
+    if len(tokens) < 3 or not is_identifier(tokens[0]):
+        return []
+    ans, params, i = [], None, 1
+    if tokens[i] == "#":
+        if tokens[i + 1] == "(":
+            params = tokens[i + 1 : group(tokens, i + 1)]
+            i += 1 + len(params)
+        else:
+            # delay of a primitive
+            i += 2
+    while i < len(tokens) and is_identifier(tokens[i]):
+        instance = Instance(tokens[i], tokens[0])
+        i += 1
+        if i < len(tokens) and tokens[i] == "[":
+            i = group(tokens, i)
+        if i >= len(tokens) or tokens[i] != "(":
+            return []
+        i = group(tokens, i)
+        if params:
+            parse_instance_parameters(params, instance)
+        ans.append(instance)
+        if i < len(tokens) and tokens[i] == ",":
+            i += 1
+        else:
+            break
+    return ans if i >= len(tokens) else []
+
+
+class FileIndex:
+    """
+    modules, instances, includes and timescales declared in a verilog file
+    instances lists all the instances of the file whatever their module
+    """
+
+    __slots__ = ["modules", "instances", "includes", "timescales"]
+
+    def __init__(self):
+        self.modules = []
+        self.instances = []
+        self.includes = []
+        self.timescales = []
+
+
+def resolve_widths(module: Module):
+    """
+    width of the parametric pins for the default values of the parameters
+    """
+    if any(p.width == -1 for p in module.pins):
+        _, pins = module.resolve()
+        for p, resolved in zip(module.pins, pins):
+            p.width = resolved.width
+
+
+def parse_header(lexer: Lexer, module: Module):
+    """
+    name, parameters and ports of a module up to the semicolon
+    """
+    tok = lexer.next()
+    while tok in ("automatic", "static"):
+        tok = lexer.next()
+    module.name = tok
+    tok = lexer.next()
+    while tok and tok != ";":
+        if tok == "import":
+            while tok and tok != ";":
+                tok = lexer.next()
+        elif tok == "#":
+            parse_parameters(read_group(lexer, lexer.next())[1:-1], module)
+        elif tok == "(":
+            parse_ports(read_group(lexer, tok)[1:-1], module)
+        tok = lexer.next()
+
+
+def read_group(lexer: Lexer, first: str) -> list:
+    """
+    tokens of a bracketed group starting with first
+    """
+    tokens, depth, tok = [first], 1, first
+    while depth and tok:
+        tok = lexer.next()
+        if tok in OPENING:
+            depth += 1
+        elif tok in CLOSING:
+            depth -= 1
+        tokens.append(tok)
+    return tokens
+
+
+def read_statement(lexer: Lexer, first: str) -> list:
+    """
+    tokens up to the semicolon ending the statement
+    a block keyword also ends it and is left in the stream
+    """
+    tokens = [first]
+    depth = 1 if first in OPENING else 0
+    tok = lexer.next()
+    while tok:
+        if depth == 0:
+            if tok == ";":
+                break
+            if tok in BLOCK_KEYWORDS or tok in ("module", "macromodule"):
+                lexer.push(tok)
+                break
+        if tok in OPENING:
+            depth += 1
+        elif tok in CLOSING:
+            depth -= 1
+        tokens.append(tok)
+        tok = lexer.next()
+    return tokens
+
+
+def skip_block(lexer: Lexer, end: str):
+    tok = lexer.next()
+    while tok and tok != end:
+        if tok == "endmodule":
+            lexer.push(tok)
+            return
+        tok = lexer.next()
+
+
+def parse_design(fp) -> FileIndex:
+    """
+    walk once through a verilog file to list its modules with
+    their parameters, pins and instances, the includes and timescales
+    """
+    lexer = Lexer(fp)
+    index = FileIndex()
+    module = None
+    while True:
+        # fast path for the instances of netlists
+        m = lexer.match(FAST_INSTANCE)
+        while m:
+            name, params, instance_name = m.groups()
+            # gates or statements such as else task(...);
+            if name not in KEYWORDS:
+                instance = Instance(instance_name, name)
+                if params:
+                    parse_instance_parameters(tokenize(params), instance)
+                index.instances.append(instance)
+                if module is not None:
+                    module.instances.append(instance)
+            m = lexer.match(FAST_INSTANCE)
+        tok = lexer.next()
+        if not tok:
+            break
+        if tok in ("module", "macromodule"):
+            module = Module()
+            parse_header(lexer, module)
+            index.modules.append(module)
+        elif tok in BLOCK_KEYWORDS:
+            if tok == "endmodule" and module is not None:
+                resolve_widths(module)
+                module = None
+            # optional label
+            tok = lexer.next()
+            if tok == ":":
+                lexer.next()
+            else:
+                lexer.push(tok)
+        elif tok in SKIPPED_BLOCKS:
+            skip_block(lexer, SKIPPED_BLOCKS[tok])
+        elif tok in CONDITIONS:
+            tok = lexer.next()
+            if tok == "(":
+                read_group(lexer, tok)
+            else:
+                lexer.push(tok)
+        else:
+            tokens = read_statement(lexer, tok)
+            if module is not None and tok in DIRECTIONS:
+                parse_ports(tokens, module)
+            elif module is not None and tok in PIN_TYPES:
+                parse_declarations(tokens, module)
+            elif module is not None and tok in ("parameter", "localparam"):
+                parse_parameters(tokens, module)
+            elif tok not in KEYWORDS:
+                instances = parse_instances(tokens)
+                index.instances.extend(instances)
+                if module is not None:
+                    module.instances.extend(instances)
+    index.includes = lexer.includes
+    index.timescales = lexer.timescales
+    return index
+
+
+# index of the files parsed with the mtime and size they had
+INDEX_CACHE = {}
+
+
+def index_file(filepath: str) -> FileIndex:
+    """
+    design index of a verilog file, parsed again only if it changed
+    the index is shared between callers and should not be modified
+    """
+    st = os.stat(filepath)
+    entry = INDEX_CACHE.get(filepath)
+    if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+        return entry[2]
+    # the index holds no reference cycle: the collections triggered
+    # by the allocation of millions of instances are useless
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(filepath, "r", errors="replace") as fp:
+            index = parse_design(fp)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    INDEX_CACHE[filepath] = (st.st_mtime_ns, st.st_size, index)
+    return index
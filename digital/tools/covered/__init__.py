@@ -11,6 +11,7 @@ import common.utils as utils
 import common.relog as relog
 import common.executor as executor
 import common.verilog as verilog
+import common.design_tree as design_tree
 
 from common.read_sources import resolve_includes
 
@@ -26,7 +27,7 @@ DB_LIST = os.path.join(DEFAULT_TMPDIR, "db.list")
 TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
-def prepare(files, PARAMS):
+def prepare(files, PARAMS, top_module: str = "tb"):
     relog.step("Prepation")
     # create temporary directory
     os.makedirs(DEFAULT_TMPDIR, exist_ok=True)
@@ -46,9 +47,13 @@ def prepare(files, PARAMS):
     INCLUDE_DIRS = resolve_includes(FILES)
     # generate data
     modules = PARAMS["COV_MODULES"][0].split(" ") if "COV_MODULES" in PARAMS else ["top"]
-    instances = verilog.find_instances(PARAMS["TOP_MODULE"])
-    top_module, *_ = verilog.find_modules(PARAMS["TOP_MODULE"])[0]
-    instances = [(mod, instance) for mod, pa, instance, po in instances if mod in modules]
+    hierarchy = design_tree.elaborate(files, PARAMS, top_module)
+    # each covered module is scored once at its first instance in the tree
+    # of the top module, not once per instance
+    instances = {}
+    for module, path in hierarchy.find(modules, top_module):
+        instances.setdefault(module, path)
+    instances = list(instances.items())
     generation = 3 if any(["SYS" in m for m in MIMES]) else 2
     excludes = PARAMS["IP_MODULES"][0].split(" ") if "IP_MODULES" in PARAMS else []
     # generate scripts
@@ -91,9 +96,9 @@ def main(files, PARAMS):
     # top module
     top = "tb"
     if os.path.isfile(PARAMS["TOP_MODULE"]):
-        top, _, _, _ = verilog.find_modules(PARAMS["TOP_MODULE"])[0]
+        top = verilog.index_file(PARAMS["TOP_MODULE"]).modules[0].name
     # generate script to load files and add parameters
-    n_i = prepare(files, PARAMS)
+    n_i = prepare(files, PARAMS, top)
     # scoring
     relog.step("Scoring simulations")
     for k in range(n_i):
@@ -103,7 +108,7 @@ def main(files, PARAMS):
             % (SCORE_SCRIPT % k, COV_K_DATABASE),
             COV_LOG,
             mode="a+",
-            MAX_TIMEOUT=300,
+            MAX_TIMEOUT=executor.timeout("covered"),
             SHOW_CMD=True,
         )
     # register dbs
@@ -118,13 +123,16 @@ def main(files, PARAMS):
             "covered merge -f %s" % DB_LIST,
             COV_LOG,
             "a+",
-            MAX_TIMEOUT=240,
+            MAX_TIMEOUT=executor.timeout("covered"),
             SHOW_CMD=True,
         )
     # reporting
     relog.step("Generating report")
     executor.sh_exec(
-        "covered report -m ltcfram -d s %s" % COV_DATABASE.replace(".cdd", "_0.cdd"), COV_REPORT, MAX_TIMEOUT=30, SHOW_CMD=False
+        "covered report -m ltcfram -d s %s" % COV_DATABASE.replace(".cdd", "_0.cdd"),
+        COV_REPORT,
+        MAX_TIMEOUT=executor.timeout("covered"),
+        SHOW_CMD=False,
     )
     return relog.get_stats(COV_LOG)
 
@@ -115,7 +115,7 @@ def compile(generation, flags):
         executor.sh_exec(
             "iverilog -g%s %s -o %s -c %s" % (generation, flags, EXE, SRCS),
             PARSER_LOG,
-            MAX_TIMEOUT=20,
+            MAX_TIMEOUT=executor.timeout("iverilog"),
             SHOW_CMD=True,
         )
     # ignore return code error
@@ -145,7 +145,7 @@ def run_sim(files, params):
     executor.sh_exec(
         "vvp -i %s %s -%s" % (EXE, VVP_FLAGS, WAVE_FORMAT),
         SIM_LOG,
-        MAX_TIMEOUT=300,
+        MAX_TIMEOUT=executor.timeout("iverilog"),
         SHOW_CMD=True,
     )
     # move the dumpfile to TMPDIR
@@ -93,7 +93,9 @@ def run_sim(files, params):
     flags = " ".join(chain([gen], Config.ncsim.get("flags").split()))
     # run simulation
     relog.step("Running simulation")
-    executor.sh_exec("irun %s -f %s" % (flags, SRCS), PARSER_LOG, MAX_TIMEOUT=300)
+    executor.sh_exec(
+        "irun %s -f %s" % (flags, SRCS), PARSER_LOG, MAX_TIMEOUT=executor.timeout("ncsim")
+    )
 
 
 def run_lint(files, params):
@@ -108,7 +110,9 @@ def run_lint(files, params):
     gen = prepare(files, params)
     flags = " ".join(chain([gen, "-hal"], Config.ncsim.get("flags").split()))
     # lint
-    executor.sh_exec("irun %s -f %s" % (flags, SRCS), PARSER_LOG, MAX_TIMEOUT=300)
+    executor.sh_exec(
+        "irun %s -f %s" % (flags, SRCS), PARSER_LOG, MAX_TIMEOUT=executor.timeout("ncsim")
+    )
 
 
 if __name__ == "__main__":
@@ -64,7 +64,7 @@ if __name__ == "__main__":
                 EXE
             ),
             PARSER_LOG,
-            MAX_TIMEOUT=300
+            MAX_TIMEOUT=executor.timeout("verilator")
         )
         # move the dumpfile to TMPDIR
         if os.path.exists(WAVE):
@@ -77,7 +77,7 @@ if __name__ == "__main__":
         executor.sh_exec(
             "perl %s --lint-only -Wall -f %s" % (verilator, SRCS),
             PARSER_LOG,
-            MAX_TIMEOUT=30,
+            MAX_TIMEOUT=executor.timeout("verilator"),
             SHOW_CMD=True
         )
         relog.display_log(PARSER_LOG, SUMMARY=True)
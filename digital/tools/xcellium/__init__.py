@@ -93,7 +93,11 @@ def run_sim(files, params):
     flags = " ".join(chain([gen], Config.ncsim.get("flags").split()))
     # run simulation
     relog.step("Running simulation")
-    executor.sh_exec("xrun %s -f %s" % (flags, SRCS), PARSER_LOG, MAX_TIMEOUT=300)
+    executor.sh_exec(
+        "xrun %s -f %s" % (flags, SRCS),
+        PARSER_LOG,
+        MAX_TIMEOUT=executor.timeout("xcellium"),
+    )
 
 
 def run_lint(files, params):
@@ -108,7 +112,11 @@ def run_lint(files, params):
     gen = prepare(files, params)
     flags = " ".join(chain([gen, "-hal"], Config.ncsim.get("flags").split()))
     # lint
-    executor.sh_exec("xrun %s -f %s" % (flags, SRCS), PARSER_LOG, MAX_TIMEOUT=300)
+    executor.sh_exec(
+        "xrun %s -f %s" % (flags, SRCS),
+        PARSER_LOG,
+        MAX_TIMEOUT=executor.timeout("xcellium"),
+    )
 
 
 if __name__ == "__main__":
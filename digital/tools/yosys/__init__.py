@@ -11,6 +11,7 @@ sys.path.append(os.environ["REFLOW"])
 import common.utils as utils
 import common.relog as relog
 import common.executor as executor
+import common.design_tree as design_tree
 
 
 DEFAULT_TMPDIR = utils.get_tmp_folder()
@@ -35,13 +36,20 @@ def evaluate_bash_var(txt: str):
     return t
 
 
-def prepare(files, params):
+def prepare(files, params, top: str = None):
     relog.step("Preparation")
     os.makedirs(DEFAULT_TMPDIR, exist_ok=True)
+    # files only declaring modules out of the tree of the top are not read
+    unused = set()
+    if top:
+        hierarchy = design_tree.elaborate(files, params, top)
+        if top in hierarchy.stats:
+            used = set(hierarchy.files_of(top))
+            unused = set(hierarchy.files[m] for m in hierarchy.unused) - used
     with open(SYNTH_SCRIPT, "w+") as fp:
         for file, mime in files:
             # code files not ignored
-            if not any([ign in file for ign in IGNORED]):
+            if not any([ign in file for ign in IGNORED]) and file.strip() not in unused:
                 if mime == "VERILOG":
                     fp.write("read_verilog %s\n" % file)
                 elif mime == "LIBERTY":
@@ -50,15 +58,17 @@ def prepare(files, params):
 
 def run():
     relog.step("Running synthesis")
-    executor.sh_exec("yosys %s" % SYNTH_SCRIPT, SYNTH_LOG, MAX_TIMEOUT=300)
+    executor.sh_exec(
+        "yosys %s" % SYNTH_SCRIPT, SYNTH_LOG, MAX_TIMEOUT=executor.timeout("yosys")
+    )
 
 
 def main(files, params, format: str = "verilog", top: str = None):
-    prepare(files, params)
-    # fill mako template
-    ext = EXTENSIONS.get(format)
     if top is None:
         top = params.get("SYNTH_MODULE")[-1]
+    prepare(files, params, top)
+    # fill mako template
+    ext = EXTENSIONS.get(format)
     data = {
         "top_module": top,
         "techno": evaluate_bash_var(os.environ["TECH_LIB"]),
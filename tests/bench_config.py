@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+startup benchmark of the lookup and the loading of the configuration
+in a generated checkout whose testcase holds large work directories,
+compared to the former recursive lookup
+
+usage: python3 tests/bench_config.py [-d work dirs] [-f files per dir]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from pathlib import Path
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.read_config as read_config
+
+from common.read_config import Config
+
+
+def reference_locate(base_path: str) -> list:
+    """
+    former lookup walking the whole subtree of the directory
+    """
+    config_files = []
+    for file in Path(base_path).rglob("*.config"):
+        config_files.append(str(file))
+        break
+    for i in range(16):
+        if not config_files:
+            base_path = os.path.dirname(base_path)
+            for file in os.listdir(base_path):
+                file_path = os.path.normpath(os.path.join(base_path, file))
+                if file.endswith(".config") and os.path.isfile(file_path):
+                    config_files.append(file_path)
+        else:
+            break
+    return config_files
+
+
+def generate_checkout(root: str, work_dirs: int, files: int) -> str:
+    """
+    repository with a project configuration and a testcase
+    deep in the tree which ran many simulations
+    """
+    os.makedirs(os.path.join(root, ".git"))
+    with open(os.path.join(root, "project.config"), "w+") as fp:
+        fp.write("[reflow]\nPLATFORM = bench\n\n[tools]\nDIG_SIMULATOR = iverilog\n")
+    testcase = os.path.join(root, "digital", "blocks", "adder", "testcases", "basic")
+    for i in range(work_dirs):
+        work_dir = os.path.join(testcase, ".tmp_sim", "run_%d" % i, "waves")
+        os.makedirs(work_dir)
+        for j in range(files):
+            open(os.path.join(work_dir, "wave_%d.vcd" % j), "w+").close()
+    return testcase
+
+
+def bench(func, *args) -> tuple:
+    t_start = time.perf_counter()
+    ans = func(*args)
+    return (time.perf_counter() - t_start) * 1000.0, ans
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-d", "--work-dirs", type=int, default=200)
+    parser.add_argument("-f", "--files", type=int, default=50)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        testcase = generate_checkout(tmp_dir, args.work_dirs, args.files)
+        default_config = os.path.join(PWD, "..", "default.config")
+        ref_time, ref_files = bench(reference_locate, testcase)
+        new_time, new_files = bench(read_config.locate_config_files, testcase)
+        assert ref_files == new_files, (ref_files, new_files)
+        config_files = [default_config] + new_files
+        parse_time, _ = bench(Config.read_configs, config_files)
+        cached_time, _ = bench(Config.read_configs, config_files)
+        assert Config.tools.get("DIG_SIMULATOR") == "iverilog"
+        print("%d files in the work directories" % (args.work_dirs * args.files))
+        print("rglob lookup      %8.2f ms" % ref_time)
+        print("bounded lookup    %8.2f ms (x%.0f)" % (new_time, ref_time / new_time))
+        print("configs parsed    %8.2f ms" % parse_time)
+        print("configs cached    %8.2f ms" % cached_time)
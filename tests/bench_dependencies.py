@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+scaling benchmark of the dependency resolution of read_sources
+on generated graphs compared to the former recursive implementation
+
+usage: python3 tests/bench_dependencies.py [-n nodes ...]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+from common.read_sources import Node, resolve_dependancies
+
+
+def reference_resolve(node, resolved, unresolved) -> None:
+    """
+    recursive resolution with list membership the iterative one must reproduce
+    """
+    unresolved.append(node)
+    for edge in node.edges:
+        if edge not in resolved and edge.name not in node.name:
+            if edge in unresolved:
+                raise Exception(
+                    "Circular reference detected: %s -> %s" % (node.name, edge.name)
+                )
+            reference_resolve(edge, resolved, unresolved)
+    resolved.append(node)
+    unresolved.remove(node)
+
+
+def layered_graph(n: int, fanout: int = 4, seed: int = 0) -> Node:
+    """
+    Sources.list like graph: each node depends on
+    a few nodes declared before it
+    """
+    rng = random.Random(seed)
+    nodes = [Node("/design/block_%d/Sources.list" % 0)]
+    for i in range(1, n):
+        node = Node("/design/block_%d/Sources.list" % i)
+        for j in rng.sample(range(i), min(i, fanout)):
+            node.addEdge(nodes[j])
+        nodes.append(node)
+    return nodes[-1]
+
+
+def chain_graph(n: int) -> Node:
+    """
+    deep hierarchy of n nested Sources.list
+    """
+    node = Node("/design/leaf.sv")
+    for i in range(n):
+        parent = Node("/design/level_%d/Sources.list" % i)
+        parent.addEdge(node)
+        node = parent
+    return node
+
+
+def circular_diagnostic(resolve) -> str:
+    top = layered_graph(50)
+    # close a loop deep in the graph
+    top.edges[0].edges[0].addEdge(top)
+    try:
+        resolve(top, [], [])
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def bench(resolve, top: Node) -> tuple:
+    t_start = time.perf_counter()
+    try:
+        resolved = []
+        resolve(top, resolved, [])
+    except RecursionError:
+        return None, None
+    return (time.perf_counter() - t_start) * 1000.0, [n.name for n in resolved]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--nodes", type=int, nargs="+", default=[1000, 5000, 10000])
+    args = parser.parse_args()
+    diagnostic = circular_diagnostic(resolve_dependancies)
+    assert diagnostic and diagnostic == circular_diagnostic(reference_resolve)
+    print("%-8s %8s %12s %12s" % ("graph", "nodes", "reference", "iterative"))
+    for n in args.nodes:
+        for kind, top in (("layered", layered_graph(n)), ("chain", chain_graph(n))):
+            ref_time, ref_order = bench(reference_resolve, top)
+            new_time, new_order = bench(resolve_dependancies, top)
+            if ref_order is not None:
+                assert ref_order == new_order, "different order on %s %d" % (kind, n)
+            print(
+                "%-8s %8d %12s %9.1f ms"
+                % (
+                    kind,
+                    n,
+                    "recursion" if ref_time is None else "%9.1f ms" % ref_time,
+                    new_time,
+                )
+            )
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+benchmark of the design database filled by the rules on generated
+verilog files compared to the former rewrite of db.json for each file
+
+usage: python3 tests/bench_design_db.py [-n files]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.rules
+import common.utils as utils
+import common.verilog as verilog
+import common.design_db as design_db
+import common.read_sources as read_sources
+
+
+def generate_files(directory: str, n: int) -> list:
+    """
+    files of a module with a few pins instanciating the previous one
+    """
+    files = []
+    for i in range(n):
+        path = os.path.join(directory, "block_%d.v" % i)
+        with open(path, "w+") as fp:
+            fp.write("module block_%d (\n" % i)
+            fp.write("    input  wire        clk,\n    input  wire [31:0] din,\n")
+            fp.write("    output wire [31:0] dout\n);\n")
+            if i:
+                fp.write("    block_%d u_sub (.clk(clk), .din(din), .dout(dout));\n" % (i - 1))
+            fp.write("endmodule\n")
+        files.append(path)
+    return files
+
+
+def reference(files: list, output_dir: str):
+    """
+    load and rewrite db.json for each file as add_in_database did
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    db_path = os.path.join(output_dir, "db.json")
+    for path in files:
+        if os.path.exists(db_path):
+            with open(db_path, "r") as fp:
+                db = json.load(fp)
+        else:
+            db = {"includes": [], "modules": {}, "timescales": []}
+        index = verilog.index_file(path)
+        db["timescales"].extend(index.timescales)
+        for module in index.modules:
+            db["modules"][module.name] = module.to_dict()
+        with open(db_path, "w+") as fp:
+            fp.write(json.dumps(db, indent=2, sort_keys=True))
+
+
+def rules(files: list, output_dir: str):
+    os.environ["WORK_DIR"] = output_dir
+    for path in files:
+        for f in utils.rules.list_observer(path):
+            f(read_sources.Node(path))
+    # saved once at the end of a listing as by read_sources
+    read_sources.include_cache().save()
+
+
+def bench(func, files: list, output_dir: str) -> float:
+    t_start = time.perf_counter()
+    func(files, output_dir)
+    return (time.perf_counter() - t_start) * 1000.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--files", type=int, default=1000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = generate_files(tmp_dir, args.files)
+        # parse the files once for both
+        for path in files:
+            verilog.index_file(path)
+        ref = bench(reference, files, os.path.join(tmp_dir, "ref"))
+        first = bench(rules, files, os.path.join(tmp_dir, "db"))
+        second = bench(rules, files, os.path.join(tmp_dir, "db"))
+        db = design_db.open_db(os.path.join(tmp_dir, "db"))
+        t_start = time.perf_counter()
+        module = db.modules(verilog.Module.from_json).get("block_0")
+        lookup = (time.perf_counter() - t_start) * 1000.0
+        assert module.pins[2].name == "dout"
+        print("%d files" % len(files))
+        print("db.json rewrites   %9.1f ms" % ref)
+        print("design db (new)    %9.1f ms (x%.1f)" % (first, ref / first))
+        print("design db (again)  %9.1f ms" % second)
+        print("lazy module lookup %9.1f ms" % lookup)
+        db.close()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+benchmark of the ltspice raw reader on a synthetic stepped transient
+analysis compared to the former read of the whole binary section
+with the time axis unpacked point by point
+
+a monte carlo sweep is run with many short steps: -p 100 -s 5000
+
+usage: python3 tests/bench_ltspice_raw.py [-p points] [-v variables] [-s steps]
+"""
+
+import os
+import sys
+import time
+import struct
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+os.environ.setdefault("REFLOW", os.path.normpath(os.path.join(PWD, "..")))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..", "analog", "tools", "parsers")))
+
+import ltspice_raw
+
+
+def synthetic_raw(path: str, nb_vars: int, nb_pts: int, nb_steps: int = 1, params=None):
+    """
+    transient analysis of nb_vars variables (time included) of nb_steps
+    steps of nb_pts points and its log listing the steps
+    the traces of the point i of the step k are k + i / nb_pts
+    """
+    names = ["time"] + ["V(n%03d)" % i for i in range(1, nb_vars)]
+    header = [
+        "Title: * %s" % os.path.basename(path),
+        "Date: Mon Apr 13 21:43:38 2020",
+        "Plotname: Transient Analysis",
+        "Flags: real forward stepped",
+        "No. Variables: %d" % nb_vars,
+        "No. Points: %d" % (nb_pts * nb_steps),
+        "Offset:   0.0000000000000000e+000",
+        "Command: Linear Technology Corporation LTspice XVII",
+        "Variables:",
+    ]
+    for i, name in enumerate(names):
+        header.append("\t%d\t%s\t%s" % (i, name, "time" if i == 0 else "voltage"))
+    header.append("Binary:\n")
+    dtype = ltspice_raw.transient_dtype(names)
+    with open(path, "wb") as fp:
+        fp.write("\n".join(header).encode("utf-16-le"))
+        for k in range(nb_steps):
+            records = np.zeros(nb_pts, dtype=dtype)
+            records["time"] = np.linspace(0.0, 1e-6, nb_pts)
+            trace = (k + np.arange(nb_pts) / nb_pts).astype(np.float32)
+            for name in names[1:]:
+                records[name] = trace
+            records.tofile(fp)
+    with open(path.replace(".raw", ".log"), "w+") as fp:
+        fp.write("Circuit: * %s\n\n" % os.path.basename(path))
+        for k in range(nb_steps):
+            fp.write(".step %s\n" % (params(k) if params else "run=%d" % (k + 1)))
+        fp.write("\nTotal elapsed time: 1.000 seconds.\n")
+    return names
+
+
+def reference(filename: str, binary_index: int, nb_vars: int, nb_pts: int) -> tuple:
+    """
+    former read of the binary section of a transient analysis
+    """
+    buf_length = nb_pts * (nb_vars + 1) * 4
+    steps_indices = []
+    with open(filename, "rb") as fp:
+        fp.seek(binary_index)
+        data = np.frombuffer(fp.read(buf_length), dtype=np.float32)
+        time = []
+        for i in range(nb_pts):
+            fp.seek(binary_index + i * (nb_vars + 1) * 4)
+            t = struct.unpack("d", fp.read(8))[0]
+            time.append(t)
+            if i > 0 and t == 0:
+                steps_indices.append(i)
+        steps_indices.append(nb_pts)
+    data = np.array(data).reshape((nb_pts, nb_vars + 1))
+    return time, steps_indices, data
+
+
+def bench(func, *args) -> tuple:
+    tracemalloc.start()
+    t_start = time.perf_counter()
+    ans = func(*args)
+    duration = time.perf_counter() - t_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak / (1 << 20), ans
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-p", "--points", type=int, default=100000, help="per step")
+    parser.add_argument("-v", "--variables", type=int, default=64)
+    parser.add_argument("-s", "--steps", type=int, default=10)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.raw")
+        names = synthetic_raw(path, args.variables, args.points, args.steps)
+        print("raw file of %.1f MB" % (os.path.getsize(path) / (1 << 20)))
+        duration, peak, db = bench(ltspice_raw.load_raw, path)
+        print("memmap    %8.2f s, peak %8.1f MB" % (duration, peak))
+        # only the pages of a used signal are read
+        t_start = time.perf_counter()
+        maximum = float(np.max(db["values"][names[-1]]))
+        print("one trace %8.2f s" % (time.perf_counter() - t_start))
+        assert maximum == np.float32(args.steps - 1 + (args.points - 1) / args.points)
+        # every step selected by the value of its parameter
+        t_start = time.perf_counter()
+        for k in range(args.steps):
+            step = db["steps"].at(run=k + 1)
+            assert step[names[-1]][0] == k
+        print("steps     %8.2f s (%d lookups)" % (time.perf_counter() - t_start, args.steps))
+        nb_pts = db["no_points"]
+        binary_index = db["records"].offset
+        ref_duration, ref_peak, (ref_time, ref_steps, _) = bench(
+            reference, path, binary_index, len(names), nb_pts
+        )
+        print(
+            "reference %8.2f s, peak %8.1f MB (x%.1f)"
+            % (ref_duration, ref_peak, ref_duration / duration)
+        )
+        assert [j for _, j in db["steps_idx"]] == ref_steps
+        assert np.array_equal(db["time"], ref_time)
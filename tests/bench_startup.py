@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+startup benchmark of the run utility
+
+each command is executed with `python3 -X importtime` and
+the cumulative import time of the reflow modules and of
+their dependencies is compared to a budget, with room for
+slower hosts: the modules imported are checked exactly
+
+usage: python3 tests/bench_startup.py [-n repeat]
+"""
+
+import os
+import sys
+import glob
+import shutil
+import argparse
+import subprocess
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+REFLOW_DIR = os.path.normpath(os.path.join(PWD, ".."))
+RUN = os.path.join(REFLOW_DIR, "envs/bin/run")
+TESTCASE = os.path.join(PWD, "platform/testcases/adder")
+
+# budget in ms of the import time for each command
+# (about 70 ms for --help and clean, 95 ms for tree on a desktop)
+BUDGETS = {
+    "--help": 150.0,
+    "clean": 150.0,
+    "tree": 250.0,
+}
+# modules which should never be imported by those commands
+FORBIDDEN = ("numpy", "matplotlib", "mako", "openpyxl")
+# modules of the listing of the sources only imported by the commands using it
+LISTING = ("common.read_sources", "common.verilog", "common.design_db", "sqlite3")
+NO_LISTING = ("--help", "clean")
+
+
+def import_times(cmd: str, cwd: str) -> tuple:
+    """
+    cumulative import time in ms of each module
+    imported at the top level by the run utility
+    """
+    env = dict(os.environ, REFLOW=REFLOW_DIR)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", RUN, cmd],
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    times, imported = {}, set()
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        imported.add(name.strip())
+        # nested imports are indented
+        if not name[1:].startswith(" "):
+            times[name.strip()] = int(cumulative) / 1000.0
+    return times, imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+    failed = False
+    try:
+        for cmd, budget in BUDGETS.items():
+            best = None
+            for _ in range(args.repeat):
+                times, imported = import_times(cmd, TESTCASE)
+                total = sum(times.values())
+                best = total if best is None else min(best, total)
+            forbidden = sorted(m for m in imported if m.split(".")[0] in FORBIDDEN)
+            if cmd in NO_LISTING:
+                forbidden.extend(sorted(m for m in imported if m in LISTING))
+            status = "ok" if best <= budget and not forbidden else "FAILED"
+            failed |= status != "ok"
+            print("run %-8s %7.1f ms / %5.1f ms  %s" % (cmd, best, budget, status))
+            if forbidden:
+                print("    imports %s" % ", ".join(forbidden))
+    finally:
+        # remove the working directories created by the commands
+        for work_dir in glob.glob(os.path.join(TESTCASE, ".tmp_*")):
+            shutil.rmtree(work_dir)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+benchmark of the Sources.list tokenizer on a synthetic
+Sources.list compared to the former implementation
+
+usage: python3 tests/bench_tokenizer.py [-n lines] [-r repeat]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+from check_tokenizer import reference_tokenizer
+from common.read_sources import source_tokenizer
+
+
+def synthetic_sources_list(n: int, seed: int = 0) -> list:
+    """
+    lines of a Sources.list mixing files, tags, groups,
+    parameters and comments
+    """
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < n:
+        k = rng.randint(0, 9)
+        name = "block_%d/src_%d" % (rng.randint(0, 99), len(lines))
+        if k < 5:
+            lines.append("%s.sv\n" % name)
+        elif k == 5:
+            lines.append("%s.v@digital timing  # tagged file\n" % name)
+        elif k == 6:
+            lines.append("%s_pkg.sv:\n" % name)
+            lines.append("    %s_if.sv\n" % name)
+            lines.append("\n")
+        elif k == 7:
+            lines.append("SIM_FLAGS += -DSEED=%d -Wall\n" % rng.randint(0, 1 << 16))
+        elif k == 8:
+            lines.append("# %s is deprecated\n" % name)
+        else:
+            lines.append("../../%s\n" % name)
+    return lines[:n]
+
+
+def bench(tokenizer, lines: list, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        for _ in tokenizer(lines):
+            pass
+        duration = time.perf_counter() - t_start
+        best = duration if best is None else min(best, duration)
+    return best * 1000.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--lines", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+    lines = synthetic_sources_list(args.lines)
+    assert list(source_tokenizer(lines)) == list(reference_tokenizer(lines))
+    reference = bench(reference_tokenizer, lines, args.repeat)
+    current = bench(source_tokenizer, lines, args.repeat)
+    print("%d lines" % len(lines))
+    print("reference tokenizer %8.1f ms" % reference)
+    print("source_tokenizer    %8.1f ms (x%.1f)" % (current, reference / current))
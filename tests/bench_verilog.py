@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+benchmark of the design index of common.verilog on a synthetic
+post-synthesis netlist compared to the regular expressions
+of the former find_modules and find_instances and of find_timescale
+
+usage: python3 tests/bench_verilog.py [-s size in MB] [--no-reference]
+"""
+
+import os
+import sys
+import re
+import time
+import random
+import argparse
+import tempfile
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.verilog as verilog
+
+CELLS = {
+    "NAND2X1": ["A", "B", "Y"],
+    "NOR2X1": ["A", "B", "Y"],
+    "AOI22X1": ["A0", "A1", "B0", "B1", "Y"],
+    "MUX2X1": ["A", "B", "S0", "Y"],
+    "INVX2": ["A", "Y"],
+}
+
+
+def synthetic_netlist(path: str, size_mb: float, blocks: int = 8, seed: int = 0):
+    """
+    netlist of blocks of standard cells instanciated by a top module
+    """
+    rng = random.Random(seed)
+    cells = list(CELLS.items())
+    block_size = size_mb * (1 << 20) / blocks
+    with open(path, "w+") as fp:
+        fp.write("`timescale 1ns/1ps\n\n")
+        for b in range(blocks):
+            fp.write("module block_%d ( clk, rstb, din, dout );\n" % b)
+            fp.write("  input clk, rstb;\n  input [31:0] din;\n  output [31:0] dout;\n")
+            fp.write("  wire %s;\n" % ", ".join("n%d" % i for i in range(1000)))
+            written, k = 0, 0
+            while written < block_size:
+                name, pins = cells[rng.randrange(len(cells))]
+                ports = ", ".join(".%s(n%d)" % (p, rng.randrange(1000)) for p in pins)
+                if k % 64 == 0:
+                    line = "  DFFRX1 \\dout_reg[%d]  ( .D(n%d), .CK(clk) );\n" % (
+                        k,
+                        rng.randrange(1000),
+                    )
+                else:
+                    line = "  %s U%d ( %s );\n" % (name, k, ports)
+                fp.write(line)
+                written += len(line)
+                k += 1
+            fp.write("  assign dout = {n1, n2};\nendmodule\n\n")
+        fp.write("module top ( clk, rstb, din, dout );\n")
+        fp.write("  input clk, rstb;\n  input [31:0] din;\n  output [31:0] dout;\n")
+        for b in range(blocks):
+            fp.write("  block_%d u_block_%d ( .clk(clk), .din(din) );\n" % (b, b))
+        fp.write("endmodule\n")
+
+
+def find_modules(filepath: str) -> list:
+    """
+    list modules declared in the filepath by the former regular expression
+    with their parameters and the input/output ports
+    """
+    ans = []
+    PATTERN = (
+        r"(?!end)module"
+        r"\s*([\w\-]+)"
+        r"\s*(#\((?:[\w\.\(\),':\r\t\n \/\*\=\-]*)\))?"
+        r"\s*(\([\w\.\(\),'~\r\t\n \/\*\=\-\+:\[\]]*\)|)"
+        r"([\w\W\n\t]*?)endmodule"
+    )
+    # ^(?!end)module : start with module but not endmodule
+    # \s*([\w\-]+)   : skip some spaces then get the name of the module
+    # \s*(#*\([\w\s\=\-,\.\/\*]+\))? : get the optional param bloc with comments (//, /* */)
+    # \s*(\([\w\s\-,\.\/\*]*\))?     : get the ports bloc with comments // or /* */
+    # (.*?)                          : get all in the module in a non gready way
+    # endmodule                      : should end with endmodule
+    with open(filepath, "r+") as fp:
+        data = fp.read()
+        matches = re.finditer(PATTERN, data, re.DOTALL | re.MULTILINE)
+        for match in matches:
+            ans.append(match.groups())
+    return ans
+
+
+def find_instances(filepath: str) -> list:
+    """
+    list instances declared in the filepath by the former regular expression
+    """
+    ans = []
+    PATTERN = (
+        r"(^\s*[\w\-]+)"
+        r"\s+(?:#\(([\w\.\(\),\r\t\n \/\*\=\-\+:\[\]]*)\))?"
+        r"\s*([\w\-]+)\s*\("
+        r"([\w\.\(\)\r\t\n \/\*\=\-\+:\[\]~&|^.,'{}?]*)\);"
+    )
+    # filter the first group to not be module
+    KEYWORDS = ["module", "define", "begin", "task", "function", "case", "endcase"]
+    with open(filepath, "r+") as fp:
+        matches = re.finditer(PATTERN, fp.read(), re.DOTALL | re.MULTILINE)
+        for match in matches:
+            grps = match.groups()
+            if grps[0].lower().strip() not in KEYWORDS:
+                ans.append([g.strip() if g is not None else None for g in grps])
+    return ans
+
+
+def reference(path: str) -> tuple:
+    """
+    modules and instances of a file as add_in_database listed them
+    """
+    modules = []
+    for m in find_modules(path):
+        module = verilog.Module(m[0])
+        if m[1]:
+            module.parse_parameters(m[1])
+        module.parse_pins(m[2])
+        module.parse_parameters(m[-1])
+        module.parse_pins(m[-1])
+        modules.append(module)
+    instances = []
+    for i in find_instances(path):
+        instance = verilog.Instance(i[2], i[0])
+        if i[1]:
+            instance.parse_parameters(i[1])
+        instances.append(instance)
+    verilog.find_timescale(path)
+    return modules, instances
+
+
+def index(path: str) -> tuple:
+    verilog.INDEX_CACHE.clear()
+    idx = verilog.index_file(path)
+    return idx.modules, idx.instances
+
+
+def bench(parse, path: str) -> tuple:
+    """
+    duration of the parsing, names of the modules and of the instances
+    """
+    t_start = time.perf_counter()
+    modules, instances = parse(path)
+    duration = time.perf_counter() - t_start
+    return (
+        duration,
+        [m.name for m in modules],
+        [(i.module_name, i.name) for i in instances],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-s", "--size", type=float, default=50.0, help="size in MB")
+    parser.add_argument("--no-reference", action="store_true")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "netlist.v")
+        synthetic_netlist(path, args.size)
+        print("netlist of %.1f MB" % (os.path.getsize(path) / (1 << 20)))
+        duration, modules, instances = bench(index, path)
+        print(
+            "design index %8.2f s: %d modules, %d instances"
+            % (duration, len(modules), len(instances))
+        )
+        # a second access is served from memory
+        t_start = time.perf_counter()
+        verilog.index_file(path)
+        print("cached index %8.2f ms" % ((time.perf_counter() - t_start) * 1000.0))
+        verilog.INDEX_CACHE.clear()
+        if not args.no_reference:
+            ref_duration, ref_modules, ref_instances = bench(reference, path)
+            print(
+                "regex        %8.2f s: %d modules, %d instances (x%.1f)"
+                % (
+                    ref_duration,
+                    len(ref_modules),
+                    len(ref_instances),
+                    ref_duration / duration,
+                )
+            )
+            assert modules == ref_modules
+            # escaped identifiers are not recognized by the regular expressions
+            assert [i for i in instances if not i[1].startswith("\\")] == ref_instances
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the execution of the actions in a long-lived worker process:
+the working directory, the environment and the output are restored
+and the caches of the previous action are dropped
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+os.environ.setdefault("REFLOW", os.path.normpath(os.path.join(PWD, "..")))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.relog as relog
+import common.actions as actions
+import common.verilog as verilog
+import common.design_db as design_db
+import common.read_sources as read_sources
+
+
+def fake_action(cwd: str) -> bool:
+    os.chdir(os.path.dirname(cwd))
+    os.environ["FAKE_ACTION"] = "1"
+    del os.environ["REFLOW_CACHE_DIR"]
+    print("from the action")
+    os.system("echo from a sub-process")
+    return True
+
+
+def logging_action(cwd: str) -> bool:
+    """
+    write a log as the executor does and give the first error of the run
+    """
+    log_filter = relog.LogFilter()
+    path = os.path.join(cwd, "sim.log")
+    with open(path, "w+") as fp:
+        fp.write(log_filter.feed(os.environ.get("FAKE_LOG", "").encode()))
+        fp.write(log_filter.flush())
+    log_filter.register(path)
+    return relog.first_error()
+
+
+def failing_action(cwd: str) -> bool:
+    raise RuntimeError("broken action")
+
+
+def exiting_action(cwd: str) -> bool:
+    exit(0)
+
+
+class TestRunAction(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp_dir.name)
+        self.log = os.path.join(self.root, "action.log")
+        os.environ["REFLOW_CACHE_DIR"] = os.path.join(self.root, "cache")
+        # as in a worker process, the python streams write line by line in
+        # the fds 1 and 2 whatever the capture of the output by the test runner
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.streams = sys.stdout, sys.stderr
+        self.fds = os.dup(1), os.dup(2)
+        sys.stdout = os.fdopen(1, "w", 1, closefd=False)
+        sys.stderr = os.fdopen(2, "w", 1, closefd=False)
+        actions.ACTIONS.update(
+            {
+                "fake": fake_action,
+                "logging": logging_action,
+                "failing": failing_action,
+                "exiting": exiting_action,
+            }
+        )
+
+    def tearDown(self):
+        for name in ("fake", "logging", "failing", "exiting"):
+            actions.ACTIONS.pop(name)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.stdout, sys.stderr = self.streams
+        for fd, saved in enumerate(self.fds, 1):
+            os.dup2(saved, fd)
+            os.close(saved)
+        self.tmp_dir.cleanup()
+
+    def read_log(self) -> str:
+        with open(self.log, "r") as fp:
+            return fp.read()
+
+    def test_restore(self):
+        pwd, env = os.getcwd(), dict(os.environ)
+        stdout = os.fstat(1)
+        self.assertTrue(actions.run_action("fake", self.root, self.log))
+        self.assertEqual(os.getcwd(), pwd)
+        self.assertEqual(dict(os.environ), env)
+        self.assertEqual(os.fstat(1).st_ino, stdout.st_ino)
+        self.assertEqual(os.fstat(1).st_dev, stdout.st_dev)
+        # the output of the action and of its sub-processes is in the log
+        self.assertIn("from the action\nfrom a sub-process\n", self.read_log())
+
+    def test_failures(self):
+        pwd = os.getcwd()
+        self.assertFalse(actions.run_action("failing", self.root, self.log))
+        self.assertIn("RuntimeError: broken action", self.read_log())
+        self.assertEqual(os.getcwd(), pwd)
+        self.assertTrue(actions.run_action("exiting", self.root))
+
+    def test_log_stats(self):
+        """
+        the first error of an action is not the one of the previous action
+        """
+        os.environ["FAKE_LOG"] = "info: a\nerror: b\n"
+        first = actions.run_action("logging", self.root)
+        self.assertEqual(first, "%s:2" % os.path.join(self.root, "sim.log"))
+        os.environ["FAKE_LOG"] = "info: a\n"
+        os.makedirs(os.path.join(self.root, "next"))
+        self.assertIsNone(actions.run_action("logging", os.path.join(self.root, "next")))
+        self.assertEqual(list(relog.LOG_STATS), [os.path.join(self.root, "next", "sim.log")])
+        del os.environ["FAKE_LOG"]
+
+    def test_clear_caches(self):
+        verilog.INDEX_CACHE["a.sv"] = None
+        verilog.RESOLVED[("a", ())] = None
+        db = design_db.open_db(os.path.join(self.root, "work"))
+        read_sources.clear_caches()
+        self.assertEqual(verilog.INDEX_CACHE, {})
+        self.assertEqual(verilog.RESOLVED, {})
+        self.assertEqual(design_db.DATABASES, {})
+        with self.assertRaises(sqlite3.ProgrammingError):
+            db.db.execute("SELECT 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the lookup of the configuration files and the cache of the merged ones
+"""
+
+import os
+import sys
+import unittest
+import warnings
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+from common.read_config import Config, locate_config_files
+
+from helpers import TmpDirTestCase
+
+CONFIG = "[reflow]\n"
+
+
+class TestConfig(TmpDirTestCase):
+    def setUp(self):
+        super().setUp()
+        warnings.simplefilter("ignore", DeprecationWarning)
+        self.testcase = self.path("repo/blocks/adder/testcase")
+        os.makedirs(self.testcase)
+
+    def test_parents(self):
+        self.write("repo/blocks/b.config", CONFIG)
+        self.write("repo/blocks/a.config", CONFIG)
+        self.write("repo/top.config", CONFIG)
+        self.assertEqual(
+            locate_config_files(self.testcase),
+            [self.path("repo/blocks/a.config"), self.path("repo/blocks/b.config")],
+        )
+
+    def test_sub_directories(self):
+        # the work directories are not searched
+        self.write("repo/blocks/adder/testcase/.tmp_sim/run.config", CONFIG)
+        self.write("repo/blocks/adder/testcase/sub/deeper/local.config", CONFIG)
+        self.write("repo/blocks/adder/testcase/other/local.config", CONFIG)
+        self.assertEqual(
+            locate_config_files(self.testcase),
+            [self.path("repo/blocks/adder/testcase/other/local.config")],
+        )
+
+    def test_repository_root(self):
+        self.write("project.config", CONFIG)
+        self.assertEqual(locate_config_files(self.testcase), [self.path("project.config")])
+        # the parents of the root of the repository are not searched
+        os.makedirs(self.path("repo/.git"))
+        self.assertEqual(locate_config_files(self.testcase), [])
+
+    def test_merged_cache(self):
+        self.write("a.config", "[tools]\nSIM = iverilog\n")
+        self.write("b.config", "SIM_FLAGS = -Wall\n")
+        files = [self.path("a.config"), self.path("b.config")]
+        Config.read_configs(files)
+        self.write("c.config", "[tools]\nVIEWER = gtkwave\n")
+        Config.add_configs([self.path("c.config")])
+        self.assertEqual(Config.tools.get("VIEWER"), "gtkwave")
+        # the added configuration is not part of the cached one
+        Config.read_configs(files)
+        self.assertEqual(Config.tools.get("SIM"), "iverilog")
+        self.assertEqual(Config.reflow.get("SIM_FLAGS"), "-Wall")
+        self.assertIsNone(Config.tools.get("VIEWER"))
+        # a modified file is read again
+        self.write("a.config", "[tools]\nSIM = xcellium\n")
+        os.utime(self.path("a.config"), ns=(0, 0))
+        Config.read_configs(files)
+        self.assertEqual(Config.tools.get("SIM"), "xcellium")
+
+
+if __name__ == "__main__":
+    unittest.main()
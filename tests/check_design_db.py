@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the design database of the rules: files are only parsed
+again when their content changed and modules are read lazily
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.rules
+import common.utils as utils
+import common.verilog as verilog
+import common.design_db as design_db
+import common.read_sources as read_sources
+
+
+class TestDesignDB(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.work_dir = os.path.join(self.tmp_dir, ".tmp_sim")
+        os.environ["WORK_DIR"] = self.work_dir
+        self.path = os.path.join(self.tmp_dir, "test_pins.v")
+        shutil.copy(os.path.join(PWD, "test_pins.v"), self.path)
+
+    def tearDown(self):
+        os.environ.pop("WORK_DIR")
+        for db in design_db.DATABASES.values():
+            db.close()
+        design_db.DATABASES.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def add(self, path: str):
+        # the functions of the rules are only registered as observers
+        for f in utils.rules.list_observer(path):
+            f(read_sources.Node(path))
+
+    def test_incremental(self):
+        calls = []
+        parse_design = verilog.parse_design
+
+        def counted(fp):
+            calls.append(fp.name)
+            return parse_design(fp)
+
+        verilog.parse_design = counted
+        try:
+            self.add(self.path)
+            self.add(self.path)
+            # touched without any change
+            os.utime(self.path, ns=(0, 0))
+            self.add(self.path)
+            self.assertEqual(len(calls), 1)
+            with open(self.path, "a") as fp:
+                fp.write("\nmodule extra (input a);\nendmodule\n")
+            self.add(self.path)
+            self.assertEqual(len(calls), 2)
+        finally:
+            verilog.parse_design = parse_design
+        db = design_db.open_db(self.work_dir)
+        modules = db.modules(verilog.Module.from_json)
+        self.assertEqual(
+            [m.name for m in modules], ["test_1", "test_2", "test_3", "extra"]
+        )
+        self.assertEqual(modules.get("extra").pins[0].name, "a")
+
+    def test_lazy(self):
+        self.add(self.path)
+        db = design_db.open_db(self.work_dir)
+        loaded = []
+
+        def loader(d):
+            loaded.append(d["name"])
+            return verilog.Module.from_json(d)
+
+        modules = db.modules(loader)
+        self.assertEqual(len(modules), 3)
+        self.assertEqual(loaded, [])
+        self.assertEqual(len(modules[1].pins), 9)
+        self.assertIs(modules[1], modules[1])
+        self.assertEqual(loaded, ["test_2"])
+
+    def test_reopen(self):
+        self.add(self.path)
+        design_db.DATABASES.pop(os.path.join(self.work_dir, design_db.DB_NAME)).close()
+        db = design_db.open_db(self.work_dir)
+        self.assertIsNotNone(db.lookup(self.path))
+        self.assertEqual(len(db.modules(verilog.Module.from_json)), 3)
+        self.assertEqual(db.collect("timescales"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the elaboration of the hierarchy of a design by design_tree
+"""
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.design_tree as design_tree
+
+from bench_verilog import synthetic_netlist
+
+DESIGN = """
+module top (input a);
+    mid u_m0 (.a(a));
+    mid u_m1 (.a(a));
+    NAND2X1 U1 (.A(a));
+    missing u_missing ();
+endmodule
+
+module mid (input a);
+    leaf u_l0 (.a(a));
+    leaf u_l1 (.a(a));
+endmodule
+"""
+
+LEAF = """
+module leaf (input a);
+    INVX1 U2 (.A(a));
+endmodule
+
+module ping (); pong u_pong (); endmodule
+module pong (); ping u_ping (); endmodule
+"""
+
+
+class TestHierarchy(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.files = []
+        for name, text in (("top.v", DESIGN), ("leaf.sv", LEAF)):
+            path = os.path.join(self.tmp_dir.name, name)
+            with open(path, "w+") as fp:
+                fp.write(text)
+            self.files.append((path, "VERILOG"))
+        # a header without any module
+        path = os.path.join(self.tmp_dir.name, "defines.svh")
+        open(path, "w+").close()
+        self.files.append((path, "SYSTEM_VERILOG"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_tree(self):
+        hierarchy = design_tree.elaborate(self.files)
+        self.assertEqual(hierarchy.tops, ["top"])
+        stats = hierarchy.stats["top"]
+        # 2 mid, 4 leaf, 4 INVX1, 1 NAND2X1 and 1 missing
+        self.assertEqual(stats.instances, 12)
+        self.assertEqual(stats.depth, 3)
+        self.assertEqual(stats.modules, {"top", "mid", "leaf"})
+        self.assertEqual(len(stats.files), 2)
+        self.assertEqual(hierarchy.stats["mid"].instances, 4)
+        self.assertEqual(
+            dict(hierarchy.unresolved), {"INVX1": 4, "NAND2X1": 1, "missing": 1}
+        )
+        self.assertEqual(hierarchy.unused, ["ping", "pong"])
+        self.assertEqual(len(hierarchy.cycles), 1)
+        self.assertEqual(
+            hierarchy.find(["leaf"]),
+            [
+                ("leaf", "top.u_m0.u_l0"),
+                ("leaf", "top.u_m0.u_l1"),
+                ("leaf", "top.u_m1.u_l0"),
+                ("leaf", "top.u_m1.u_l1"),
+            ],
+        )
+        self.assertEqual(len(list(hierarchy.walk())), stats.instances)
+        self.assertEqual(hierarchy.files_of("mid"), sorted(f for f, _ in self.files[:2]))
+
+    def test_log_package(self):
+        """
+        the package of the logger added to the files is not part of the design
+        """
+        files = [(design_tree.LOG_PACKAGE, "SYSTEM_VERILOG")] + self.files
+        hierarchy = design_tree.elaborate(files)
+        self.assertEqual(hierarchy.tops, ["top"])
+        self.assertNotIn("log_service", hierarchy.modules)
+        self.assertEqual(hierarchy.unused, ["ping", "pong"])
+
+    def test_top(self):
+        hierarchy = design_tree.elaborate(self.files, {"TOP_MODULE": self.files[0][0]})
+        self.assertEqual(hierarchy.tops, ["top"])
+        hierarchy = design_tree.elaborate(self.files, top="mid")
+        self.assertEqual(hierarchy.tops, ["mid"])
+        self.assertIn("top", hierarchy.unused)
+        self.assertEqual(dict(hierarchy.unresolved), {"INVX1": 2})
+        # recursive instanciations are walked once
+        self.assertEqual(len(list(hierarchy.walk("ping"))), 2)
+        hierarchy = design_tree.elaborate(self.files, top="nowhere")
+        self.assertEqual(dict(hierarchy.unresolved), {"nowhere": 1})
+
+    def test_parameters(self):
+        """
+        the parameters of each instance are computed from the overrides
+        once per module and set of values
+        """
+        path = os.path.join(self.tmp_dir.name, "params.v")
+        with open(path, "w+") as fp:
+            fp.write(
+                "module top #(parameter N = 4) ();\n"
+                "    stage #(.W(N * 2)) u_s0 ();\n"
+                "    stage #(N * 2) u_s1 ();\n"
+                "    stage u_s2 ();\n"
+                "endmodule\n"
+                "module stage #(parameter W = 1) (input [W-1:0] d);\n"
+                "    leaf #(.L($clog2(W))) u_leaf ();\n"
+                "endmodule\n"
+                "module leaf #(parameter L = 0) ();\n"
+                "endmodule\n"
+            )
+        hierarchy = design_tree.elaborate([(path, "VERILOG")])
+        params = {p: v for p, _, v in hierarchy.parameters()}
+        self.assertEqual(params["top.u_s0"], {"W": 8})
+        self.assertEqual(params["top.u_s1"], {"W": 8})
+        self.assertEqual(params["top.u_s2"], {"W": 1})
+        self.assertEqual(params["top.u_s0.u_leaf"], {"L": 3})
+        self.assertEqual(params["top.u_s2.u_leaf"], {"L": 0})
+        _, pins = hierarchy.modules["stage"].resolve({"W": 8})
+        self.assertEqual(pins[0].width, 8)
+
+    def test_netlist(self):
+        """
+        a netlist of more than 100k instances is elaborated in seconds
+        """
+        path = os.path.join(self.tmp_dir.name, "netlist.v")
+        synthetic_netlist(path, 6)
+        t_start = time.perf_counter()
+        hierarchy = design_tree.elaborate([(path, "VERILOG")])
+        self.assertGreater(hierarchy.stats["top"].instances, 100000)
+        self.assertEqual(hierarchy.stats["top"].depth, 2)
+        self.assertLess(time.perf_counter() - t_start, 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
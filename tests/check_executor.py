@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the execution of the commands by the executor: the time limit,
+the kill of the process group and the streamed output
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+import unittest
+import contextlib
+import configparser
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.relog as relog
+import common.executor as executor
+
+from common.read_config import MetaConfig
+
+
+def is_running(pid: int) -> bool:
+    """
+    the process exists and is not a zombie
+    """
+    try:
+        with open("/proc/%d/stat" % pid, "r") as fp:
+            return fp.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+class TestExecutor(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmp_dir.name, "run.log")
+        self.data = MetaConfig.data
+
+    def tearDown(self):
+        MetaConfig.data = self.data
+        executor.KILL_GRACE = 5
+        relog.LOG_STATS.clear()
+        self.tmp_dir.cleanup()
+
+    def sh(self, script: str, **kwargs) -> tuple:
+        """
+        execute a shell script, return its success and its console output
+        """
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            ans = executor.sh_exec(
+                "sh -c '%s'" % script.replace("'", "'\\''"), self.log, **kwargs
+            )
+        return ans, out.getvalue()
+
+    @unittest.skipIf(os.name == "nt", "process groups are posix only")
+    def test_timeout(self):
+        """
+        the command and its children are killed once the time limit is reached
+        """
+        child = os.path.join(self.tmp_dir.name, "child.pid")
+        executor.KILL_GRACE = 1
+        t_start = time.time()
+        ans, _ = self.sh(
+            "sleep 60 & echo $! > %s; echo started; wait" % child, MAX_TIMEOUT=1
+        )
+        self.assertFalse(ans)
+        self.assertLess(time.time() - t_start, 10)
+        with open(child, "r") as fp:
+            pid = int(fp.read())
+        for _ in range(50):
+            if not is_running(pid):
+                break
+            time.sleep(0.1)
+        self.assertFalse(is_running(pid))
+        # the output written before the kill is kept
+        with open(self.log, "r") as fp:
+            self.assertEqual(fp.read(), "started\n")
+
+    @unittest.skipIf(os.name == "nt", "process groups are posix only")
+    def test_ish_timeout(self):
+        """
+        the time limit of a watched command applies even if not resumed
+        """
+        child = os.path.join(self.tmp_dir.name, "child.pid")
+        executor.KILL_GRACE = 1
+        gen = executor.ish_exec(
+            "sh -c 'sleep 60 & echo $! > %s; echo started; wait'" % child,
+            self.log,
+            MAX_TIMEOUT=1,
+        )
+        proc = next(gen)
+        t_start = time.time()
+        # watched by the caller as ltspice does
+        while proc.poll() is None and time.time() - t_start < 10:
+            time.sleep(0.1)
+        self.assertLess(proc.returncode, 0)
+        with open(child, "r") as fp:
+            pid = int(fp.read())
+        for _ in range(50):
+            if not is_running(pid):
+                break
+            time.sleep(0.1)
+        self.assertFalse(is_running(pid))
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(StopIteration) as ctx:
+                next(gen)
+        self.assertFalse(ctx.exception.value)
+        with open(self.log, "r") as fp:
+            self.assertEqual(fp.read(), "started\n")
+        # a command ending in time is not killed once the generator is closed
+        gen = executor.ish_exec("sleep 1.5", MAX_TIMEOUT=1)
+        proc = next(gen)
+        gen.close()
+        self.assertEqual(proc.wait(), 0)
+        gen = executor.ish_exec("echo done", MAX_TIMEOUT=5)
+        next(gen)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(StopIteration) as ctx:
+                next(gen)
+        self.assertTrue(ctx.exception.value)
+
+    def test_no_timeout(self):
+        """
+        there is no time limit by default
+        """
+        self.assertEqual(executor.sh_exec.__defaults__[2], -1)
+        ans, _ = self.sh("sleep 1.2; echo done", MAX_TIMEOUT=None)
+        self.assertTrue(ans)
+        ans, _ = self.sh("exit 3")
+        self.assertFalse(ans)
+
+    def test_timeout_config(self):
+        MetaConfig.data = configparser.ConfigParser()
+        self.assertEqual(executor.timeout("iverilog"), -1)
+        MetaConfig.data.read_string(
+            "[reflow]\nTIMEOUT = 3600\n\n[iverilog]\nTIMEOUT = 600\n"
+        )
+        self.assertEqual(executor.timeout("iverilog"), 600)
+        self.assertEqual(executor.timeout("covered"), 3600)
+
+    def test_stream(self):
+        """
+        the lines split across chunks are written once complete
+        in the console and without color codes in the log
+        """
+        executor.CHUNK_SIZE = 7
+        try:
+            ans, out = self.sh(
+                'printf "\\033[1;31mERROR: a line longer than a chunk\\033[0m\\n"; '
+                'printf "warning: first\\nnote: last without newline"'
+            )
+        finally:
+            executor.CHUNK_SIZE = 1 << 16
+        self.assertTrue(ans)
+        with open(self.log, "r") as fp:
+            self.assertEqual(
+                fp.read(),
+                "ERROR: a line longer than a chunk\n"
+                "warning: first\n"
+                "note: last without newline\n",
+            )
+        self.assertIn("\x1b[1;31mERROR:  a line longer than a chunk\x1b[0m\n", out)
+        self.assertTrue(out.endswith("note:  last without newline\n"))
+        # counted while streamed
+        self.assertEqual(relog.get_stats(self.log), (1, 1))
+        self.assertEqual(relog.LOG_STATS[os.path.abspath(self.log)]["first_error"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
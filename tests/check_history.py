@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the durations recorded by the history of the batch and their use
+by the scheduler: the longest tasks first and the estimated time left
+"""
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+from common.history import History
+from common.scheduler import Scheduler, TaskStatus
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.history = History(os.path.join(self.tmp_dir.name, "history.db"))
+        self.started = []
+
+    def tearDown(self):
+        self.history.close()
+        self.tmp_dir.cleanup()
+
+    def task(self, name: str) -> bool:
+        self.started.append(name)
+        return True
+
+    def test_expected(self):
+        self.assertIsNone(self.history.expected("tc:sim"))
+        for duration in (1000.0, 100.0, 200.0, 300.0, 400.0, 500.0):
+            self.history.record("tc:sim", {"Sim. Time": duration, "Warnings": 2})
+        # the average of the last 5 runs
+        self.assertEqual(self.history.expected("tc:sim"), 300.0)
+        self.assertEqual(self.history.expected("tc:sim", last=2), 450.0)
+
+    def test_expected_rule(self):
+        self.history.record("tc:sim", {"Sim. Time": 100.0})
+        self.history.record("tc:cov", {"Sim. Time": 50.0})
+        self.history.record("tc/nested:sim", {"Sim. Time": 20.0})
+        self.history.record("tcx:sim", {"Sim. Time": 1000.0})
+        self.history.record("t_c:sim", {"Sim. Time": 7.0})
+        self.assertEqual(self.history.expected_rule("tc"), 170.0)
+        # the wildcards of LIKE are escaped
+        self.assertEqual(self.history.expected_rule("t_c"), 7.0)
+        self.assertIsNone(self.history.expected_rule("t%"))
+        # persistent across runs
+        self.history.close()
+        self.history = History(self.history.path)
+        self.assertEqual(self.history.expected("tcx:sim"), 1000.0)
+
+    def test_longest_first(self):
+        scheduler = Scheduler(1)
+        for name, duration in (("short", 10.0), ("long", 300.0), ("medium", 50.0)):
+            self.history.record("%s:sim" % name, {"Sim. Time": duration})
+        for name in ("short", "long", "medium", "unknown"):
+            name = "%s:sim" % name
+            scheduler.add(name, self.task, name, cost=self.history.expected(name))
+        scheduler.run()
+        # a task never executed lasts as long as the average one
+        self.assertEqual(
+            self.started, ["long:sim", "unknown:sim", "medium:sim", "short:sim"]
+        )
+
+    def test_critical_path(self):
+        """
+        a short task is started first when a long one depends on it
+        """
+        scheduler = Scheduler(1)
+        sim = scheduler.add("sim", self.task, "sim", cost=10.0)
+        scheduler.add("lint", self.task, "lint", cost=100.0)
+        scheduler.add("cov", self.task, "cov", deps=[sim], cost=500.0)
+        costs = scheduler.costs()
+        self.assertEqual(
+            {t.name: r for t, r in scheduler.ranks(costs).items()},
+            {"sim": 510.0, "lint": 100.0, "cov": 500.0},
+        )
+        scheduler.run()
+        self.assertEqual(self.started, ["sim", "cov", "lint"])
+
+    def test_eta(self):
+        scheduler = Scheduler(2)
+        done = scheduler.add("done", self.task, "done", cost=1000.0)
+        running = scheduler.add("running", self.task, "running", cost=4000.0)
+        scheduler.add("pending", self.task, "pending", cost=2000.0)
+        scheduler.add("unknown", self.task, "unknown")
+        done.status = TaskStatus.PASSED
+        running.status = TaskStatus.RUNNING
+        costs = scheduler.costs()
+        self.assertEqual(costs[scheduler.tasks[3]], 7000.0 / 3)
+        # the running task started 3 s ago has 1 s left
+        started = {running: time.time() * 1000.0 - 3000.0}
+        self.assertEqual(scheduler.eta(costs, started), "0:00:03")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the include graph of read_sources on a tree of headers
+"""
+
+import os
+import sys
+import unittest
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.verilog as verilog
+import common.read_sources as read_sources
+
+from helpers import TmpDirTestCase
+
+FILES = {
+    "rtl/top.sv": '`include "inc/defines.svh"\nmodule top; endmodule\n',
+    "rtl/sub.sv": '`include "inc/defines.svh"\n`include "missing.svh"\n',
+    "rtl/leaf.sv": "module leaf; endmodule\n",
+    "rtl/inc/defines.svh": '`include "../../common/types.svh"\n',
+    "common/types.svh": "`define WIDTH 8\n",
+}
+
+
+class TestIncludeGraph(TmpDirTestCase):
+    def setUp(self):
+        super().setUp()
+        os.environ["REFLOW_CACHE_DIR"] = self.path("cache")
+        for name, text in FILES.items():
+            self.write(name, text)
+        read_sources.INCLUDE_CACHE = None
+        read_sources.clear_caches()
+
+    def tearDown(self):
+        os.environ.pop("REFLOW_CACHE_DIR")
+        read_sources.INCLUDE_CACHE = None
+        read_sources.clear_caches()
+        super().tearDown()
+
+    def test_incdirs(self):
+        files = [self.path("rtl/top.sv"), self.path("rtl/leaf.sv")]
+        self.assertEqual(
+            read_sources.resolve_includes(files),
+            [self.path("rtl/inc"), self.path("common")],
+        )
+        graph = read_sources.include_graph()
+        self.assertEqual(
+            graph.closure(files),
+            [self.path("rtl/inc/defines.svh"), self.path("common/types.svh")],
+        )
+        # the directory of a missing header exists
+        self.assertEqual(
+            graph.incdirs([self.path("rtl/sub.sv")]),
+            [self.path("rtl/inc"), self.path("common"), self.path("rtl")],
+        )
+
+    def test_affected(self):
+        graph = read_sources.include_graph()
+        graph.add([self.path(name) for name in FILES if name.endswith(".sv")])
+        self.assertEqual(
+            graph.affected(self.path("common/types.svh")),
+            [
+                self.path("rtl/inc/defines.svh"),
+                self.path("rtl/sub.sv"),
+                self.path("rtl/top.sv"),
+            ],
+        )
+        self.assertEqual(graph.affected(self.path("rtl/leaf.sv")), [])
+
+    def test_save_once(self):
+        """
+        the directives are saved once per listing and not per file
+        """
+        cache = read_sources.include_cache()
+        saves = []
+        save = cache.save
+        cache.save = lambda: saves.append(1) or save()
+        graph = read_sources.include_graph()
+        for name in FILES:
+            graph.incdirs([self.path(name)])
+        self.assertEqual(saves, [])
+        self.assertFalse(os.path.exists(cache.path))
+        read_sources.resolve_includes([self.path("rtl/top.sv")])
+        self.assertEqual(len(saves), 1)
+        self.assertTrue(os.path.exists(cache.path))
+
+    def test_cache(self):
+        """
+        the directives of a file are read again only if it changed
+        """
+        calls = []
+        index_file = verilog.index_file
+
+        def counted(path):
+            calls.append(path)
+            return index_file(path)
+
+        files = [self.path("rtl/top.sv")]
+        verilog.index_file = counted
+        try:
+            read_sources.resolve_includes(files)
+            self.assertEqual(len(calls), 3)
+            # a new run with a new process
+            read_sources.INCLUDE_CACHE = None
+            read_sources.clear_caches()
+            read_sources.resolve_includes(files)
+            self.assertEqual(len(calls), 3)
+            with open(self.path("rtl/inc/defines.svh"), "w+") as fp:
+                fp.write("`define NOTHING\n")
+            read_sources.clear_caches()
+            self.assertEqual(read_sources.resolve_includes(files), [self.path("rtl/inc")])
+            self.assertEqual(len(calls), 4)
+        finally:
+            verilog.index_file = index_file
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the invalidation of the caches of the file system queries
+and of the timescales of a listing when files are created, removed
+or modified
+"""
+
+import os
+import sys
+import unittest
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.utils as utils
+import common.read_sources as read_sources
+
+from helpers import TmpDirTestCase
+
+
+class TestFileCache(TmpDirTestCase):
+    def setUp(self):
+        super().setUp()
+        read_sources.clear_caches()
+
+    def tearDown(self):
+        read_sources.clear_caches()
+        super().tearDown()
+
+    def test_memoized(self):
+        path = self.path("a.sv")
+        self.assertFalse(utils.files.exists(path))
+        self.assertEqual(utils.files.FS_CALLS, {"done": 1, "saved": 0})
+        self.write("a.sv")
+        # the missing file is remembered during the run
+        self.assertFalse(utils.files.isfile(path))
+        self.assertEqual(utils.files.FS_CALLS, {"done": 1, "saved": 1})
+        self.assertEqual(utils.files.get_type(path), None)
+
+    def test_forget(self):
+        """
+        a file generated during the run is seen once forgotten
+        """
+        path = self.path("gen.sv")
+        self.assertIsNone(utils.files.get_type(path))
+        self.assertEqual(utils.files.realpath(path), path)
+        self.write("gen.sv")
+        os.symlink(path, self.path("link.sv"))
+        utils.files.forget(path)
+        self.assertEqual(utils.files.get_type(path), "SYSTEM_VERILOG")
+        os.remove(path)
+        self.assertTrue(utils.files.isfile(path))
+        utils.files.forget(path)
+        self.assertFalse(utils.files.exists(path))
+        # the other paths are kept
+        link = self.path("link.sv")
+        self.assertEqual(utils.files.realpath(link), path)
+        utils.files.forget(path)
+        self.assertEqual(utils.files.REALPATH_CACHE, {link: path})
+
+    def test_clear_cache(self):
+        """
+        each run starts without the queries of the previous one
+        """
+        self.write("a.sv")
+        self.assertTrue(utils.files.isfile(self.path("a.sv")))
+        self.assertFalse(utils.files.isdir(self.path("sub")))
+        self.assertEqual(read_sources.resolve_path("a.sv", self.root), self.path("a.sv"))
+        os.remove(self.path("a.sv"))
+        self.write("b.sv")
+        os.makedirs(self.path("sub"))
+        self.assertTrue(utils.files.isfile(self.path("a.sv")))
+        self.assertFalse(utils.files.isdir(self.path("sub")))
+        read_sources.clear_caches()
+        self.assertEqual(utils.files.FS_CALLS, {"done": 0, "saved": 0})
+        self.assertEqual(utils.files.STAT_CACHE, {})
+        self.assertEqual(read_sources.RESOLVED, {})
+        self.assertFalse(utils.files.isfile(self.path("a.sv")))
+        self.assertTrue(utils.files.isdir(self.path("sub")))
+        self.assertEqual(read_sources.resolve_path("b.sv", self.root), self.path("b.sv"))
+
+
+class TestTimescaleCache(TmpDirTestCase):
+    def setUp(self):
+        super().setUp()
+        os.environ["REFLOW_CACHE_DIR"] = os.path.join(self.root, "cache")
+        read_sources.TIMESCALE_CACHE = None
+        read_sources.clear_caches()
+
+    def tearDown(self):
+        read_sources.TIMESCALE_CACHE = None
+        read_sources.clear_caches()
+        super().tearDown()
+
+    def write_module(self, name: str, timescale: str, mtime_ns: int) -> str:
+        text = "`timescale %s\nmodule %s; endmodule\n" % (timescale, name[:-3])
+        path = self.write(name, text)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def scan(self, files: list) -> tuple:
+        """
+        timescales found by a new run and the number of files scanned
+        """
+        read_sources.clear_caches()
+        read_sources.TIMESCALE_CACHE = None
+        ans = read_sources.scan_timescales(files)
+        return ans, read_sources.timescale_cache().misses
+
+    def test_modified(self):
+        a = self.write_module("a.sv", "1ns/1ps", 10**18)
+        b = self.write_module("b.sv", "10ns/1ns", 10**18)
+        ans, misses = self.scan([a, b])
+        self.assertEqual(ans, {a: ("1", "ns", "1", "ps"), b: ("10", "ns", "1", "ns")})
+        self.assertEqual(misses, 2)
+        ans, misses = self.scan([a, b])
+        self.assertEqual(ans[a], ("1", "ns", "1", "ps"))
+        self.assertEqual(misses, 0)
+        # same size but a new modification time
+        self.write_module("a.sv", "1us/1ps", 10**18 + 1)
+        ans, misses = self.scan([a, b])
+        self.assertEqual(ans[a], ("1", "us", "1", "ps"))
+        self.assertEqual(ans[b], ("10", "ns", "1", "ns"))
+        self.assertEqual(misses, 1)
+        # same modification time but a new size
+        self.write_module("b.sv", "100ns/1ns", 10**18)
+        ans, _ = self.scan([a, b])
+        self.assertEqual(ans[b], ("100", "ns", "1", "ns"))
+
+    def test_removed(self):
+        a = self.write_module("a.sv", "1ns/1ps", 10**18)
+        self.scan([a])
+        with open(a, "w+") as fp:
+            fp.write("module a; endmodule\n")
+        ans, _ = self.scan([a])
+        self.assertEqual(ans[a], None)
+        os.remove(a)
+        ans, _ = self.scan([a])
+        self.assertEqual(ans[a], None)
+
+
+if __name__ == "__main__":
+    unittest.main()
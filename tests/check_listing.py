@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+differential check of the listings of the Sources.list of the tests:
+the text, json-lines and former text formats read by get_sources
+give the same files and parameters as the in-memory listing
+"""
+
+import io
+import os
+import sys
+import json
+import glob
+import tempfile
+import unittest
+import contextlib
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+os.environ.setdefault("REFLOW", os.path.normpath(os.path.join(PWD, "..")))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.utils as utils
+import common.read_sources as read_sources
+
+SOURCES_LISTS = sorted(glob.glob(os.path.join(PWD, "**", "Sources.list"), recursive=True))
+
+
+def former_lines(graph: list, listing: read_sources.Listing):
+    """
+    text format printed before the listing api: the parameters
+    of each node from the last one to the first one
+    """
+    for path, mime in listing.files:
+        yield "%s;%s" % (path, mime)
+    for node in graph[::-1]:
+        for key, value in node.params.items():
+            yield "%s\t:\t%s" % (key, value)
+    yield "TIMESCALE\t:\t'%s'" % listing.timescale
+    if listing.top:
+        yield "TOP_MODULE\t:\t'%s'" % listing.top
+
+
+class TestListing(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.environ["REFLOW_CACHE_DIR"] = self.tmp_dir.name
+        # the design database written by the rules of the listing
+        os.environ["WORK_DIR"] = os.path.join(self.tmp_dir.name, "work")
+        read_sources.clear_caches()
+
+    def tearDown(self):
+        read_sources.clear_caches()
+        del os.environ["WORK_DIR"]
+        self.tmp_dir.cleanup()
+
+    def list_sources(self, sources_list: str) -> tuple:
+        """
+        graph and listing of a Sources.list or None if it cannot be listed
+        """
+        try:
+            graph = read_sources.read_sources(sources_list, {})
+        except Exception:
+            return None
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err), contextlib.redirect_stdout(io.StringIO()):
+            listing = read_sources.list_sources(sources_list)
+        return graph, listing
+
+    def test_formats(self):
+        self.assertGreater(len(SOURCES_LISTS), 10)
+        listed = 0
+        for sources_list in SOURCES_LISTS:
+            with self.subTest(sources_list=os.path.relpath(sources_list, PWD)):
+                ans = self.list_sources(sources_list)
+                if ans is None:
+                    continue
+                graph, listing = ans
+                listed += 1
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ref = read_sources.read_from(sources_list)
+                    text = utils.get_sources(list(listing.lines()))
+                    jsonl = utils.get_sources(list(listing.records()))
+                    former = utils.get_sources(list(former_lines(graph, listing)))
+                self.assertEqual(text, ref)
+                self.assertEqual(jsonl, ref)
+                self.assertEqual(former, ref)
+        self.assertGreater(listed, 10)
+
+    def test_parameters(self):
+        """
+        the values parsed by ast.literal_eval are the ones given
+        by the eval of the former get_sources
+        """
+        for sources_list in SOURCES_LISTS:
+            ans = self.list_sources(sources_list)
+            if ans is None:
+                continue
+            for line in former_lines(*ans):
+                if ";" in line:
+                    continue
+                text = line.split(":", 2)[1].strip()
+                self.assertEqual(utils.run.literal_value(text), eval(text))
+        # the values which are not literals are kept as text
+        for text in ("1ns/100ps", "tb.dut", "[a, b]"):
+            self.assertEqual(utils.run.literal_value(text), text)
+        self.assertEqual(utils.run.literal_value("['-g2012', '-Wall']"), ["-g2012", "-Wall"])
+        self.assertEqual(
+            utils.get_sources([json.dumps({"param": "N", "value": [1, "a"]})]),
+            ([], {"N": [1, "a"]}),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
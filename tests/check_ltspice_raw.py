@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the memory mapped reader of the ltspice raw files
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(PWD)
+
+from bench_ltspice_raw import ltspice_raw, synthetic_raw
+
+TC_GAIN = os.path.join(PWD, "analog", "ltspice", "ota", "tc_gain.raw")
+
+
+class TestLtspiceRaw(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_transient(self):
+        db = ltspice_raw.load_raw(TC_GAIN)
+        self.assertEqual(db["no_vars"], 142)
+        self.assertEqual(len(db["time"]), 398)
+        self.assertEqual(db["time"][0], 0.0)
+        self.assertAlmostEqual(db["time"][-1], 1e-7)
+        self.assertEqual(db["steps_idx"], [(0, 398)])
+        # every variable but the time is a view on the mapped file
+        self.assertEqual(len(db["values"]), 141)
+        trace = db["values"]["V(x1:n007)"]
+        self.assertEqual(trace.dtype, np.float32)
+        self.assertAlmostEqual(float(trace[0]), 0.0717057, places=6)
+        self.assertTrue(np.shares_memory(trace, db["records"]))
+
+    def test_stepped(self):
+        path = os.path.join(self.tmp_dir.name, "stepped.raw")
+        names = synthetic_raw(path, 12, 50, 3)
+        db = ltspice_raw.load_raw(path)
+        self.assertEqual(db["nb_steps"], 3)
+        self.assertEqual(db["steps_idx"], [(0, 50), (50, 100), (100, 150)])
+        self.assertEqual(list(db["values"]), names[1:])
+        self.assertEqual(float(db["values"][names[1]][100]), 2.0)
+
+    def test_steps(self):
+        path = os.path.join(self.tmp_dir.name, "sweep.raw")
+        cloads = ["33f", "50f", "100f"]
+        names = synthetic_raw(
+            path, 12, 40, 6, lambda k: "cload=%s vdd=%s" % (cloads[k % 3], 1.8 + k // 3)
+        )
+        steps = ltspice_raw.load_raw(path)["steps"]
+        self.assertEqual(len(steps), 6)
+        self.assertEqual(steps[4].params, {"cload": 5e-14, "vdd": 2.8})
+        step = steps.at(cload=3.3e-14, vdd=2.8)
+        self.assertEqual((step.index, step.start, step.stop), (3, 120, 160))
+        self.assertEqual(float(step[names[1]][0]), 3.0)
+        self.assertEqual(len(step.x), 40)
+        self.assertEqual([s.index for s in steps.where(cload="100f")], [2, 5])
+        self.assertEqual(steps.where(cload=1e-9), [])
+        self.assertEqual(sorted(steps.by("vdd")), [1.8, 2.8])
+        with self.assertRaises(KeyError):
+            steps.at(vdd=1.8)
+
+    def test_log(self):
+        """
+        the logs of LTspice XVII are written in utf-16
+        """
+        path = os.path.join(self.tmp_dir.name, "mc.log")
+        with open(path, "wb") as fp:
+            fp.write(".step run=1\n.step run=2 model=nmos\n".encode("utf-16-le"))
+        self.assertEqual(
+            ltspice_raw.read_steps(path), [{"run": 1.0}, {"run": 2.0, "model": "nmos"}]
+        )
+        self.assertEqual(ltspice_raw.read_steps(path + ".missing"), [])
+        self.assertEqual(ltspice_raw.spice_number("1.5Meg"), 1.5e6)
+        self.assertEqual(ltspice_raw.spice_number("10mV"), 1e-2)
+        self.assertEqual(ltspice_raw.spice_number("fast"), "fast")
+
+    def test_truncated(self):
+        """
+        the points of a running simulation are read as far as written
+        """
+        path = os.path.join(self.tmp_dir.name, "running.raw")
+        synthetic_raw(path, 12, 50, 2)
+        size = os.path.getsize(path)
+        with open(path, "r+b") as fp:
+            fp.truncate(size - 30 * 52 - 4)
+        db = ltspice_raw.load_raw(path)
+        self.assertEqual(len(db["time"]), 69)
+        self.assertEqual(db["steps_idx"], [(0, 50), (50, 69)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the fingerprint of a testcase and the manifest of the passing
+simulations used by run batch --incremental
+"""
+
+import os
+import sys
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+os.environ.setdefault("REFLOW", os.path.normpath(os.path.join(PWD, "..")))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.read_sources as read_sources
+
+from common.manifest import Manifest, fingerprint
+
+from helpers import TmpDirTestCase
+
+FILES = {
+    "tc/Sources.list": "tb.sv\nPOST_SIM=checks.py\n",
+    "tc/tb.sv": '`include "../inc/defines.svh"\nmodule tb; endmodule\n',
+    "tc/checks.py": "def main(waves):\n    return 0, 0\n",
+    "inc/defines.svh": "`define WIDTH 8\n",
+}
+
+
+class TestManifest(TmpDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.testcase = self.path("tc")
+        os.environ["REFLOW_CACHE_DIR"] = self.path("cache")
+        for name, text in FILES.items():
+            self.write(name, text)
+        read_sources.INCLUDE_CACHE = None
+        read_sources.clear_caches()
+
+    def tearDown(self):
+        read_sources.INCLUDE_CACHE = None
+        super().tearDown()
+
+    def fingerprint(self) -> str:
+        # each run of a batch starts with an empty state
+        read_sources.clear_caches()
+        return fingerprint(self.testcase, "sim")
+
+    def test_fingerprint(self):
+        ref = self.fingerprint()
+        self.assertIsNotNone(ref)
+        self.assertEqual(self.fingerprint(), ref)
+        self.assertNotEqual(fingerprint(self.testcase, "lint"), ref)
+        # an included header not listed in the Sources.list
+        self.write("inc/defines.svh", "`define WIDTH 16\n")
+        header = self.fingerprint()
+        self.assertNotEqual(header, ref)
+        # the content of a post-simulation script
+        self.write("tc/checks.py", "def main(waves):\n    return 0, 1\n")
+        self.assertNotEqual(self.fingerprint(), header)
+
+    def test_threads(self):
+        """
+        the scheduler computes the fingerprints from several threads
+        """
+        ref = self.fingerprint()
+        read_sources.clear_caches()
+        with ThreadPoolExecutor(8) as pool:
+            signatures = list(pool.map(fingerprint, [self.testcase] * 64, ["sim"] * 64))
+        self.assertEqual(signatures, [ref] * 64)
+
+    def test_lookup(self):
+        manifest = Manifest(self.path("manifest.json"))
+        stats = {"warnings": 1, "errors": 0}
+        self.assertIsNone(manifest.lookup("tc", "abc"))
+        manifest.update("tc", "abc", stats)
+        self.assertEqual(manifest.lookup("tc", "abc"), stats)
+        self.assertIsNone(manifest.lookup("tc", "def"))
+        self.assertIsNone(manifest.lookup("tc", None))
+        # read back by the next batch
+        manifest = Manifest(self.path("manifest.json"))
+        self.assertEqual(manifest.lookup("tc", "abc"), stats)
+        # the entries of concurrent batches are kept
+        Manifest(self.path("manifest.json")).update("other", "123", stats)
+        manifest.update("tc", "def", stats)
+        manifest = Manifest(self.path("manifest.json"))
+        self.assertEqual(manifest.lookup("other", "123"), stats)
+        self.assertIsNone(manifest.lookup("tc", "abc"))
+
+    def test_corrupted(self):
+        self.write("manifest.json", "{")
+        self.assertIsNone(Manifest(self.path("manifest.json")).lookup("tc", "abc"))
+
+
+if __name__ == "__main__":
+    unittest.main()
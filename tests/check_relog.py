@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the streaming filter of the logs: the lines split across
+chunks, the severity of each line and the one defined by the config,
+the stats and the first error of the logs recorded while written
+"""
+
+import os
+import sys
+import unittest
+import warnings
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+os.environ.setdefault("REFLOW", os.path.normpath(os.path.join(PWD, "..")))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.relog as relog
+
+from helpers import TmpDirTestCase
+
+LOG = (
+    b"\x1b[1;37mINFO: start\x1b[0m\n"
+    b"WARNING: the error was expected\n"
+    b"a line without severity\n"
+    b"\x1b[1;31mERROR: wrong value\x1b[0m\n"
+    b"Fatal: stop\n"
+    b"informations are not counted\n"
+)
+
+
+def feed(data: bytes, size: int) -> tuple:
+    """
+    filter data by chunks of size bytes
+    """
+    log_filter = relog.LogFilter()
+    text = "".join(
+        log_filter.feed(data[i : i + size]) for i in range(0, len(data), size)
+    )
+    return log_filter, text + log_filter.flush()
+
+
+class TestLogFilter(TmpDirTestCase):
+    def setUp(self):
+        super().setUp()
+        warnings.simplefilter("ignore", DeprecationWarning)
+
+    def tearDown(self):
+        relog.set_severities()
+        relog.LOG_STATS.clear()
+        super().tearDown()
+
+    def test_chunks(self):
+        ref, text = feed(LOG, len(LOG))
+        self.assertNotIn("\x1b", text)
+        self.assertEqual(text.count("\n"), 6)
+        # the lines and the color codes split across chunks
+        for size in (1, 2, 3, 7, 13):
+            log_filter, chunked = feed(LOG, size)
+            self.assertEqual(chunked, text)
+            self.assertEqual(log_filter.stats(), ref.stats())
+        # an incomplete last line is kept until flushed
+        log_filter = relog.LogFilter()
+        self.assertEqual(log_filter.feed(b"INFO: a\nERR"), "INFO: a\n")
+        self.assertEqual(log_filter.feed(b"OR: b"), "")
+        self.assertEqual(log_filter.errors(), 0)
+        self.assertEqual(log_filter.flush(), "ERROR: b\n")
+        self.assertEqual((log_filter.errors(), log_filter.lines), (1, 2))
+        self.assertEqual(log_filter.flush(), "")
+
+    def test_severities(self):
+        log_filter, _ = feed(LOG, 5)
+        # the first keyword of a line gives its severity
+        self.assertEqual(
+            log_filter.counters, {"info": 1, "warning": 1, "error": 1, "fatal": 1}
+        )
+        self.assertEqual((log_filter.warnings(), log_filter.errors()), (1, 2))
+        log_filter, _ = feed(b"error: a warning\nwarning: an error\n", 4)
+        self.assertEqual((log_filter.warnings(), log_filter.errors()), (1, 1))
+
+    def test_config(self):
+        """
+        the [log] section of the configuration defines the severities
+        """
+        import common.actions as actions
+
+        config = self.write(
+            "project.config", "[log]\nwarning = \\bwarn(ing)?\\b|^\\*W\nerror = ^\\*E\\b\n"
+        )
+        actions.load_configs(self.root)
+        log_filter, _ = feed(b"*W,DLCPTH: path\n*E bad\nerror: ignored\nwarn: w\n", 3)
+        self.assertEqual((log_filter.warnings(), log_filter.errors()), (2, 1))
+        # back to the default severities without [log] section
+        os.remove(config)
+        actions.load_configs(self.root)
+        log_filter, _ = feed(b"*E bad\nerror: counted\n", 3)
+        self.assertEqual(log_filter.errors(), 1)
+
+    def write_log(self, name: str, data: bytes, mode: str = "wb") -> tuple:
+        """
+        write data in a log as the executor does and register its stats
+        """
+        path = self.path(name)
+        offset = os.path.getsize(path) if "a" in mode else 0
+        with open(path, mode) as fp:
+            log_filter = relog.LogFilter()
+            fp.write(log_filter.feed(data).encode())
+            fp.write(log_filter.flush().encode())
+        log_filter.register(path, offset)
+        return path, relog.LOG_STATS.get(os.path.abspath(path))
+
+    def test_first_error(self):
+        for size in (1, 5, len(LOG)):
+            log_filter, _ = feed(LOG, size)
+            self.assertEqual(log_filter.first_error, 4)
+        log_filter, _ = feed(b"info\nwarning\n", 3)
+        self.assertIsNone(log_filter.first_error)
+        path, stats = self.write_log("sim.log", LOG)
+        self.assertEqual(stats["first_error"], 4)
+        self.assertEqual(relog.first_error(), "%s:4" % os.path.abspath(path))
+        # only the logs written since the snapshot
+        self.assertIsNone(relog.first_error(dict(relog.LOG_STATS)))
+
+    def test_register_append(self):
+        path, stats = self.write_log("sim.log", b"info: a\nwarning: b\nc\n")
+        self.assertIsNone(stats["first_error"])
+        path, stats = self.write_log("sim.log", b"d\nerror: e\n", "ab")
+        self.assertEqual(stats["counters"]["info"], 1)
+        self.assertEqual((stats["lines"], stats["first_error"]), (5, 5))
+        self.assertEqual(relog.get_stats(path), (1, 1))
+        # the first error of the beginning of the log is kept
+        path, stats = self.write_log("sim.log", b"fatal: f\n", "ab")
+        self.assertEqual((stats["lines"], stats["first_error"]), (6, 5))
+        self.assertEqual(relog.get_stats(path), (1, 2))
+
+    def test_register_unknown(self):
+        """
+        the stats of a log appended to an unknown one are read from the file
+        """
+        path, _ = self.write_log("sim.log", b"error: a\n")
+        with open(path, "ab") as fp:
+            fp.write(b"warning: written by another process\n")
+        path, stats = self.write_log("sim.log", b"error: b\n", "ab")
+        self.assertIsNone(stats)
+        self.assertEqual(relog.get_stats(path), (1, 2))
+        # a log modified since registered is read again
+        path, _ = self.write_log("lint.log", b"error: a\n")
+        with open(path, "ab") as fp:
+            fp.write(b"warning: w\n")
+        self.assertEqual(relog.get_stats(path), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
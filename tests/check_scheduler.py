@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the execution of a graph of tasks by the scheduler of the batch:
+the order of the dependencies, the skip of the dependents of a failed
+task and the tasks executed whatever their dependencies
+"""
+
+import os
+import sys
+import time
+import threading
+import unittest
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+from common.scheduler import Scheduler, TaskStatus
+
+
+class Recorder:
+    """
+    functions of the tasks recording the order of their execution
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = []
+        self.finished = []
+
+    def task(self, name: str, result=True, duration: float = 0.0):
+        with self.lock:
+            self.started.append(name)
+        time.sleep(duration)
+        with self.lock:
+            self.finished.append(name)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.recorder = Recorder()
+
+    def add(self, scheduler: Scheduler, name: str, *args, **kwargs):
+        return scheduler.add(name, self.recorder.task, name, *args, **kwargs)
+
+    def test_dependencies(self):
+        scheduler = Scheduler(4)
+        sim = self.add(scheduler, "sim", True, 0.05)
+        cov = self.add(scheduler, "cov", deps=[sim])
+        lint = self.add(scheduler, "lint")
+        report = self.add(scheduler, "report", deps=[cov, lint])
+        status = scheduler.run()
+        self.assertTrue(all(s is TaskStatus.PASSED for s in status.values()))
+        finished = self.recorder.finished
+        self.assertLess(finished.index("sim"), finished.index("cov"))
+        self.assertEqual(finished[-1], "report")
+        # the lint does not wait for the simulation
+        self.assertEqual(finished[0], "lint")
+        self.assertEqual(report.result, True)
+
+    def test_failure(self):
+        scheduler = Scheduler(2)
+        sim = self.add(scheduler, "sim", False)
+        cov = self.add(scheduler, "cov", deps=[sim])
+        report = self.add(scheduler, "report", deps=[cov])
+        stats = self.add(scheduler, "stats", deps=[cov], always=True)
+        crash = self.add(scheduler, "crash", RuntimeError("crash"))
+        after = self.add(scheduler, "after", deps=[crash])
+        lint = self.add(scheduler, "lint")
+        status = scheduler.run()
+        self.assertEqual(
+            status,
+            {
+                "sim": TaskStatus.FAILED,
+                "cov": TaskStatus.SKIPPED,
+                "report": TaskStatus.SKIPPED,
+                "stats": TaskStatus.PASSED,
+                "crash": TaskStatus.FAILED,
+                "after": TaskStatus.SKIPPED,
+                "lint": TaskStatus.PASSED,
+            },
+        )
+        self.assertNotIn("cov", self.recorder.started)
+        self.assertNotIn("after", self.recorder.started)
+
+    def test_jobs(self):
+        scheduler = Scheduler(2)
+        for i in range(6):
+            self.add(scheduler, "t%d" % i, True, 0.05)
+        t_start = time.time()
+        scheduler.run()
+        # 3 waves of 2 tasks
+        self.assertGreaterEqual(time.time() - t_start, 0.15)
+        self.assertEqual(len(self.recorder.finished), 6)
+
+    def test_cycle(self):
+        scheduler = Scheduler(1)
+        a = self.add(scheduler, "a")
+        b = self.add(scheduler, "b", deps=[a])
+        a.deps.append(b)
+        with self.assertRaises(Exception):
+            scheduler.run()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the split of a batch in shards run on several machines:
+the partition of the rules, the plan shared by the shards of a run,
+the merge of their stats and their history
+"""
+
+import os
+import sys
+import time
+import unittest
+import configparser
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+os.environ.setdefault("REFLOW", os.path.normpath(os.path.join(PWD, "..")))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.read_batch as read_batch
+
+from common.history import History
+
+from helpers import TmpDirTestCase
+
+
+def make_batch(rules: list) -> configparser.ConfigParser:
+    batch = configparser.ConfigParser()
+    for rule in rules:
+        batch.add_section(rule)
+        batch.set(rule, "__path__", rule)
+    return batch
+
+
+class TestShards(TmpDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rules = ["tc_%02d" % i for i in range(10)]
+
+    def history(self, durations: dict, name: str = "history.db") -> History:
+        history = History(self.path(name))
+        for rule, duration in durations.items():
+            history.record("%s:sim" % rule, {"Sim. Time": duration})
+        return history
+
+    def write_stats(self, name: str, warnings: int, errors: int, duration: int):
+        read_batch.write_stats(
+            self.path(name), {"Warnings": warnings, "Errors": errors}, duration
+        )
+
+    def test_parse_shard(self):
+        self.assertEqual(read_batch.parse_shard("2/4"), (2, 4))
+        for text in ("0/4", "5/4", "2", "a/b"):
+            with self.assertRaises(ValueError):
+                read_batch.parse_shard(text)
+
+    def test_plan(self):
+        plan = read_batch.shard_plan(self.rules, 3)
+        self.assertEqual(sorted(sum(plan, [])), self.rules)
+        self.assertEqual(sorted(map(len, plan)), [3, 3, 4])
+        # the partition does not depend on the order of the rules
+        self.assertEqual(read_batch.shard_plan(list(reversed(self.rules)), 3), plan)
+        # the longest rules are balanced first
+        durations = {"tc_00": 900.0, "tc_01": 500.0, "tc_02": 300.0, "tc_03": 100.0}
+        history = self.history(durations)
+        plan = read_batch.shard_plan(self.rules[:4], 2, history)
+        history.close()
+        self.assertEqual(plan, [["tc_00"], ["tc_01", "tc_02", "tc_03"]])
+
+    def test_select(self):
+        history = self.history(dict.fromkeys(self.rules, 100.0))
+        batch = make_batch(self.rules)
+        read_batch.select_shard(batch, (1, 2), history, self.root)
+        first = read_batch.batch_rules(batch)
+        run_id = read_batch.rules_digest(self.rules, 2)
+        self.assertTrue(os.path.exists(read_batch.plan_path(self.root, run_id)))
+        # the other shard of the run reuses the plan whatever the history
+        history.record("tc_05:sim", {"Sim. Time": 1e6})
+        batch = make_batch(self.rules)
+        read_batch.select_shard(batch, (2, 2), history, self.root)
+        self.assertEqual(sorted(first + read_batch.batch_rules(batch)), self.rules)
+        # a new run balances the rules with the latest history
+        shards = []
+        for index in (1, 2):
+            batch = make_batch(self.rules)
+            read_batch.select_shard(batch, (index, 2), history, self.root, "pipeline_2")
+            shards.append(read_batch.batch_rules(batch))
+        self.assertIn(["tc_05"], shards)
+        # the shards of a run share the same rules
+        with self.assertRaises(ValueError):
+            read_batch.select_shard(
+                make_batch(self.rules[1:]), (2, 2), history, self.root, "pipeline_2"
+            )
+        history.close()
+
+    def test_merge(self):
+        for rules, run_id in ((self.rules[:4], "old"), (self.rules, "new")):
+            read_batch.select_shard(make_batch(rules), (1, 2), None, self.root, run_id)
+            time.sleep(0.01)
+        self.write_stats(read_batch.SHARD_STATS % (1, 2, "old"), 100, 100, 1000)
+        self.write_stats(read_batch.SHARD_STATS % (1, 2, "new"), 1, 2, 3000)
+        self.write_stats(read_batch.SHARD_STATS % (2, 2, "new"), 3, 0, 2000)
+        self.write_stats("shard_1of3_new.batch.stats", 100, 100, 1000)
+        # the last run by default
+        self.assertTrue(read_batch.merge_shards(self.root))
+        stats = read_batch.read_stats(self.path("batch.stats"))
+        self.assertEqual(stats, {"Warnings": 4, "Errors": 2, "Sim. Time": 3000})
+        self.assertTrue(read_batch.merge_shards(self.root, "old"))
+        stats = read_batch.read_stats(self.path("batch.stats"))
+        self.assertEqual(stats, {"Warnings": 100, "Errors": 100, "Sim. Time": 1000})
+        self.assertFalse(read_batch.merge_shards(self.root, "unknown"))
+
+    def test_history(self):
+        """
+        each shard writes its own history and reads the other ones
+        """
+        self.history({"tc_00": 100.0}).close()
+        first = read_batch.open_history(self.root, (1, 2))
+        second = read_batch.open_history(self.root, (2, 2))
+        first.record("tc_01:sim", {"Sim. Time": 200.0})
+        second.record("tc_02:sim", {"Sim. Time": 300.0})
+        self.assertEqual(first.expected("tc_00:sim"), 100.0)
+        self.assertIsNone(first.expected("tc_02:sim"))
+        first.close()
+        second.close()
+        self.assertTrue(os.path.exists(self.path("history_1of2.db")))
+        history = read_batch.open_history(self.root)
+        self.assertEqual(history.expected_rule("tc_01"), 200.0)
+        self.assertEqual(history.expected_rule("tc_02"), 300.0)
+        history.close()
+        # only the records of the whole runs are in history.db
+        history = History(self.path("history.db"))
+        self.assertIsNone(history.expected("tc_01:sim"))
+        history.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+differential test of the Sources.list tokenizer against
+the former character by character implementation
+
+usage: python3 -m unittest tests/check_tokenizer.py
+"""
+import os
+import sys
+import glob
+import random
+import unittest
+
+# get a path of reference
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.normpath(f"{PWD}/.."))
+
+from common.read_sources import TokenType, source_tokenizer
+
+
+def reference_tokenizer(buffer):
+    """
+    character by character tokenizer the fast one must reproduce
+    """
+    for line in buffer:
+        start_index = 0
+        is_blank_from_zero, previous, current = True, "", ""
+        ln = line.expandtabs(4)
+        idx_comment = ln.find("#")
+        ln = ln[:idx_comment] if idx_comment > -1 else ln
+        for pos, current in enumerate(ln):
+            # check for indentation
+            if current == " " and previous in ["", " "] and start_index == 0:
+                previous = current
+                continue
+            elif current != " " and is_blank_from_zero and start_index == 0:
+                yield (TokenType.INDENT, ln[:pos])
+                start_index = pos
+            # check for string
+            elif current.isalnum() or current in "/\\._-() []éèàï":
+                previous = current
+                continue
+            # check for separator
+            elif current in "@:=+\n":
+                # skip + as if can be part of the += token
+                if current in "+" and ln[pos + 1] != "=":
+                    previous = current
+                    continue
+                if ln[start_index:pos]:
+                    yield (TokenType.STRING, ln[start_index:pos])
+                    start_index = pos + 1
+                # report separator
+                if previous == "+" and current == "=":
+                    yield (TokenType.PARAM_SEP, "+=")
+                elif current == "=":
+                    yield (TokenType.PARAM_SEP, "=")
+                elif current == "@":
+                    yield (TokenType.TAG_SEP, "@")
+                elif current == "\n":
+                    yield (TokenType.NEW_LINE, "")
+                else:
+                    yield (TokenType.SEP, current)
+                start_index = pos + 1
+            previous = current
+            if current != " ":
+                is_blank_from_zero = False
+    yield (TokenType.STRING, ln[start_index:])
+    yield (TokenType.NEW_LINE, "")
+
+
+def tokens(tokenizer, lines: list):
+    """
+    token stream of a tokenizer or the exception it raised
+    """
+    try:
+        return list(tokenizer(lines))
+    except Exception as e:
+        return type(e)
+
+
+class TestTokenizer(unittest.TestCase):
+    def check(self, lines: list):
+        self.assertEqual(
+            tokens(source_tokenizer, lines), tokens(reference_tokenizer, lines), lines
+        )
+
+    def test_sources_list(self):
+        """
+        same tokens for all Sources.list of the tests
+        """
+        files = glob.glob(f"{PWD}/**/Sources.list", recursive=True)
+        self.assertTrue(files)
+        for file in files:
+            with open(file, "r") as fp:
+                self.check(fp.readlines())
+
+    def test_corner_cases(self):
+        """
+        same tokens for the quirks of the syntax
+        """
+        for text in [
+            "",
+            "\n",
+            "   \n",
+            "\t\tfile.v\n",
+            "a.v # comment\nb.v\n",
+            "# comment\n",
+            "   # comment\n",
+            ":x\n",
+            "=x\n",
+            "+=x\n",
+            "PARAM=1\n",
+            "PARAM  +=  -a -b\n",
+            "PARAM = a=b\n",
+            "a+b\n",
+            "a+",
+            "a+# comment\n",
+            "file.sv@tag1 tag2\n",
+            "dir:\n    file.v\n\nother.v",
+            "x@@:==\n",
+            "sp ace(s)/[1]é.v\r\n",
+            "$VAR/{a,b}.v\n",
+        ]:
+            self.check(text.splitlines(True))
+
+    def test_random_lines(self):
+        """
+        same tokens for random lines
+        """
+        rng = random.Random(0)
+        alphabet = "ab1 \t._/-()[]@:=+#\n,$é"
+        for _ in range(5000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 24)))
+            self.check(text.splitlines(True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the registry of the tools and its invalidation
+"""
+
+import os
+import sys
+import time
+import unittest
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.utils.tools as tools
+
+from helpers import TmpDirTestCase
+
+FILES = {
+    "digital/tools/sim/__init__.py": "",
+    "digital/tools/sim/tools.config": "[actions]\nsim = run_sim\nlint = run_lint\n",
+    "digital/tools/viewer/__init__.py": "",
+    "digital/tools/viewer/cfg/viewer.config": "[actions]\nview = main\n",
+    "analog/tools/parsers/raw.py": "",
+    # never searched
+    "digital/.tmp_sim/tools/hidden/tools.config": "",
+    "envs/lib/site-packages/tools/pkg/__init__.py": "",
+}
+
+
+class TestRegistry(TmpDirTestCase):
+    base = "reflow"
+
+    def setUp(self):
+        super().setUp()
+        self.env = dict(os.environ)
+        os.environ["REFLOW"] = os.path.join(self.root, "reflow")
+        os.environ["REFLOW_CACHE_DIR"] = os.path.join(self.root, "cache")
+        for name, text in FILES.items():
+            self.write(name, text)
+        tools.REGISTRIES.clear()
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.env)
+        tools.REGISTRIES.clear()
+        super().tearDown()
+
+    def test_registry(self):
+        registry = tools.registry()
+        self.assertEqual(sorted(registry), ["parsers", "sim", "viewer"])
+        self.assertEqual(tools.find_tool("sim"), self.path("digital/tools/sim"))
+        self.assertIsNone(tools.find_tool("hidden"))
+        self.assertEqual(
+            tools.tool_configs("viewer"), [self.path("digital/tools/viewer/cfg/viewer.config")]
+        )
+        self.assertEqual(registry["sim"]["actions"], {"sim": "run_sim", "lint": "run_lint"})
+        self.assertEqual(registry["parsers"]["actions"], {})
+
+    def test_invalidation(self):
+        """
+        the index saved by a process is reused by the next one
+        until a tools/ directory, a tool or its configs changed
+        """
+        tools.registry()
+        calls = []
+        scan_tools = tools.scan_tools
+
+        def counted(root):
+            calls.append(root)
+            return scan_tools(root)
+
+        tools.scan_tools = counted
+        try:
+            tools.REGISTRIES.clear()
+            tools.registry()
+            self.assertEqual(calls, [])
+            # a new tool
+            os.makedirs(self.path("analog/tools/spice"))
+            tools.REGISTRIES.clear()
+            self.assertIn("spice", tools.registry())
+            self.assertEqual(len(calls), 1)
+            # new actions of a tool
+            time.sleep(0.01)
+            self.write("digital/tools/sim/tools.config", "[actions]\nsim = main\n")
+            tools.REGISTRIES.clear()
+            self.assertEqual(tools.registry()["sim"]["actions"], {"sim": "main"})
+            self.assertEqual(len(calls), 2)
+        finally:
+            tools.scan_tools = scan_tools
+
+
+if __name__ == "__main__":
+    unittest.main()
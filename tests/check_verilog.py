@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+check the design index of common.verilog on the verilog files of the
+tests and on a netlist read by small chunks or without the fast path
+"""
+
+import io
+import os
+import re
+import sys
+import glob
+import tempfile
+import unittest
+
+PWD = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(PWD)
+sys.path.append(os.path.normpath(os.path.join(PWD, "..")))
+
+import common.verilog as verilog
+
+from bench_verilog import synthetic_netlist
+
+SNIPPET = """
+`timescale 1ns/10ps
+`include "defines.svh"
+`ifdef SIM
+`define DELAY 1
+`endif
+// cell u_comment (.a(a));
+/* cell u_block (.a(a)); */
+module top #(parameter WIDTH = 8, DEPTH = 2) (
+    input  wire [WIDTH-1:0] a, b,
+    output reg              o
+);
+    import "DPI-C" function int c_model(input int a);
+    function automatic int f(input int x);
+        return x;
+    endfunction
+    parameter int unsigned SIZE = 4;
+    localparam HIDDEN = 1;
+    (* keep *) sub #(.W(WIDTH), .D(2)) u_sub (.a(a), .o(o));
+    generate
+        for (genvar i = 0; i < 2; i++) begin : g
+            leaf u_leaf (.a(a[i]));
+        end
+    endgenerate
+    and g0 (o, a[0], b[0]);
+    \\escaped_cell  \\u_esc[0]  (.a(a));
+    always @(*) begin
+        if (a) o = 1'b1;
+        else o = 1'b0;
+    end
+endmodule
+"""
+
+
+def describe(index) -> list:
+    ans = []
+    for m in index.modules:
+        ans.append(("M", m.name, sorted(m.params), [p.to_dict() for p in m.pins]))
+    for i in index.instances:
+        ans.append(("I", i.module_name, i.name, i.params))
+    return ans + [index.includes, index.timescales]
+
+
+def verilog_files() -> list:
+    return sorted(
+        glob.glob(os.path.join(PWD, "**/*.v"), recursive=True)
+        + glob.glob(os.path.join(PWD, "**/*.sv"), recursive=True)
+    )
+
+
+class TestExpressions(unittest.TestCase):
+    def test_constants(self):
+        for text, value in (
+            ("42", 42),
+            ("-1", -1),
+            ("8'hFF", 255),
+            ("4'b1_0_1_1", 11),
+            ("3'd9", 1),
+            ("2 * 4 + 1", 9),
+            ("-7 / 2", -3),
+            ("-7 % 2", -1),
+            ("1 << 4", 16),
+            ("2 ** 10", 1024),
+            ("$clog2(17)", 5),
+            ("$clog2(1)", 0),
+            ("(3 > 2) ? 5 : 6", 5),
+            ("0 ? 1 : 1 ? 2 : 3", 2),
+            ("31.25", 31.25),
+        ):
+            self.assertEqual(verilog.evaluate(text), value, text)
+        for text in ("WIDTH", "WIDTH-1", "\"text\"", "{a, b}", "4'bx01", "1/0", ""):
+            self.assertEqual(verilog.evaluate(text), text)
+
+    def test_parameters(self):
+        expr = verilog.compile_expression("$clog2(DEPTH) - 1")
+        self.assertIs(verilog.compile_expression("$clog2(DEPTH) - 1"), expr)
+        self.assertEqual(expr.names, {"DEPTH"})
+        self.assertEqual(expr.value({"DEPTH": 64}), 5)
+        self.assertIsNone(expr.value({}))
+        scope = verilog.Scope({"A": 4, "B": "A * 2", "C": "$clog2(B)", "D": "D + 1"})
+        self.assertEqual(scope["C"], 3)
+        self.assertRaises(ValueError, lambda: scope["D"])
+
+    def test_widths(self):
+        text = """
+        module fifo #(parameter WIDTH = 8, DEPTH = 16) (
+            input  wire [WIDTH-1:0]         din,
+            output wire [$clog2(DEPTH)-1:0] level,
+            output wire [0:3]               flags,
+            output wire [SIZE-1:0]          dout
+        );
+            localparam SIZE = WIDTH * 2;
+        endmodule
+        """
+        module = verilog.parse_design(io.StringIO(text)).modules[0]
+        self.assertEqual(module.localparams, {"SIZE": "WIDTH*2"})
+        # parsed range and width for the default parameters
+        self.assertEqual(
+            [p.msb for p in module.pins], ["WIDTH-1", "$clog2(DEPTH)-1", 3, "SIZE-1"]
+        )
+        self.assertEqual([p.width for p in module.pins], [8, 4, 4, 16])
+        params, pins = module.resolve({"WIDTH": 3, "DEPTH": 1024})
+        self.assertEqual(params, {"WIDTH": 3, "DEPTH": 1024})
+        self.assertEqual(
+            [(p.msb, p.lsb, p.width) for p in pins],
+            [(2, 0, 3), (9, 0, 10), (3, 0, 4), (5, 0, 6)],
+        )
+        self.assertIs(module.resolve({"DEPTH": 1024, "WIDTH": 3})[1], pins)
+        # overrides of an instance from the parameters of its parent
+        instance = verilog.Instance("u_fifo", "fifo")
+        instance.params.update({"DEPTH": "N*4", "unresolved": ["W+1"]})
+        self.assertEqual(
+            instance.overrides(module, {"N": 8, "W": 7}), {"WIDTH": 8, "DEPTH": 32}
+        )
+
+
+class TestDesignIndex(unittest.TestCase):
+    def test_snippet(self):
+        index = verilog.parse_design(io.StringIO(SNIPPET))
+        self.assertEqual([m.name for m in index.modules], ["top"])
+        top = index.modules[0]
+        self.assertEqual(sorted(top.params), ["DEPTH", "SIZE", "WIDTH"])
+        self.assertEqual(top.params["WIDTH"]["value"], 8)
+        self.assertEqual([p.name for p in top.pins], ["a", "b", "o"])
+        self.assertEqual(top.pins[1].msb, "WIDTH-1")
+        self.assertEqual(
+            [(i.module_name, i.name) for i in index.instances],
+            [("sub", "u_sub"), ("leaf", "u_leaf"), ("\\escaped_cell", "\\u_esc[0]")],
+        )
+        self.assertEqual(index.instances[0].params["W"], "WIDTH")
+        self.assertEqual(index.instances[0].params["D"], 2)
+        self.assertEqual(index.includes, ["defines.svh"])
+        self.assertEqual(index.timescales, [("1", "ns", "10", "ps")])
+
+    def test_pins(self):
+        """
+        v95, v2k and mixed declarations of the same module
+        """
+        index = verilog.index_file(os.path.join(PWD, "test_pins.v"))
+        self.assertEqual([m.name for m in index.modules], ["test_1", "test_2", "test_3"])
+        for m in index.modules:
+            self.assertEqual(len(m.params), 2)
+            self.assertEqual(len(m.pins), 9)
+        for pins in zip(*(m.pins for m in index.modules)):
+            self.assertEqual(len(set(p.name for p in pins)), 1)
+            self.assertEqual(len(set(p.direction for p in pins)), 1)
+        # the wire declaration of test_1 overrides the range of rstb
+        self.assertEqual(index.modules[0].pins[1].msb, 2)
+
+    def test_cache(self):
+        path = os.path.join(PWD, "test_pins.v")
+        self.assertIs(verilog.index_file(path), verilog.index_file(path))
+
+    def test_chunks(self):
+        """
+        the tokens cut by the end of a chunk are read again
+        """
+        chunk, lookahead = verilog.LEXER_CHUNK, verilog.LEXER_LOOKAHEAD
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "netlist.v")
+            synthetic_netlist(path, 0.2)
+            with open(path, "a") as fp:
+                fp.write(SNIPPET)
+            for f in verilog_files() + [path]:
+                with open(f, "r") as fp:
+                    expected = describe(verilog.parse_design(fp))
+                try:
+                    verilog.LEXER_CHUNK, verilog.LEXER_LOOKAHEAD = 97, 13
+                    with open(f, "r") as fp:
+                        self.assertEqual(describe(verilog.parse_design(fp)), expected, f)
+                finally:
+                    verilog.LEXER_CHUNK, verilog.LEXER_LOOKAHEAD = chunk, lookahead
+
+    def test_fast_path(self):
+        """
+        the instances matched at once are the ones of the tokenizer
+        """
+        fast_instance = verilog.FAST_INSTANCE
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "netlist.v")
+            synthetic_netlist(path, 0.2)
+            for f in verilog_files() + [path]:
+                with open(f, "r") as fp:
+                    expected = describe(verilog.parse_design(fp))
+                try:
+                    verilog.FAST_INSTANCE = re.compile(r"(?!)")
+                    with open(f, "r") as fp:
+                        self.assertEqual(describe(verilog.parse_design(fp)), expected, f)
+                finally:
+                    verilog.FAST_INSTANCE = fast_instance
+
+
+if __name__ == "__main__":
+    unittest.main()
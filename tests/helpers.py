@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+fixture shared by the checks working on files of a temporary directory
+"""
+
+import os
+import tempfile
+import unittest
+
+
+class TmpDirTestCase(unittest.TestCase):
+    """
+    test case whose files are written in a temporary directory
+    removed once the test done
+    """
+
+    # sub-directory of the temporary directory given by path()
+    base = ""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, self.base, name)
+
+    def write(self, name: str, text: str = "") -> str:
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w+") as fp:
+            fp.write(text)
+        return path